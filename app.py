@@ -4,13 +4,13 @@ import torch
 import gradio as gr  
 import spaces
 from typing import Optional, Tuple
-from funasr import AutoModel
 from pathlib import Path
 os.environ["TOKENIZERS_PARALLELISM"] = "false"
 if os.environ.get("HF_REPO_ID", "").strip() == "":
     os.environ["HF_REPO_ID"] = "openbmb/VoxCPM1.5"
 
 import voxcpm
+from asr_service import ASRService, get_asr_service
 
 
 class VoxCPMDemo:
@@ -18,14 +18,12 @@ class VoxCPMDemo:
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
         print(f"🚀 Running on device: {self.device}")
 
-        # ASR model for prompt text recognition
-        self.asr_model_id = "iic/SenseVoiceSmall"
-        self.asr_model: Optional[AutoModel] = AutoModel(
-            model=self.asr_model_id,
-            disable_update=True,
-            log_level='DEBUG',
+        # ASR model for prompt text recognition (shared, micro-batched)
+        self.asr: ASRService = get_asr_service(
+            backend="sensevoice",
             device="cuda:0" if self.device == "cuda" else "cpu",
         )
+        self.asr.load()
 
         # TTS model (lazy init)
         self.voxcpm_model: Optional[voxcpm.VoxCPM] = None
@@ -71,9 +69,7 @@ class VoxCPMDemo:
     def prompt_wav_recognition(self, prompt_wav: Optional[str]) -> str:
         if prompt_wav is None:
             return ""
-        res = self.asr_model.generate(input=prompt_wav, language="auto", use_itn=True)
-        text = res[0]["text"].split('|>')[-1]
-        return text
+        return self.asr.transcribe(prompt_wav)
 
     def generate_tts_audio(
         self,
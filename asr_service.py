@@ -0,0 +1,185 @@
+import io
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+
+AudioInput = Union[str, bytes]
+
+logger = logging.getLogger(__name__)
+
+
+class ASRService:
+    """Shared speech recognizer for reference-audio transcripts.
+
+    One model is loaded per process. Requests are queued and a worker thread
+    transcribes them in micro-batches (up to ``max_batch_size`` requests, waiting
+    at most ``max_wait_ms`` for a batch to fill). When a ``CacheManager`` is given,
+    results are memoized by audio content digest and concurrent requests for the
+    same audio share one transcription.
+
+    Backends: ``"sensevoice"`` (FunASR SenseVoiceSmall, batched inference) and
+    ``"whisper"`` (openai-whisper; batch items are decoded one after another).
+    """
+
+    SAMPLE_RATE = 16000
+
+    def __init__(self, backend: str = "sensevoice", device: Optional[str] = None,
+                 language: Optional[str] = None, max_batch_size: int = 8,
+                 max_wait_ms: float = 20, cache=None):
+        if backend not in ("sensevoice", "whisper"):
+            raise ValueError(f"Unsupported ASR backend: {backend}")
+        self.backend = backend
+        self.device = device
+        self.language = language
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.cache = cache
+        self.model = None
+        self._model_lock = threading.Lock()
+        self._queue: "queue.Queue" = queue.Queue()
+        self._pending: Dict[str, Future] = {}
+        self._pending_lock = threading.Lock()
+        self._worker = None
+
+    def load(self):
+        with self._model_lock:
+            if self.model is None:
+                import torch
+                if self.backend == "sensevoice":
+                    from funasr import AutoModel
+                    print("Loading ASR model (SenseVoiceSmall)...")
+                    self.model = AutoModel(
+                        model="iic/SenseVoiceSmall",
+                        disable_update=True,
+                        log_level='ERROR',
+                        device=self.device or ("cuda:0" if torch.cuda.is_available() else "cpu"),
+                    )
+                else:
+                    import whisper
+                    print("Loading ASR model (Whisper)...")
+                    self.model = whisper.load_model(os.getenv("WHISPER_MODEL", "base"), device=self.device)
+        return self.model
+
+    def is_loaded(self) -> bool:
+        return self.model is not None
+
+    def submit(self, audio: AudioInput, digest: Optional[str] = None) -> Future:
+        """Queue ``audio`` (file path or encoded bytes); the future resolves to the transcript"""
+        if digest is None and self.cache is not None:
+            digest = (self.cache.digest_bytes(audio) if isinstance(audio, (bytes, bytearray))
+                      else self.cache.get_file_digest(audio))
+        future = Future()
+        if digest is not None:
+            if self.cache is not None:
+                cached = self.cache.get_whisper_cache(audio, digest=digest)
+                if cached is not None:
+                    future.set_result(cached)
+                    return future
+            with self._pending_lock:
+                if digest in self._pending:
+                    return self._pending[digest]
+                self._pending[digest] = future
+        self._start_worker()
+        self._queue.put((audio, digest, future))
+        return future
+
+    def transcribe(self, audio: AudioInput, digest: Optional[str] = None,
+                   timeout: Optional[float] = None) -> str:
+        """Blocking transcription through the shared batching queue"""
+        return self.submit(audio, digest).result(timeout)
+
+    def _start_worker(self):
+        with self._pending_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._worker_loop, daemon=True)
+                self._worker.start()
+
+    def _worker_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            # A corrupt upload fails only its own request
+            decoded = []
+            for audio, digest, future in batch:
+                try:
+                    decoded.append((audio, digest, future, self._decode(audio)))
+                except Exception as e:
+                    logger.warning("ASR could not decode audio: %s", e)
+                    self._finish(digest, future, error=e)
+            if not decoded:
+                continue
+
+            try:
+                texts = self._transcribe_batch([inputs for _, _, _, inputs in decoded])
+            except Exception as e:
+                logger.exception("ASR batch of %d failed", len(decoded))
+                for _, digest, future, _ in decoded:
+                    self._finish(digest, future, error=e)
+                continue
+
+            for (audio, digest, future, _), text in zip(decoded, texts):
+                if digest is not None and self.cache is not None:
+                    self.cache.set_whisper_cache(audio, text, digest=digest)
+                self._finish(digest, future, result=text)
+
+    def _finish(self, digest: Optional[str], future: Future, result=None, error=None):
+        if digest is not None:
+            with self._pending_lock:
+                self._pending.pop(digest, None)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def _decode(self, audio: AudioInput):
+        # Paths are passed through; bytes become 16 kHz mono float32 arrays, which
+        # both backends accept directly
+        if not isinstance(audio, (bytes, bytearray)):
+            return str(audio)
+        import soundfile as sf
+        wav, sr = sf.read(io.BytesIO(audio), dtype="float32")
+        if wav.ndim > 1:
+            wav = wav.mean(axis=1)
+        if sr != self.SAMPLE_RATE:
+            import torch
+            import torchaudio
+            wav = torchaudio.functional.resample(torch.from_numpy(wav), sr, self.SAMPLE_RATE).numpy()
+        return np.ascontiguousarray(wav, dtype=np.float32)
+
+    def _transcribe_batch(self, inputs: List[Union[str, np.ndarray]]) -> List[str]:
+        """Transcribe ``_decode``d inputs in one model call"""
+        model = self.load()
+        if self.backend == "sensevoice":
+            res = model.generate(input=inputs, language=self.language or "auto",
+                                 use_itn=True, batch_size=len(inputs))
+            return [r["text"].split('|>')[-1] for r in res]
+        return [model.transcribe(x, language=self.language)["text"] for x in inputs]
+
+
+_service: Optional[ASRService] = None
+_service_lock = threading.Lock()
+
+
+def get_asr_service(**kwargs) -> ASRService:
+    """Process-wide ASR service; ``kwargs`` configure it on first use only"""
+    global _service
+    with _service_lock:
+        if _service is None:
+            kwargs.setdefault("backend", os.getenv("ASR_BACKEND", "sensevoice"))
+            _service = ASRService(**kwargs)
+        return _service
@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""
+Concurrent load generator for the VoxCPM server.
+
+Requests arrive open-loop: inter-arrival times are drawn from an exponential
+distribution (Poisson arrivals at ``--rate`` req/s) and every request is fired
+at its scheduled time whether or not earlier ones have finished, so queueing
+shows up in the latencies instead of silently lowering the offered load.
+Latencies are measured from the scheduled arrival, which also counts any delay
+on the client side.
+
+Each request picks an endpoint, a text length class and a voice from weighted
+mixes and records TTFB (first body byte), total latency, generated audio
+duration and RTF (latency / audio duration). Several rates can be swept in one
+run to find the saturation point:
+
+    python benchmark_load.py --url http://localhost:7861 --rate 0.5,1,2,4 --duration 60 \\
+        --endpoints tts:1,stream:2,openai:1 --text_mix short:5,medium:3,long:1 \\
+        --voices none:1,default:1,@examples/example.wav:1 --output load.json
+
+Voices: ``none`` (no prompt; /api/tts and /api/tts/stream), a preset id
+(``voice_id`` for /api/tts/stream, ``voice`` for /v1/audio/speech) or
+``@path.wav`` to upload a local prompt (/api/tts and /api/tts/stream). Each
+endpoint samples only among the voices it supports.
+
+Stand-in server with a random tiny model (no weights, runs on CPU):
+
+    VOXCPM_TINY_MODEL=tiny python server.py
+    python benchmark_load.py --rate 1,2 --duration 30 --length_per_char 0.5
+
+The random model's stop head ends generation almost immediately;
+``--length_per_char`` pins ``min_len``/``max_len`` on the native endpoints so
+audio length scales with the text. Requires ``httpx``.
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import struct
+import time
+from collections import Counter
+from pathlib import Path
+
+import httpx
+import numpy as np
+
+ENDPOINTS = {
+    "tts": "/api/tts",
+    "stream": "/api/tts/stream",
+    "openai": "/v1/audio/speech",
+}
+
+TEXTS = {
+    "short": [
+        "你好，这是一个简短的测试。",
+        "今天天气很不错。",
+        "Hello, this is a short test.",
+        "欢迎使用语音合成服务。",
+    ],
+    "medium": [
+        "人工智能技术正在快速发展，语音合成作为其中的重要分支，已经在多个领域得到了广泛应用。",
+        "VoxCPM is a tokenizer-free text to speech model that generates natural and expressive speech.",
+        "请在听到提示音后留言，我们的工作人员会在一个工作日内回复您，感谢您的耐心等待。",
+    ],
+    "long": [
+        "在当今数字化时代，人工智能技术的发展日新月异，其中语音合成技术作为人机交互的重要组成部分，"
+        "正在经历着革命性的变革。从早期的机械式合成到现在的神经网络驱动的自然语音生成，技术的进步让机器的声音越来越接近真人。"
+        "无论是在智能客服、有声读物、还是辅助技术领域，语音合成都展现出了巨大的应用价值。",
+        "Speech synthesis has come a long way from concatenating recorded units. Modern neural models "
+        "produce speech that is hard to tell apart from a human speaker, and streaming inference lets "
+        "applications start playback long before the whole utterance has been generated, which matters "
+        "for voice assistants, audiobooks and accessibility tools alike.",
+    ],
+}
+
+
+def parse_mix(spec: str) -> dict:
+    """``"a:2,b:1"`` -> ``{"a": 2.0, "b": 1.0}`` (weight defaults to 1)"""
+    mix = {}
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        name, sep, weight = item.rpartition(":")
+        if not sep or not _is_number(weight):
+            name, weight = item, "1"
+        mix[name] = float(weight)
+    if not mix or min(mix.values()) < 0 or sum(mix.values()) <= 0:
+        raise ValueError(f"Invalid mix: {spec!r}")
+    return mix
+
+
+def _is_number(value: str) -> bool:
+    try:
+        float(value)
+        return True
+    except ValueError:
+        return False
+
+
+def load_texts(path: str, short_max: int, medium_max: int) -> dict:
+    """Bucket the lines of a text file into short / medium / long by character count"""
+    texts = {"short": [], "medium": [], "long": []}
+    for line in Path(path).read_text(encoding="utf-8").splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        bucket = "short" if len(line) <= short_max else "medium" if len(line) <= medium_max else "long"
+        texts[bucket].append(line)
+    return {k: v for k, v in texts.items() if v}
+
+
+def voice_supported(endpoint: str, voice: str) -> bool:
+    if voice == "none":
+        return endpoint in ("tts", "stream")
+    if voice.startswith("@"):
+        return endpoint in ("tts", "stream")
+    return endpoint in ("stream", "openai")
+
+
+def wav_duration(data: bytes) -> float:
+    """Total duration of one or more concatenated WAV files (streamed chunks)"""
+    seconds = 0.0
+    offset = 0
+    while offset + 12 <= len(data) and data[offset:offset + 4] == b"RIFF":
+        riff_end = min(len(data), offset + 8 + struct.unpack_from("<I", data, offset + 4)[0])
+        pos = offset + 12
+        byte_rate = 0
+        while pos + 8 <= riff_end:
+            chunk_id = data[pos:pos + 4]
+            size = struct.unpack_from("<I", data, pos + 4)[0]
+            if chunk_id == b"fmt ":
+                channels, sample_rate = struct.unpack_from("<HI", data, pos + 10)
+                bits = struct.unpack_from("<H", data, pos + 22)[0]
+                byte_rate = sample_rate * channels * bits // 8
+            elif chunk_id == b"data" and byte_rate:
+                seconds += min(size, riff_end - pos - 8) / byte_rate
+            pos += 8 + size + (size & 1)
+        offset = riff_end
+    return seconds
+
+
+class LoadGenerator:
+    def __init__(self, args):
+        self.args = args
+        self.endpoints = parse_mix(args.endpoints)
+        self.text_mix = parse_mix(args.text_mix)
+        self.voices = parse_mix(args.voices)
+        unknown = set(self.endpoints) - set(ENDPOINTS)
+        if unknown:
+            raise ValueError(f"Unknown endpoints {sorted(unknown)}, expected {sorted(ENDPOINTS)}")
+        self.texts = load_texts(args.text_file, args.short_max, args.medium_max) if args.text_file else TEXTS
+        missing = set(self.text_mix) - set(self.texts)
+        if missing:
+            raise ValueError(f"No texts for length classes {sorted(missing)}")
+        for endpoint in self.endpoints:
+            if not any(voice_supported(endpoint, v) for v in self.voices):
+                raise ValueError(f"No voice in --voices is usable with endpoint {endpoint!r}")
+        self.prompts = {v: Path(v[1:]).read_bytes() for v in self.voices if v.startswith("@")}
+        self.rng = random.Random(args.seed)
+
+    def _choice(self, mix: dict, allowed=None) -> str:
+        names = [n for n in mix if allowed is None or allowed(n)]
+        return self.rng.choices(names, weights=[mix[n] for n in names])[0]
+
+    def next_request(self) -> dict:
+        endpoint = self._choice(self.endpoints)
+        length = self._choice(self.text_mix)
+        voice = self._choice(self.voices, lambda v: voice_supported(endpoint, v))
+        return {"endpoint": endpoint, "length": length, "voice": voice,
+                "text": self.rng.choice(self.texts[length])}
+
+    def _build(self, req: dict) -> dict:
+        args = self.args
+        text, voice = req["text"], req["voice"]
+        if req["endpoint"] == "openai":
+            payload = {"model": args.openai_model, "input": text, "voice": voice,
+                       "response_format": args.openai_format}
+            return {"json": payload}
+        data = {"text": text, "inference_timesteps": str(args.timesteps), "cfg_value": str(args.cfg_value)}
+        if args.length_per_char > 0:
+            patches = max(2, math.ceil(len(text) * args.length_per_char))
+            data["min_len"] = data["max_len"] = str(patches)
+        files = None
+        if voice.startswith("@"):
+            files = {"prompt_audio": (Path(voice[1:]).name, self.prompts[voice], "audio/wav")}
+            data["prompt_text"] = args.prompt_text
+        elif voice != "none":
+            data["voice_id"] = voice
+        return {"data": data, "files": files}
+
+    async def send(self, client: httpx.AsyncClient, req: dict, scheduled: float) -> dict:
+        result = dict(req, text_chars=len(req["text"]), status=None, error=None, ttfb=None, latency=None,
+                      audio_seconds=None, bytes=0, dispatch_lag=time.perf_counter() - scheduled)
+        del result["text"]
+        body = bytearray()
+        try:
+            async with client.stream("POST", ENDPOINTS[req["endpoint"]], **self._build(req)) as response:
+                result["status"] = response.status_code
+                async for chunk in response.aiter_bytes():
+                    if chunk and result["ttfb"] is None:
+                        result["ttfb"] = time.perf_counter() - scheduled
+                    body.extend(chunk)
+            result["latency"] = time.perf_counter() - scheduled
+        except Exception as e:
+            result["error"] = type(e).__name__
+            return result
+        result["bytes"] = len(body)
+        if result["status"] >= 400:
+            result["error"] = f"HTTP {result['status']}"
+        elif not body:
+            result["error"] = "empty body"
+        else:
+            result["audio_seconds"] = self._audio_seconds(req["endpoint"], bytes(body))
+        return result
+
+    def _audio_seconds(self, endpoint: str, body: bytes):
+        if endpoint == "openai" and self.args.openai_format == "pcm":
+            return len(body) / 2 / self.args.pcm_sample_rate
+        if endpoint != "openai" or self.args.openai_format == "wav":
+            return wav_duration(body) or None
+        return None  # compressed formats: no duration without decoding
+
+    async def run_phase(self, client: httpx.AsyncClient, rate: float) -> dict:
+        """Fire Poisson arrivals at ``rate`` for ``--duration`` s (or ``--requests``), then drain"""
+        args = self.args
+        tasks = []
+        in_flight = peak = 0
+
+        async def tracked(req, scheduled):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            try:
+                return await self.send(client, req, scheduled)
+            finally:
+                in_flight -= 1
+
+        start = time.perf_counter()
+        arrival = start
+        while True:
+            arrival += self.rng.expovariate(rate)
+            if args.requests and len(tasks) >= args.requests:
+                break
+            if not args.requests and arrival - start > args.duration:
+                break
+            delay = arrival - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(tracked(self.next_request(), arrival)))
+        arrivals_end = time.perf_counter()
+        results = list(await asyncio.gather(*tasks))
+        end = time.perf_counter()
+        return {
+            "rate": rate,
+            "arrival_window_s": arrivals_end - start,
+            "wall_s": end - start,
+            "peak_in_flight": peak,
+            "summary": summarize(results, end - start, arrivals_end - start),
+            "requests": results,
+        }
+
+    async def run(self) -> dict:
+        args = self.args
+        limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+        timeout = httpx.Timeout(args.timeout, connect=30.0)
+        async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=timeout) as client:
+            for i in range(args.warmup):
+                result = await self.send(client, self.next_request(), time.perf_counter())
+                print(f"warmup {i + 1}/{args.warmup}: {result['error'] or 'ok'}")
+            phases = []
+            for rate in args.rates:
+                print(f"\n▶ rate {rate:g} req/s, {args.requests or f'{args.duration:g}s'}")
+                phase = await self.run_phase(client, rate)
+                print_summary(phase)
+                phases.append(phase)
+        return {"meta": vars(args), "phases": phases}
+
+
+def percentiles(values) -> dict:
+    values = [v for v in values if v is not None]
+    if not values:
+        return {"n": 0}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"n": len(values), "mean": float(np.mean(values)), "p50": float(p50), "p95": float(p95),
+            "p99": float(p99), "max": float(np.max(values))}
+
+
+def _group_stats(results: list, wall: float, window: float) -> dict:
+    ok = [r for r in results if r["error"] is None]
+    audio = sum(r["audio_seconds"] or 0.0 for r in ok)
+    rtf = [r["latency"] / r["audio_seconds"] for r in ok if r["audio_seconds"]]
+    return {
+        "requests": len(results),
+        "ok": len(ok),
+        "error_rate": (len(results) - len(ok)) / len(results) if results else 0.0,
+        "errors": dict(Counter(r["error"] for r in results if r["error"] is not None)),
+        "offered_rps": len(results) / window if window else 0.0,
+        "throughput_rps": len(ok) / wall if wall else 0.0,
+        "audio_s_per_s": audio / wall if wall else 0.0,
+        "ttfb": percentiles(r["ttfb"] for r in ok),
+        "latency": percentiles(r["latency"] for r in ok),
+        "rtf": percentiles(rtf),
+        "dispatch_lag": percentiles(r["dispatch_lag"] for r in results),
+    }
+
+
+def summarize(results: list, wall: float, window: float) -> dict:
+    summary = {"all": _group_stats(results, wall, window)}
+    for endpoint in sorted({r["endpoint"] for r in results}):
+        summary[endpoint] = _group_stats([r for r in results if r["endpoint"] == endpoint], wall, window)
+    for length in sorted({r["length"] for r in results}):
+        summary[f"text:{length}"] = _group_stats([r for r in results if r["length"] == length], wall, window)
+    return summary
+
+
+def _fmt(stats: dict, key: str) -> str:
+    return f"{stats[key] * 1000:8.0f}" if key in stats else f"{'-':>8}"
+
+
+def print_summary(phase: dict):
+    print(f"  wall {phase['wall_s']:.1f}s, peak in-flight {phase['peak_in_flight']}")
+    header = (f"  {'group':<14}{'n':>5}{'err%':>7}{'rps':>7}"
+              f"{'ttfb50':>8}{'ttfb95':>8}{'ttfb99':>8}{'lat50':>8}{'lat95':>8}{'lat99':>8}"
+              f"{'rtf50':>7}{'rtf95':>7}")
+    print(header + "   (ms)")
+    for group, s in phase["summary"].items():
+        rtf = s["rtf"]
+        rtf_cols = f"{rtf['p50']:7.2f}{rtf['p95']:7.2f}" if rtf["n"] else f"{'-':>7}{'-':>7}"
+        print(f"  {group:<14}{s['requests']:>5}{s['error_rate'] * 100:>6.1f}%{s['throughput_rps']:>7.2f}"
+              f"{_fmt(s['ttfb'], 'p50')}{_fmt(s['ttfb'], 'p95')}{_fmt(s['ttfb'], 'p99')}"
+              f"{_fmt(s['latency'], 'p50')}{_fmt(s['latency'], 'p95')}{_fmt(s['latency'], 'p99')}{rtf_cols}")
+        if s["errors"]:
+            print(f"  {'':<14}errors: {s['errors']}")
+    lag = phase["summary"]["all"]["dispatch_lag"]
+    if lag["n"] and lag["p99"] > 0.05:
+        print(f"  ⚠️  client dispatch lag p99 {lag['p99'] * 1000:.0f}ms: the load generator is saturated")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Open-loop load generator for the VoxCPM server")
+    parser.add_argument("--url", default="http://localhost:7861")
+    parser.add_argument("--rate", default="1", help="Arrival rate(s) in req/s; comma-separated values are swept")
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds of arrivals per rate")
+    parser.add_argument("--requests", type=int, default=0, help="Fixed number of arrivals per rate instead of --duration")
+    parser.add_argument("--warmup", type=int, default=1, help="Sequential unrecorded requests before the run")
+    parser.add_argument("--endpoints", default="tts:1,stream:1,openai:1", help="Endpoint mix (tts, stream, openai)")
+    parser.add_argument("--text_mix", default="short:2,medium:2,long:1", help="Text length mix")
+    parser.add_argument("--text_file", default="", help="One text per line, bucketed by length instead of built-ins")
+    parser.add_argument("--short_max", type=int, default=30, help="--text_file: max chars of a short text")
+    parser.add_argument("--medium_max", type=int, default=120, help="--text_file: max chars of a medium text")
+    parser.add_argument("--voices", default="none:1,default:1", help="Voice mix: none, preset ids, @file.wav")
+    parser.add_argument("--prompt_text", default="这是一个示例参考音频", help="Transcript sent with @file.wav prompts")
+    parser.add_argument("--timesteps", type=int, default=5, help="inference_timesteps for native endpoints")
+    parser.add_argument("--cfg_value", type=float, default=2.0)
+    parser.add_argument("--length_per_char", type=float, default=0.0,
+                        help="Pin min_len=max_len to this many patches per text char (stand-in model)")
+    parser.add_argument("--openai_model", default="tts-1")
+    parser.add_argument("--openai_format", default="wav", help="response_format; wav/pcm allow RTF")
+    parser.add_argument("--pcm_sample_rate", type=int, default=44100, help="Sample rate of pcm responses")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for arrivals and mixes")
+    parser.add_argument("--output", default="", help="Write summaries and per-request records as JSON")
+    args = parser.parse_args()
+    args.rates = [float(r) for r in args.rate.split(",") if r.strip()]
+    return args
+
+
+def main():
+    args = parse_args()
+    report = asyncio.run(LoadGenerator(args).run())
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, ensure_ascii=False, indent=1)
+        print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
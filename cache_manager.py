@@ -1,9 +1,20 @@
 import hashlib
 import json
+import os
+import re
+import struct
+import threading
+from collections import OrderedDict
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterable, Iterator, List, Tuple
+from voxcpm.utils.metrics import record_cache
 
 class CacheManager:
+    # Fingerprint index: resolved path -> (size, mtime_ns, digest); a file is only
+    # re-hashed when its size or mtime changes.
+    MAX_FINGERPRINTS = 4096
+    READ_SIZE = 1024 * 1024
+
     def __init__(self, cache_dir: str = "/app/cache"):
         self.cache_dir = Path(cache_dir)
         self.cache_dir.mkdir(exist_ok=True)
@@ -11,62 +22,253 @@ class CacheManager:
         self.audio_cache_dir = self.cache_dir / "audio"
         self.whisper_cache_dir.mkdir(exist_ok=True)
         self.audio_cache_dir.mkdir(exist_ok=True)
-        
-    def get_file_md5(self, file_path) -> str:
-        """Calculate MD5 hash of file"""
+        self._fingerprints: "OrderedDict[str, Tuple[int, int, str]]" = OrderedDict()
+        self._fingerprint_lock = threading.Lock()
+
+    @staticmethod
+    def _resolve_path(file_path) -> Path:
         # Handle Gradio file object or string path
         if hasattr(file_path, 'name'):
             file_path = file_path.name
         elif not isinstance(file_path, (str, Path)):
             file_path = str(file_path)
-        
-        if not Path(file_path).exists():
-            raise FileNotFoundError(f"File not found: {file_path}")
-            
-        md5_hash = hashlib.md5()
-        with open(file_path, "rb") as f:
-            for chunk in iter(lambda: f.read(4096), b""):
-                md5_hash.update(chunk)
-        return md5_hash.hexdigest()
-    
-    def get_whisper_cache(self, audio_path) -> Optional[str]:
+        return Path(file_path)
+
+    @staticmethod
+    def digest_bytes(data: bytes) -> str:
+        """Digest of in-memory content, identical to ``get_file_digest`` of the same bytes"""
+        return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+    def get_file_digest(self, file_path) -> str:
+        """Content digest of a file (blake2b-128), cached by path, size and mtime"""
+        path = self._resolve_path(file_path)
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            raise FileNotFoundError(f"File not found: {path}")
+        key = str(path.resolve())
+        with self._fingerprint_lock:
+            entry = self._fingerprints.get(key)
+            if entry is not None and entry[:2] == (stat.st_size, stat.st_mtime_ns):
+                self._fingerprints.move_to_end(key)
+                return entry[2]
+
+        hasher = hashlib.blake2b(digest_size=16)
+        buffer = bytearray(self.READ_SIZE)
+        view = memoryview(buffer)
+        with open(path, "rb", buffering=0) as f:
+            while True:
+                n = f.readinto(buffer)
+                if not n:
+                    break
+                hasher.update(view[:n])
+        digest = hasher.hexdigest()
+        self._remember_fingerprint(key, stat.st_size, stat.st_mtime_ns, digest)
+        return digest
+
+    def register_file(self, file_path, digest: str):
+        """Record the digest of a file just written from bytes that were already hashed"""
+        path = self._resolve_path(file_path)
+        stat = path.stat()
+        self._remember_fingerprint(str(path.resolve()), stat.st_size, stat.st_mtime_ns, digest)
+
+    def _remember_fingerprint(self, key: str, size: int, mtime_ns: int, digest: str):
+        with self._fingerprint_lock:
+            self._fingerprints[key] = (size, mtime_ns, digest)
+            self._fingerprints.move_to_end(key)
+            while len(self._fingerprints) > self.MAX_FINGERPRINTS:
+                self._fingerprints.popitem(last=False)
+
+    def get_whisper_cache(self, audio_path, digest: Optional[str] = None) -> Optional[str]:
         """Get cached Whisper transcription"""
         try:
-            md5 = self.get_file_md5(audio_path)
-            cache_file = self.whisper_cache_dir / f"{md5}.txt"
+            digest = digest or self.get_file_digest(audio_path)
+            cache_file = self.whisper_cache_dir / f"{digest}.txt"
             if cache_file.exists():
+                os.utime(cache_file)  # keep hits alive under LRU eviction
+                record_cache("transcript", True)
                 return cache_file.read_text(encoding='utf-8')
         except (FileNotFoundError, Exception):
             pass
+        record_cache("transcript", False)
         return None
     
-    def set_whisper_cache(self, audio_path, text: str):
+    def set_whisper_cache(self, audio_path, text: str, digest: Optional[str] = None):
         """Cache Whisper transcription"""
         try:
-            md5 = self.get_file_md5(audio_path)
-            cache_file = self.whisper_cache_dir / f"{md5}.txt"
+            digest = digest or self.get_file_digest(audio_path)
+            cache_file = self.whisper_cache_dir / f"{digest}.txt"
             cache_file.write_text(text, encoding='utf-8')
         except Exception:
             pass
     
-    def get_audio_cache(self, audio_path) -> Optional[Dict[str, Any]]:
+    def get_audio_cache(self, audio_path, digest: Optional[str] = None) -> Optional[Dict[str, Any]]:
         """Get cached audio metadata"""
         try:
-            md5 = self.get_file_md5(audio_path)
-            cache_file = self.audio_cache_dir / f"{md5}.json"
+            digest = digest or self.get_file_digest(audio_path)
+            cache_file = self.audio_cache_dir / f"{digest}.json"
             if cache_file.exists():
+                os.utime(cache_file)
                 return json.loads(cache_file.read_text())
         except Exception:
             pass
         return None
     
-    def set_audio_cache(self, audio_path, metadata: Dict[str, Any]):
+    def set_audio_cache(self, audio_path, metadata: Dict[str, Any], digest: Optional[str] = None):
         """Cache audio metadata"""
         try:
-            md5 = self.get_file_md5(audio_path)
-            cache_file = self.audio_cache_dir / f"{md5}.json"
+            digest = digest or self.get_file_digest(audio_path)
+            cache_file = self.audio_cache_dir / f"{digest}.json"
             cache_file.write_text(json.dumps(metadata, ensure_ascii=False))
         except Exception:
             pass
 
+
+class SynthesisCache:
+    """Content-addressed cache of finished synthesis outputs.
+
+    Only deterministic requests (explicit seed) are cached. An entry is the list
+    of response chunks exactly as they were sent, so streaming endpoints can
+    replay a hit chunk by chunk. Entries live in a memory LRU and in an on-disk
+    LRU (file mtime = last access); each tier is bounded in bytes, 0 disables it.
+    """
+
+    def __init__(self, cache_dir: str = "/app/cache/synthesis",
+                 max_memory_bytes: int = 256 * 1024**2, max_disk_bytes: int = 2 * 1024**3):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.lock = threading.Lock()
+        self._memory: "OrderedDict[str, List[bytes]]" = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_bytes = sum(f.stat().st_size for f in self.cache_dir.glob("*.bin"))
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(**fields) -> str:
+        """Key over everything that changes the output (text, voice, cfg, steps, seed, format, model)"""
+        payload = json.dumps(fields, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def normalize_text(text: str) -> str:
+        """Same whitespace folding VoxCPM applies before synthesis"""
+        return re.sub(r'\s+', ' ', text.replace("\n", " "))
+
+    def record(self, key: str, stream: Iterable[bytes]) -> Iterator[bytes]:
+        """Pass a response stream through and cache it once it completed"""
+        chunks = []
+        for chunk in stream:
+            chunks.append(chunk)
+            yield chunk
+        self.put_chunks(key, chunks)
+
+    @staticmethod
+    def _encode(chunks: List[bytes]) -> bytes:
+        return b"".join(struct.pack(">I", len(c)) + c for c in chunks)
+
+    @staticmethod
+    def _decode(data: bytes) -> List[bytes]:
+        chunks, pos = [], 0
+        while pos < len(data):
+            (size,) = struct.unpack_from(">I", data, pos)
+            chunks.append(data[pos + 4:pos + 4 + size])
+            pos += 4 + size
+        return chunks
+
+    def get_chunks(self, key: str) -> Optional[List[bytes]]:
+        with self.lock:
+            chunks = self._memory.get(key)
+            if chunks is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                record_cache("synthesis", True)
+                return chunks
+        path = self.cache_dir / f"{key}.bin"
+        try:
+            chunks = self._decode(path.read_bytes())
+            os.utime(path)  # refresh LRU position
+        except (FileNotFoundError, struct.error):
+            with self.lock:
+                self.misses += 1
+            record_cache("synthesis", False)
+            return None
+        with self.lock:
+            self.hits += 1
+            self._remember(key, chunks)
+        record_cache("synthesis", True)
+        return chunks
+
+    def put_chunks(self, key: str, chunks: List[bytes]):
+        data = self._encode(chunks)
+        with self.lock:
+            self._remember(key, chunks)
+        if self.max_disk_bytes <= 0 or len(data) > self.max_disk_bytes:
+            return
+        path = self.cache_dir / f"{key}.bin"
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        try:
+            existed = path.exists()
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            return
+        with self.lock:
+            if not existed:
+                self._disk_bytes += len(data)
+            if self._disk_bytes > self.max_disk_bytes:
+                self._evict_disk()
+
+    def get(self, key: str) -> Optional[bytes]:
+        chunks = self.get_chunks(key)
+        return b"".join(chunks) if chunks is not None else None
+
+    def put(self, key: str, data: bytes):
+        self.put_chunks(key, [data])
+
+    def _remember(self, key: str, chunks: List[bytes]):
+        size = sum(len(c) for c in chunks)
+        if size > self.max_memory_bytes:
+            return
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= sum(len(c) for c in old)
+        self._memory[key] = chunks
+        self._memory_bytes += size
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= sum(len(c) for c in evicted)
+
+    def _evict_disk(self):
+        files = sorted(self.cache_dir.glob("*.bin"), key=lambda f: f.stat().st_mtime)
+        total = sum(f.stat().st_size for f in files)
+        for f in files:
+            if total <= self.max_disk_bytes * 0.9:
+                break
+            try:
+                size = f.stat().st_size
+                f.unlink()
+                total -= size
+            except OSError:
+                pass
+        self._disk_bytes = total
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "disk_bytes": self._disk_bytes,
+            }
+
+
 cache_manager = CacheManager()
+synthesis_cache = SynthesisCache(
+    cache_dir=str(cache_manager.cache_dir / "synthesis"),
+    max_memory_bytes=int(os.getenv("SYNTHESIS_CACHE_MEMORY_MB", "256")) * 1024**2,
+    max_disk_bytes=int(os.getenv("SYNTHESIS_CACHE_DISK_MB", "2048")) * 1024**2,
+)
@@ -24,7 +24,7 @@ default_pretrained_path = str(project_root / "models" / "openbmb__VoxCPM1.5")
 from voxcpm.core import VoxCPM
 from voxcpm.model.voxcpm import LoRAConfig
 import numpy as np
-from funasr import AutoModel
+from asr_service import get_asr_service
 
 # --- Localization ---
 LANG_DICT = {
@@ -94,34 +94,17 @@ LANG_DICT = {
 
 # Global variables
 current_model: Optional[VoxCPM] = None
-asr_model: Optional[AutoModel] = None
 training_process: Optional[subprocess.Popen] = None
 training_log = ""
 
 def get_timestamp_str():
     return datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
 
-def get_or_load_asr_model():
-    global asr_model
-    if asr_model is None:
-        print("Loading ASR model (SenseVoiceSmall)...")
-        device = "cuda:0" if torch.cuda.is_available() else "cpu"
-        asr_model = AutoModel(
-            model="iic/SenseVoiceSmall",
-            disable_update=True,
-            log_level='ERROR',
-            device=device,
-        )
-    return asr_model
-
 def recognize_audio(audio_path):
     if not audio_path:
         return ""
     try:
-        model = get_or_load_asr_model()
-        res = model.generate(input=audio_path, language="auto", use_itn=True)
-        text = res[0]["text"].split('|>')[-1]
-        return text
+        return get_asr_service(backend="sensevoice").transcribe(audio_path)
     except Exception as e:
         print(f"ASR Error: {e}")
         return ""
@@ -1,6 +1,8 @@
 #!/usr/bin/env python3
 import os
 import sys
+import time
+import uuid
 import soundfile as sf
 import torch
 from pathlib import Path
@@ -8,6 +10,7 @@ from typing import Optional
 from fastmcp import FastMCP
 from gpu_manager import gpu_manager
 import voxcpm
+from voxcpm.scheduler import stream_scheduler
 
 mcp = FastMCP("VoxCPM")
 
@@ -54,7 +57,9 @@ def text_to_speech(
     try:
         model = gpu_manager.get_model(load_model)
         
-        wav = model.generate(
+        wav = stream_scheduler.run(
+            model,
+            model.generate,
             text=text,
             cfg_value=cfg_value,
             inference_timesteps=inference_timesteps,
@@ -68,7 +73,7 @@ def text_to_speech(
         )
         
         if output_path is None:
-            output_path = str(OUTPUT_DIR / f"tts_{int(time.time())}.wav")
+            output_path = str(OUTPUT_DIR / f"tts_{int(time.time())}_{uuid.uuid4().hex}.wav")
         
         sf.write(output_path, wav, model.tts_model.sample_rate)
         
@@ -125,7 +130,9 @@ def voice_cloning(
         
         model = gpu_manager.get_model(load_model)
         
-        wav = model.generate(
+        wav = stream_scheduler.run(
+            model,
+            model.generate,
             text=text,
             prompt_wav_path=reference_audio,
             prompt_text=reference_text,
@@ -141,7 +148,7 @@ def voice_cloning(
         )
         
         if output_path is None:
-            output_path = str(OUTPUT_DIR / f"clone_{int(time.time())}.wav")
+            output_path = str(OUTPUT_DIR / f"clone_{int(time.time())}_{uuid.uuid4().hex}.wav")
         
         sf.write(output_path, wav, model.tts_model.sample_rate)
         
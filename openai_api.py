@@ -4,6 +4,7 @@ Implements /v1/audio/speech endpoint with full OpenAI compatibility
 """
 import os
 import time
+import asyncio
 import io
 import json
 import hashlib
@@ -14,7 +15,12 @@ from fastapi.responses import StreamingResponse, Response
 from pydantic import BaseModel, Field
 from typing import Literal, Optional
 from gpu_manager import gpu_manager
+from cache_manager import cache_manager, synthesis_cache
+from asr_service import get_asr_service
 import voxcpm
+from voxcpm.scheduler import stream_scheduler
+from voxcpm.utils.metrics import instrument_stream, stage_timer
+from voxcpm.utils.tracing import span
 
 router = APIRouter(prefix="/v1", tags=["OpenAI Compatible"])
 
@@ -80,10 +86,16 @@ class SpeechRequest(BaseModel):
     voice: str = Field(default="alloy")  # 支持预设或自定义 voice_id
     response_format: Optional[Literal["mp3", "opus", "aac", "flac", "wav", "pcm"]] = Field(default="mp3")
     speed: Optional[float] = Field(default=1.0, ge=0.25, le=4.0)
+    # Extension: fixed seed makes the output deterministic and cacheable
+    seed: Optional[int] = Field(default=None)
 
 def load_model():
+    tiny_preset = os.getenv("VOXCPM_TINY_MODEL", "")
+    if tiny_preset:
+        from voxcpm.benchmark import build_tiny_pipeline
+        return build_tiny_pipeline(tiny_preset)
     model_path = os.getenv("HF_REPO_ID", "openbmb/VoxCPM1.5")
-    return voxcpm.VoxCPM.from_pretrained(model_path)
+    return voxcpm.VoxCPM.from_pretrained(model_path).configure_vae_from_env()
 
 def convert_audio_format(wav_data: bytes, sample_rate: int, target_format: str) -> bytes:
     """Convert WAV audio to target format"""
@@ -119,7 +131,8 @@ def convert_audio_format(wav_data: bytes, sample_rate: int, target_format: str)
             cmd.extend(["-codec:a", "flac"])
         
         cmd.append(out_path)
-        subprocess.run(cmd, check=True, capture_output=True)
+        with span("ffmpeg_convert", format=target_format):
+            subprocess.run(cmd, check=True, capture_output=True)
         
         with open(out_path, "rb") as f:
             return f.read()
@@ -135,6 +148,7 @@ async def create_speech(request: SpeechRequest):
     Generates audio from input text with streaming support
     Supports both preset voices (alloy, echo, etc.) and custom voice IDs
     """
+    start = time.perf_counter()
     try:
         # Get voice configuration (preset or custom)
         preset = get_voice_config(request.voice)
@@ -142,9 +156,6 @@ async def create_speech(request: SpeechRequest):
         if not preset or not Path(preset["path"]).exists():
             raise HTTPException(status_code=400, detail=f"Voice '{request.voice}' not available")
         
-        # Load model
-        model = gpu_manager.get_model(load_model)
-        
         # Adjust inference steps based on model quality
         if request.model == "tts-1":
             inference_timesteps = 5  # Fast mode
@@ -153,9 +164,38 @@ async def create_speech(request: SpeechRequest):
         else:  # gpt-4o-mini-tts
             inference_timesteps = 7  # Balanced
         
-        # Generate audio
+        # Determine media type
+        media_types = {
+            "mp3": "audio/mpeg",
+            "opus": "audio/opus",
+            "aac": "audio/aac",
+            "flac": "audio/flac",
+            "wav": "audio/wav",
+            "pcm": "audio/pcm"
+        }
+        media_type = media_types.get(request.response_format, "audio/wav")
+        
+        # Loaded first: the cache key includes what the loaded model is (weights, LoRA, VAE precision)
+        model = gpu_manager.get_model(load_model)
         sample_rate = model.tts_model.sample_rate
         
+        cache_key = None
+        if request.seed is not None:
+            cache_key = synthesis_cache.make_key(
+                endpoint="openai_speech",
+                model=model.identity,
+                text=synthesis_cache.normalize_text(request.input),
+                prompt=cache_manager.get_file_digest(preset["path"]),
+                prompt_text=preset["text"],
+                cfg_value=2.0,
+                inference_timesteps=inference_timesteps,
+                seed=request.seed,
+                format=request.response_format,
+            )
+            cached_chunks = synthesis_cache.get_chunks(cache_key)
+            if cached_chunks is not None:
+                return StreamingResponse(iter(cached_chunks), media_type=media_type, headers={"X-Cache": "HIT"})
+        
         def audio_stream():
             import numpy as np
             
@@ -165,7 +205,8 @@ async def create_speech(request: SpeechRequest):
                 dc_offset = 0.0  # 累积的 DC offset 估计
                 alpha = 0.001   # DC offset 更新系数（低通滤波）
                 
-                for wav_chunk in model.generate_streaming(
+                for wav_chunk in stream_scheduler.submit(
+                    model,
                     text=request.input,
                     prompt_wav_path=preset["path"],
                     prompt_text=preset["text"],
@@ -176,6 +217,7 @@ async def create_speech(request: SpeechRequest):
                     normalize=False,
                     denoise=False,
                     retry_badcase=False,
+                    seed=request.seed,
                 ):
                     # 使用滑动平均更新 DC offset 估计
                     chunk_mean = np.mean(wav_chunk)
@@ -192,12 +234,15 @@ async def create_speech(request: SpeechRequest):
                         is_first_chunk = False
                     
                     # Convert float32 to int16 PCM
-                    pcm_data = (wav_chunk * 32767).astype(np.int16)
-                    yield pcm_data.tobytes()
+                    with stage_timer("format_encode"):
+                        pcm_data = (wav_chunk * 32767).astype(np.int16).tobytes()
+                    yield pcm_data
             else:
                 # WAV/MP3: must collect all chunks for correct header
                 all_chunks = []
-                for wav_chunk in model.generate_streaming(
+                for wav_chunk in stream_scheduler.submit(
+                    model,
+                    playback=False,
                     text=request.input,
                     prompt_wav_path=preset["path"],
                     prompt_text=preset["text"],
@@ -208,43 +253,45 @@ async def create_speech(request: SpeechRequest):
                     normalize=False,
                     denoise=False,
                     retry_badcase=False,
+                    seed=request.seed,
                 ):
                     all_chunks.append(wav_chunk)
                 
                 full_audio = np.concatenate(all_chunks)
                 
-                if request.response_format == "wav":
-                    buffer = io.BytesIO()
-                    sf.write(buffer, full_audio, sample_rate, format='WAV', subtype='PCM_16')
-                    buffer.seek(0)
-                    yield buffer.read()
-                else:
+                with stage_timer("format_encode"):
                     buffer = io.BytesIO()
                     sf.write(buffer, full_audio, sample_rate, format='WAV', subtype='PCM_16')
                     buffer.seek(0)
                     wav_data = buffer.read()
-                    try:
-                        converted = convert_audio_format(wav_data, sample_rate, request.response_format)
-                        yield converted
-                    except Exception as e:
-                        yield wav_data
-        
-        # Determine media type
-        media_types = {
-            "mp3": "audio/mpeg",
-            "opus": "audio/opus",
-            "aac": "audio/aac",
-            "flac": "audio/flac",
-            "wav": "audio/wav",
-            "pcm": "audio/pcm"
-        }
-        media_type = media_types.get(request.response_format, "audio/wav")
+                    if request.response_format != "wav":
+                        # Raising ends the stream unrecorded: WAV bytes must never be
+                        # served (or cached) as mp3/opus/aac
+                        wav_data = convert_audio_format(wav_data, sample_rate, request.response_format)
+                yield wav_data
         
-        return StreamingResponse(audio_stream(), media_type=media_type)
+        stream = audio_stream() if cache_key is None else synthesis_cache.record(cache_key, audio_stream())
+        return StreamingResponse(instrument_stream(stream, "/v1/audio/speech", start), media_type=media_type)
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/audio/transcriptions")
+async def create_transcription(
+    file: UploadFile = File(..., description="音频文件"),
+    model: str = Form("asr", description="兼容字段，使用服务端配置的 ASR 模型"),
+):
+    """
+    OpenAI 兼容的语音识别接口
+    请求由共享 ASR 服务合批处理，结果按音频内容哈希缓存
+    """
+    try:
+        content = await file.read()
+        text = await asyncio.wrap_future(get_asr_service().submit(content))
+        return {"text": text.strip()}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/models")
 async def list_models():
     """List available TTS models (OpenAI compatible)"""
@@ -297,7 +344,7 @@ async def list_voices():
 async def create_voice(
     audio: UploadFile = File(..., description="参考音频文件 (WAV/MP3)"),
     name: str = Form(..., description="音色名称"),
-    text: str = Form(..., description="音频对应的文本内容")
+    text: Optional[str] = Form(None, description="音频对应的文本内容 (留空则自动识别)")
 ):
     """
     上传音频创建自定义音色
@@ -333,6 +380,11 @@ async def create_voice(
             with open(audio_path, 'wb') as f:
                 f.write(content)
         
+        # 未提供文本时自动识别
+        if not text or not text.strip():
+            text = await asyncio.wrap_future(get_asr_service().submit(content))
+            text = text.strip()
+        
         # 保存到数据库
         custom_voices = load_custom_voices()
         custom_voices[voice_id] = {
@@ -347,6 +399,7 @@ async def create_voice(
             "success": True,
             "voice_id": voice_id,
             "name": name,
+            "text": text,
             "message": f"音色创建成功，使用 voice='{voice_id}' 调用 /v1/audio/speech"
         }
         
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for AudioVAE feature extraction in the training packer.
+
+Builds a randomly initialized AudioVAE (no checkpoint needed), packs batches of
+mixed-length random waveforms with ``AudioFeatureProcessingPacker`` and reports
+packed batches/s and audio seconds/s for different ``encode_batch_size`` values
+(1 = the old one-encoder-call-per-sample path).
+
+Usage:
+
+    python scripts/benchmark_vae_encode.py --batch_size 16 --min_seconds 1 --max_seconds 20
+
+With the VAE of a downloaded model:
+
+    python scripts/benchmark_vae_encode.py --model_dir /path/to/VoxCPM1.5 --encode_batch_sizes 1 4 16
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / "src"))
+
+import torch
+
+from voxcpm.modules.audiovae import AudioVAE, AudioVAEConfig
+from voxcpm.training.packers import AudioFeatureProcessingPacker
+
+
+def parse_args():
+    parser = argparse.ArgumentParser("AudioVAE packer encode throughput benchmark")
+    parser.add_argument("--model_dir", type=str, default="", help="Optional: model dir with config.json / audiovae.pth")
+    parser.add_argument("--batch_size", type=int, default=16, help="Samples per packed batch")
+    parser.add_argument("--min_seconds", type=float, default=1.0, help="Shortest random clip")
+    parser.add_argument("--max_seconds", type=float, default=20.0, help="Longest random clip")
+    parser.add_argument("--encode_batch_sizes", type=int, nargs="+", default=[1, 4, 8, 16])
+    parser.add_argument("--iters", type=int, default=5, help="Timed batches per setting")
+    parser.add_argument("--warmup", type=int, default=1, help="Untimed batches per setting")
+    parser.add_argument("--device", type=str, default="cuda" if torch.cuda.is_available() else "cpu")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+def load_audio_vae(model_dir: str) -> AudioVAE:
+    if not model_dir:
+        return AudioVAE()
+    config = json.loads(Path(model_dir, "config.json").read_text())
+    vae_config = config.get("audio_vae_config")
+    audio_vae = AudioVAE(config=AudioVAEConfig(**vae_config) if vae_config else None)
+    vae_path = os.path.join(model_dir, "audiovae.pth")
+    if os.path.exists(vae_path):
+        audio_vae.load_state_dict(torch.load(vae_path, map_location="cpu", weights_only=True)["state_dict"])
+    return audio_vae
+
+
+def random_batch(args, sample_rate: int, generator: torch.Generator):
+    """Mimic ``HFVoxCPMDataset.collate_fn``: -100 padded audio and text rows."""
+    seconds = torch.empty(args.batch_size).uniform_(args.min_seconds, args.max_seconds, generator=generator)
+    lengths = (seconds * sample_rate).long().tolist()
+    audio = torch.full((args.batch_size, max(lengths)), -100.0)
+    for i, length in enumerate(lengths):
+        audio[i, :length] = torch.rand(length, generator=generator) * 2 - 1
+    text = torch.randint(1000, 2000, (args.batch_size, 32), generator=generator, dtype=torch.int32)
+    return audio, text, sum(lengths) / sample_rate
+
+
+def synchronize(device: str):
+    if device.startswith("cuda"):
+        torch.cuda.synchronize()
+
+
+def main():
+    args = parse_args()
+    audio_vae = load_audio_vae(args.model_dir).to(args.device).eval()
+    generator = torch.Generator().manual_seed(args.seed)
+    batches = [random_batch(args, audio_vae.sample_rate, generator) for _ in range(args.warmup + args.iters)]
+
+    print(f"device={args.device}, batch_size={args.batch_size}, clip length {args.min_seconds}-{args.max_seconds}s")
+    results = []
+    for encode_batch_size in args.encode_batch_sizes:
+        packer = AudioFeatureProcessingPacker(
+            dataset_cnt=1,
+            max_len=1 << 20,
+            patch_size=2,
+            feat_dim=audio_vae.latent_dim,
+            audio_vae=audio_vae,
+            encode_batch_size=encode_batch_size,
+        )
+        elapsed, audio_seconds = 0.0, 0.0
+        for i, (audio, text, seconds) in enumerate(batches):
+            audio, text = audio.to(args.device), text.to(args.device)
+            task_ids = torch.ones(args.batch_size, dtype=torch.int32, device=args.device)
+            dataset_ids = torch.zeros(args.batch_size, dtype=torch.int32, device=args.device)
+            synchronize(args.device)
+            start = time.perf_counter()
+            packer(audio, text, task_ids, dataset_ids, [False] * args.batch_size)
+            synchronize(args.device)
+            if i >= args.warmup:
+                elapsed += time.perf_counter() - start
+                audio_seconds += seconds
+        result = {
+            "encode_batch_size": encode_batch_size,
+            "batches_per_s": args.iters / elapsed,
+            "audio_seconds_per_s": audio_seconds / elapsed,
+        }
+        results.append(result)
+        print(
+            f"encode_batch_size={encode_batch_size:>3}: {result['batches_per_s']:.2f} batches/s, "
+            f"{result['audio_seconds_per_s']:.1f} audio s/s"
+        )
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Pre-extract AudioVAE latents and text ids for fine-tuning.
+
+The VAE is frozen during fine-tuning, so encoding the training audio once and
+pointing ``train_voxcpm_finetune.py`` at the cache (``latent_cache`` /
+``val_latent_cache``) removes audio decoding and VAE encoding from every epoch.
+
+Usage:
+
+    python scripts/preextract_latents.py \\
+        --pretrained_path /path/to/VoxCPM1.5 \\
+        --manifest /path/to/train.jsonl \\
+        --output_dir /path/to/latents/train
+
+Run it once per manifest (train / validation). The cache is tied to the model's
+AudioVAE and tokenizer; re-extract when switching base models.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / "src"))
+
+import torch
+
+from voxcpm.model import VoxCPMModel
+from voxcpm.training import LatentShardWriter
+from voxcpm.training.data import DEFAULT_AUDIO_COLUMN, DEFAULT_ID_COLUMN, load_audio_text_datasets
+from voxcpm.training.packers import AudioFeatureProcessingPacker
+
+
+def parse_args():
+    parser = argparse.ArgumentParser("Pre-extract AudioVAE latents for VoxCPM fine-tuning")
+    parser.add_argument("--pretrained_path", type=str, required=True, help="Base model directory")
+    parser.add_argument("--manifest", type=str, required=True, help="JSONL manifest (same format as training)")
+    parser.add_argument("--output_dir", type=str, required=True, help="Cache directory to write")
+    parser.add_argument("--sample_rate", type=int, default=16_000, help="Must match the training sample_rate")
+    parser.add_argument("--text_column", type=str, default="text")
+    parser.add_argument("--audio_column", type=str, default="audio")
+    parser.add_argument("--dataset_id_column", type=str, default="dataset_id")
+    parser.add_argument("--batch_size", type=int, default=16, help="Waveforms per VAE encoder call")
+    parser.add_argument("--shard_frames", type=int, default=1 << 20, help="Latent frames per shard file")
+    parser.add_argument("--dtype", type=str, default="float32", choices=["float32", "float16"])
+    parser.add_argument("--device", type=str, default="cuda" if torch.cuda.is_available() else "cpu")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    model = VoxCPMModel.from_local(args.pretrained_path, optimize=False, training=True)
+    tokenizer = model.text_tokenizer
+    audio_vae = model.audio_vae.to(args.device).eval()
+    packer = AudioFeatureProcessingPacker(
+        dataset_cnt=1,
+        max_len=model.config.max_length,
+        patch_size=model.config.patch_size,
+        feat_dim=model.config.feat_dim,
+        audio_vae=audio_vae,
+        encode_batch_size=args.batch_size,
+    )
+    del model
+
+    ds, _ = load_audio_text_datasets(
+        train_manifest=args.manifest,
+        text_column=args.text_column,
+        audio_column=args.audio_column,
+        dataset_id_column=args.dataset_id_column,
+        sample_rate=args.sample_rate,
+    )
+    has_prompt = "is_prompt" in ds.column_names
+
+    writer = LatentShardWriter(
+        args.output_dir,
+        feat_dim=packer.feat_dim,
+        hop_length=audio_vae.hop_length,
+        sample_rate=audio_vae.sample_rate,
+        patch_size=packer.patch_size,
+        shard_frames=args.shard_frames,
+        dtype=args.dtype,
+    )
+
+    start = time.perf_counter()
+    with writer:
+        for begin in range(0, len(ds), args.batch_size):
+            rows = ds[begin : begin + args.batch_size]
+            wavs = [
+                torch.tensor(audio["array"], dtype=torch.float32, device=args.device)
+                for audio in rows[DEFAULT_AUDIO_COLUMN]
+            ]
+            feats = packer.encode_audio_batch(wavs)
+            for i, feat in enumerate(feats):
+                writer.add(
+                    feat,
+                    tokenizer(rows["text"][i]),
+                    dataset_id=rows[DEFAULT_ID_COLUMN][i],
+                    is_prompt=bool(rows["is_prompt"][i]) if has_prompt else False,
+                )
+            print(f"\r{min(begin + args.batch_size, len(ds))}/{len(ds)} samples", end="", flush=True)
+    print(f"\nWrote {len(writer)} samples to {args.output_dir} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
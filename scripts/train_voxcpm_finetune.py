@@ -30,16 +30,21 @@ from voxcpm.training import (
     Accelerator,
     BatchProcessor,
     TrainingTracker,
+    LatentShardDataset,
+    LengthBucketedBatchSampler,
     build_dataloader,
     load_audio_text_datasets,
 )
+from voxcpm.training.latents import check_cache_compatible
 
 
 @argbind.bind(without_prefix=True)
 def train(
     pretrained_path: str,
-    train_manifest: str,
+    train_manifest: str = "",
     val_manifest: str = "",
+    latent_cache: str = "",
+    val_latent_cache: str = "",
     sample_rate: int = 16_000,
     batch_size: int = 1,
     grad_accum_steps: int = 1,
@@ -53,6 +58,9 @@ def train(
     warmup_steps: int = 1_000,
     max_steps: int = 100_000,
     max_batch_tokens: int = 0,
+    bucket_by_length: bool = False,
+    pack_sequences: bool = False,
+    encode_batch_size: int = 8,
     save_path: str = "checkpoints",
     tensorboard: str = "",
     lambdas: Dict[str, float] = {"loss/diff": 1.0, "loss/stop": 1.0},
@@ -67,6 +75,10 @@ def train(
     # Validate distribution options
     if lora is not None and distribute and not hf_model_id:
         raise ValueError("hf_model_id is required when distribute=True")
+    if not train_manifest and not latent_cache:
+        raise ValueError("Either train_manifest or latent_cache is required")
+    if bucket_by_length and max_batch_tokens <= 0:
+        raise ValueError("bucket_by_length requires max_batch_tokens > 0")
     
     accelerator = Accelerator(amp=True)
 
@@ -85,22 +97,36 @@ def train(
     base_model = VoxCPMModel.from_local(pretrained_path, optimize=False, training=True, lora_config=LoRAConfig(**lora) if lora else None)
     tokenizer = base_model.text_tokenizer
 
-    train_ds, val_ds = load_audio_text_datasets(
-        train_manifest=train_manifest,
-        val_manifest=val_manifest,
-        sample_rate=sample_rate,
-    )
+    if latent_cache:
+        # Latents pre-extracted by scripts/preextract_latents.py: no audio decode / VAE encode per step
+        train_ds = LatentShardDataset(latent_cache)
+        val_ds = LatentShardDataset(val_latent_cache) if val_latent_cache else None
+        for ds in (train_ds, val_ds):
+            if ds is not None:
+                check_cache_compatible(
+                    ds,
+                    feat_dim=base_model.config.feat_dim,
+                    hop_length=base_model.audio_vae.hop_length,
+                    sample_rate=base_model.audio_vae.sample_rate,
+                )
+        dataset_cnt = train_ds.dataset_cnt
+    else:
+        train_ds, val_ds = load_audio_text_datasets(
+            train_manifest=train_manifest,
+            val_manifest=val_manifest,
+            sample_rate=sample_rate,
+        )
 
-    def tokenize(batch):
-        text_list = batch["text"]
-        text_ids = [tokenizer(text) for text in text_list]
-        return {"text_ids": text_ids}
+        def tokenize(batch):
+            text_list = batch["text"]
+            text_ids = [tokenizer(text) for text in text_list]
+            return {"text_ids": text_ids}
 
-    train_ds = train_ds.map(tokenize, batched=True, remove_columns=["text"])
-    if val_ds is not None:
-        val_ds = val_ds.map(tokenize, batched=True, remove_columns=["text"])
+        train_ds = train_ds.map(tokenize, batched=True, remove_columns=["text"])
+        if val_ds is not None:
+            val_ds = val_ds.map(tokenize, batched=True, remove_columns=["text"])
 
-    dataset_cnt = int(max(train_ds["dataset_id"])) + 1 if "dataset_id" in train_ds.column_names else 1
+        dataset_cnt = int(max(train_ds["dataset_id"])) + 1 if "dataset_id" in train_ds.column_names else 1
     num_train_samples = len(train_ds)
 
     # ------------------------------------------------------------------ #
@@ -108,17 +134,26 @@ def train(
     # Enabled when max_batch_tokens > 0:
     #   max_sample_len = max_batch_tokens // batch_size
     #   Samples exceeding this length will be dropped
+    # With bucket_by_length, batches are formed by token budget instead of
+    # batch_size, so only samples that do not fit a batch on their own are dropped.
     # ------------------------------------------------------------------ #
+    est_lengths = None
     if max_batch_tokens and max_batch_tokens > 0:
         from voxcpm.training.data import compute_sample_lengths
 
-        audio_vae_fps = base_model.audio_vae.sample_rate / base_model.audio_vae.hop_length
-        est_lengths = compute_sample_lengths(
-            train_ds,
-            audio_vae_fps=audio_vae_fps,
-            patch_size=base_model.config.patch_size,
-        )
-        max_sample_len = max_batch_tokens // batch_size if batch_size > 0 else max(est_lengths)
+        if isinstance(train_ds, LatentShardDataset):
+            est_lengths = train_ds.sample_lengths(patch_size=base_model.config.patch_size)
+        else:
+            audio_vae_fps = base_model.audio_vae.sample_rate / base_model.audio_vae.hop_length
+            est_lengths = compute_sample_lengths(
+                train_ds,
+                audio_vae_fps=audio_vae_fps,
+                patch_size=base_model.config.patch_size,
+            )
+        if bucket_by_length:
+            max_sample_len = min(max_batch_tokens, base_model.config.max_length)
+        else:
+            max_sample_len = max_batch_tokens // batch_size if batch_size > 0 else max(est_lengths)
         keep_indices = [i for i, L in enumerate(est_lengths) if L <= max_sample_len]
 
         if len(keep_indices) < len(train_ds) and accelerator.rank == 0:
@@ -128,6 +163,19 @@ def train(
                 f"(max_batch_tokens={max_batch_tokens})."
             )
         train_ds = train_ds.select(keep_indices)
+        est_lengths = [est_lengths[i] for i in keep_indices]
+
+    train_sampler = None
+    if bucket_by_length:
+        train_sampler = LengthBucketedBatchSampler(
+            est_lengths,
+            max_batch_tokens,
+            packed=pack_sequences,
+            num_replicas=accelerator.world_size,
+            rank=accelerator.rank,
+            drop_last=True,
+        )
+    batches_per_epoch = len(train_sampler) if train_sampler is not None else 0
 
     train_loader = build_dataloader(
         train_ds,
@@ -135,6 +183,7 @@ def train(
         batch_size=batch_size,
         num_workers=num_workers,
         drop_last=True,
+        batch_sampler=train_sampler,
     )
     val_loader = (
         build_dataloader(
@@ -153,6 +202,8 @@ def train(
         audio_vae=base_model.audio_vae,
         dataset_cnt=dataset_cnt,
         device=accelerator.device,
+        encode_batch_size=encode_batch_size,
+        pack_sequences=pack_sequences,
     )
     del base_model.audio_vae
     model = accelerator.prepare_model(base_model)
@@ -226,10 +277,10 @@ def train(
             return next(train_iter)
         except StopIteration:
             data_epoch += 1
-            # Key: set DistributedSampler epoch to ensure different data order each epoch
-            sampler = getattr(train_loader, 'sampler', None)
-            if hasattr(sampler, 'set_epoch'):
-                sampler.set_epoch(data_epoch)
+            # Key: set DistributedSampler (or bucketed batch sampler) epoch to ensure different data order each epoch
+            for sampler in (getattr(train_loader, 'sampler', None), getattr(train_loader, 'batch_sampler', None)):
+                if hasattr(sampler, 'set_epoch'):
+                    sampler.set_epoch(data_epoch)
             train_iter = iter(train_loader)
             return next(train_iter)
 
@@ -262,6 +313,7 @@ def train(
                             processed["position_ids"],
                             processed["labels"],
                             progress=step / max(1, num_iters),
+                            segment_ids=processed.get("segment_ids"),
                         )
 
                     total_loss = 0.0
@@ -290,8 +342,12 @@ def train(
             if step % log_interval == 0:
                 loss_values = {k: v.item() if isinstance(v, torch.Tensor) else float(v) for k, v in loss_dict.items()}
                 loss_values["lr"] = float(optimizer.param_groups[0]["lr"])
-                # Approximate epoch: seen samples / total samples (considering grad_accum and batch_size)
-                epoch = (step * grad_accum_steps * batch_size) / max(1, num_train_samples)
+                if train_sampler is not None:
+                    # Bucketed batches vary in size; count epochs in batches instead
+                    epoch = (step * grad_accum_steps) / max(1, batches_per_epoch)
+                else:
+                    # Approximate epoch: seen samples / total samples (considering grad_accum and batch_size)
+                    epoch = (step * grad_accum_steps * batch_size) / max(1, num_train_samples)
                 loss_values["epoch"] = float(epoch)
                 loss_values["grad_norm"] = float(grad_norm)
                 tracker.log_metrics(loss_values, split="train")
@@ -330,6 +386,7 @@ def validate(model, val_loader, batch_processor, accelerator, tracker, lambdas):
                     processed["labels"],
                     progress=0.0,
                     sample_generate=False,
+                    segment_ids=processed.get("segment_ids"),
                 )
             total = 0.0
             for key, value in outputs.items():
@@ -1,52 +1,87 @@
 import os
 import time
+import asyncio
 import soundfile as sf
 from pathlib import Path
-from fastapi import FastAPI, File, UploadFile, Form, HTTPException
-from fastapi.responses import FileResponse, StreamingResponse
+from fastapi import FastAPI, File, UploadFile, Form, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 import gradio as gr
 import uvicorn
 from gpu_manager import gpu_manager
-from cache_manager import cache_manager
+from cache_manager import cache_manager, synthesis_cache
+from storage_manager import storage_manager, IN_MEMORY_RESPONSES
+from asr_service import get_asr_service
 import voxcpm
+from voxcpm.utils.metrics import (
+    QUEUE_WAIT, REGISTRY, REQUEST_SECONDS, REQUESTS, TIME_TO_FIRST_CHUNK, instrument_stream, stage_timer,
+)
+from voxcpm.scheduler import stream_scheduler
+from voxcpm.utils.text_segment import IncrementalSegmenter
+from voxcpm.utils.tracing import SlowRequestProfiler, safe_request_id, start_trace
 import torch
 import io
 import numpy as np
 
 PORT = int(os.getenv("PORT", "7861"))
-OUTPUT_DIR = Path("/app/outputs")
-UPLOAD_DIR = Path("/app/uploads")
-CACHE_DIR = Path("/app/cache")
-OUTPUT_DIR.mkdir(exist_ok=True)
-UPLOAD_DIR.mkdir(exist_ok=True)
-CACHE_DIR.mkdir(exist_ok=True)
+# Outputs, uploads and caches are quota-bounded; the janitor evicts old files
+storage_manager.start_janitor()
+
+# Per-request tracing (opt-in: VOXCPM_TRACING=1 traces everything; clients listed in
+# VOXCPM_TRACE_CLIENTS, comma-separated addresses, may trace single requests with an
+# "X-Trace: 1" header). Traced requests slower than SLOW_REQUEST_THRESHOLD_S seconds
+# dump their span tree and sampled stacks to SLOW_REQUEST_DIR.
+TRACING_ENABLED = os.getenv("VOXCPM_TRACING", "0") == "1"
+TRACE_CLIENTS = {host.strip() for host in os.getenv("VOXCPM_TRACE_CLIENTS", "").split(",") if host.strip()}
+slow_request_profiler = SlowRequestProfiler(
+    os.getenv("SLOW_REQUEST_DIR", "/app/traces"),
+    threshold=float(os.getenv("SLOW_REQUEST_THRESHOLD_S", "10")),
+    max_files=int(os.getenv("SLOW_REQUEST_MAX_FILES", "50")),
+    interval=float(os.getenv("SLOW_REQUEST_SAMPLE_MS", "20")) / 1000,
+)
+
+# Stand-in server for load tests: VOXCPM_TINY_MODEL=tiny serves a randomly
+# initialized model (voxcpm.benchmark presets) instead of downloading weights
+TINY_MODEL_PRESET = os.getenv("VOXCPM_TINY_MODEL", "")
+
+# Build the wetext normalizer at startup so the first normalize=True request does not stall
+TEXT_NORMALIZER_WARMUP = os.getenv("TEXT_NORMALIZER_WARMUP", "1") == "1"
+# Bitrate of the 48 kHz OGG/Opus stream sent by /api/tts/ws (format "opus")
+WS_OPUS_BITRATE = os.getenv("WS_OPUS_BITRATE", "32k")
 
 # Performance optimization
 DEFAULT_TIMESTEPS = 5
 FAST_MODE_TIMESTEPS = 3
 
-# Preload models on startup
-WHISPER_MODEL = None
+# Shared ASR for reference-audio transcripts (also used by /v1/audio/transcriptions)
+asr_service = get_asr_service(
+    backend=os.getenv("ASR_BACKEND", "whisper"),
+    language=os.getenv("ASR_LANGUAGE", "zh"),
+    cache=cache_manager,
+)
 
 def preload_models():
     """Preload all models to GPU on startup"""
-    global WHISPER_MODEL
     print("🔄 Preloading models to GPU...")
     
     # Load VoxCPM model directly without compile
-    model_path = os.getenv("HF_REPO_ID", "openbmb/VoxCPM1.5")
-    model = voxcpm.VoxCPM.from_pretrained(model_path)
+    model = load_model()
     gpu_manager.model = model
     print("✅ VoxCPM model loaded to GPU")
+
+    if TEXT_NORMALIZER_WARMUP:
+        try:
+            model.load_text_normalizer()
+            print("✅ Text normalizer warmed up")
+        except Exception as e:
+            print(f"⚠️  Text normalizer warmup failed: {e}")
     
-    # Load Whisper model
+    # Load ASR model
     try:
-        import whisper
-        WHISPER_MODEL = whisper.load_model("base")
-        print("✅ Whisper model loaded")
+        asr_service.load()
+        print(f"✅ ASR model loaded ({asr_service.backend})")
     except Exception as e:
-        print(f"⚠️  Whisper model load failed: {e}")
+        print(f"⚠️  ASR model load failed: {e}")
     
     print("🎉 All models preloaded successfully!")
 
@@ -60,20 +95,84 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    # Streaming responses are timed until headers are sent; see time_to_first_chunk
+    start = time.perf_counter()
+    status = 500
+    request_id = safe_request_id(request.headers.get("x-request-id"))
+    trace = None
+    if TRACING_ENABLED or (
+        request.headers.get("x-trace") == "1" and request.client is not None and request.client.host in TRACE_CLIENTS
+    ):
+        trace = start_trace(request_id, method=request.method, path=request.url.path)
+        slow_request_profiler.begin(trace)
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        response.headers["X-Request-ID"] = request_id
+        if trace is not None:
+            response.body_iterator = traced_body(response.body_iterator, trace)
+            trace = None  # finished once the body has been written
+        return response
+    finally:
+        route = request.scope.get("route")
+        endpoint = getattr(route, "path", "unmatched")
+        REQUESTS.labels(endpoint=endpoint, status=status).inc()
+        REQUEST_SECONDS.labels(endpoint=endpoint).observe(time.perf_counter() - start)
+        if trace is not None:
+            finish_trace(trace)
+
+async def traced_body(body_iterator, trace):
+    http_write = trace.open("http_write", {})
+    sent = 0
+    try:
+        async for chunk in body_iterator:
+            sent += len(chunk)
+            yield chunk
+    finally:
+        http_write.attrs["bytes"] = sent
+        trace.close(http_write)
+        finish_trace(trace)
+
+def finish_trace(trace):
+    report = slow_request_profiler.finish(trace)
+    if report is not None:
+        print(f"🐢 Slow request {trace.request_id} ({trace.duration:.2f}s), trace written to {report}")
+
 # Include OpenAI-compatible API
 from openai_api import router as openai_router
 app.include_router(openai_router)
 
 def load_model():
+    if TINY_MODEL_PRESET:
+        from voxcpm.benchmark import build_tiny_pipeline
+        return build_tiny_pipeline(TINY_MODEL_PRESET)
     model_path = os.getenv("HF_REPO_ID", "openbmb/VoxCPM1.5")
-    model = voxcpm.VoxCPM.from_pretrained(model_path)
+    # VAE_ENCODE_CHUNK_S / VAE_DECODER_DTYPE / VAE_DECODER_MIN_SNR_DB, see configure_vae_from_env
+    model = voxcpm.VoxCPM.from_pretrained(model_path).configure_vae_from_env()
     # Note: torch.compile disabled due to compatibility issues
     return model
 
 @app.get("/health")
 def health():
     """Health check endpoint"""
-    return {"status": "healthy", "model_loaded": gpu_manager.is_loaded(), "version": "1.0.8"}
+    return {
+        "status": "healthy",
+        "model_loaded": gpu_manager.is_loaded(),
+        "version": "1.0.8",
+        "synthesis_cache": synthesis_cache.stats(),
+        # measured by the storage janitor's last pass, so probes never walk the dirs
+        "storage_mb": {
+            name: None if usage is None else round(usage / 1024**2, 1)
+            for name, usage in storage_manager.last_usage().items()
+        },
+    }
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus metrics"""
+    return Response(REGISTRY.render(), media_type="text/plain; version=0.0.4")
 
 @app.post("/api/tts")
 async def tts(
@@ -89,20 +188,48 @@ async def tts(
     retry_badcase: bool = Form(False),
     retry_badcase_max_times: int = Form(3),
     retry_badcase_ratio_threshold: float = Form(6.0),
+    seed: int = Form(None),
 ):
-    """Text-to-Speech API"""
+    """Text-to-Speech API (pass ``seed`` for deterministic output served from the synthesis cache)"""
+    start = time.perf_counter()
     try:
-        prompt_wav_path = None
-        if prompt_audio:
-            prompt_wav_path = UPLOAD_DIR / f"prompt_{int(time.time())}_{prompt_audio.filename}"
-            with open(prompt_wav_path, "wb") as f:
-                f.write(await prompt_audio.read())
-        
+        prompt_bytes = await prompt_audio.read() if prompt_audio else None
+        prompt_digest = cache_manager.digest_bytes(prompt_bytes) if prompt_bytes else None
+        # Loaded first: the cache key includes what the loaded model is (weights, LoRA, VAE precision)
         model = gpu_manager.get_model(load_model)
+        QUEUE_WAIT.labels(endpoint="/api/tts").observe(time.perf_counter() - start)
+        
+        cache_key = None
+        if seed is not None:
+            cache_key = synthesis_cache.make_key(
+                endpoint="tts",
+                model=model.identity,
+                text=synthesis_cache.normalize_text(text),
+                prompt=prompt_digest,
+                prompt_text=prompt_text,
+                cfg_value=cfg_value,
+                inference_timesteps=inference_timesteps,
+                min_len=min_len,
+                max_len=max_len,
+                normalize=normalize,
+                denoise=denoise,
+                retry_badcase=[retry_badcase, retry_badcase_max_times, retry_badcase_ratio_threshold],
+                seed=seed,
+                format="wav",
+            )
+            cached = synthesis_cache.get(cache_key)
+            if cached is not None:
+                return Response(cached, media_type="audio/wav", headers={"X-Cache": "HIT"})
         
-        wav = model.generate(
+        # The upload is decoded (and denoised) in memory, and the result is encoded
+        # into a buffer: no file is created for this request. Generation runs on the
+        # stream scheduler so it cannot clobber the KV state of live streams.
+        wav = await asyncio.to_thread(
+            stream_scheduler.run,
+            model,
+            model.generate,
             text=text,
-            prompt_wav_path=str(prompt_wav_path) if prompt_wav_path else None,
+            prompt_wav=prompt_bytes,
             prompt_text=prompt_text,
             cfg_value=cfg_value,
             inference_timesteps=inference_timesteps,
@@ -113,12 +240,17 @@ async def tts(
             retry_badcase=retry_badcase,
             retry_badcase_max_times=retry_badcase_max_times,
             retry_badcase_ratio_threshold=retry_badcase_ratio_threshold,
+            seed=seed,
         )
         
-        output_path = OUTPUT_DIR / f"output_{int(time.time())}.wav"
-        sf.write(output_path, wav, model.tts_model.sample_rate)
+        with stage_timer("format_encode"):
+            buffer = io.BytesIO()
+            sf.write(buffer, wav, model.tts_model.sample_rate, format="WAV")
+            wav_bytes = buffer.getvalue()
+        if cache_key is not None:
+            synthesis_cache.put(cache_key, wav_bytes)
         
-        return FileResponse(output_path, media_type="audio/wav")
+        return Response(wav_bytes, media_type="audio/wav")
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -177,10 +309,15 @@ async def tts_stream(
     max_len: int = Form(4096),
     normalize: bool = Form(False),
     denoise: bool = Form(False),
+    seed: int = Form(None),
+    low_latency: bool = Form(False),
 ):
     """Streaming Text-to-Speech API - returns audio chunks as they are generated"""
+    start = time.perf_counter()
     try:
         prompt_wav_path = None
+        prompt_bytes = None
+        prompt_hash = None
         
         # Priority: voice_id > prompt_audio
         if voice_id and voice_id in PRESET_VOICES:
@@ -189,20 +326,44 @@ async def tts_stream(
             prompt_wav_path = preset["path"]
             if not prompt_text:
                 prompt_text = preset["text"]
+            if seed is not None:
+                prompt_hash = cache_manager.get_file_digest(prompt_wav_path)
         elif prompt_audio:
             # Use uploaded audio
-            prompt_wav_path = UPLOAD_DIR / f"prompt_{int(time.time())}_{prompt_audio.filename}"
-            with open(prompt_wav_path, "wb") as f:
-                f.write(await prompt_audio.read())
-            prompt_wav_path = str(prompt_wav_path)
+            prompt_bytes = await prompt_audio.read()
+            prompt_hash = cache_manager.digest_bytes(prompt_bytes)
         
         model = gpu_manager.get_model(load_model)
+        cache_key = None
+        if seed is not None:
+            cache_key = synthesis_cache.make_key(
+                endpoint="tts_stream",
+                model=model.identity,
+                text=synthesis_cache.normalize_text(text),
+                prompt=prompt_hash,
+                prompt_text=prompt_text,
+                cfg_value=cfg_value,
+                inference_timesteps=inference_timesteps,
+                min_len=min_len,
+                max_len=max_len,
+                normalize=normalize,
+                denoise=denoise,
+                seed=seed,
+                low_latency=low_latency,
+                format="wav_chunks",
+            )
+            cached_chunks = synthesis_cache.get_chunks(cache_key)
+            if cached_chunks is not None:
+                # Replay the recorded chunks with the same framing as a live stream
+                return StreamingResponse(iter(cached_chunks), media_type="audio/wav", headers={"X-Cache": "HIT"})
         
         def audio_stream():
             chunk_count = 0
-            for wav_chunk in model.generate_streaming(
+            for wav_chunk in stream_scheduler.submit(
+                model,
                 text=text,
                 prompt_wav_path=prompt_wav_path,
+                prompt_wav=prompt_bytes,
                 prompt_text=prompt_text,
                 cfg_value=cfg_value,
                 inference_timesteps=inference_timesteps,
@@ -211,20 +372,237 @@ async def tts_stream(
                 normalize=normalize,
                 denoise=denoise,
                 retry_badcase=False,  # Streaming doesn't support retry
+                seed=seed,
+                low_latency=low_latency,
             ):
                 chunk_count += 1
-                buffer = io.BytesIO()
-                sf.write(buffer, wav_chunk, model.tts_model.sample_rate, format='WAV', subtype='PCM_16')
-                buffer.seek(0)
-                chunk_data = buffer.read()
+                with stage_timer("format_encode"):
+                    buffer = io.BytesIO()
+                    sf.write(buffer, wav_chunk, model.tts_model.sample_rate, format='WAV', subtype='PCM_16')
+                    buffer.seek(0)
+                    chunk_data = buffer.read()
                 print(f"🎵 Streaming chunk {chunk_count}: {len(chunk_data)} bytes, audio length: {len(wav_chunk)/model.tts_model.sample_rate:.2f}s")
                 yield chunk_data
         
-        return StreamingResponse(audio_stream(), media_type="audio/wav")
+        stream = audio_stream() if cache_key is None else synthesis_cache.record(cache_key, audio_stream())
+        return StreamingResponse(instrument_stream(stream, "/api/tts/stream", start), media_type="audio/wav")
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+class OggOpusEncoder:
+    """Incremental OGG/Opus (48 kHz) encoding of int16 PCM through an ffmpeg pipe"""
+
+    def __init__(self, sample_rate: int, bitrate: str = WS_OPUS_BITRATE):
+        self.sample_rate = sample_rate
+        self.bitrate = bitrate
+        self.proc = None
+
+    async def start(self):
+        self.proc = await asyncio.create_subprocess_exec(
+            "ffmpeg", "-loglevel", "error",
+            "-f", "s16le", "-ar", str(self.sample_rate), "-ac", "1", "-i", "pipe:0",
+            "-c:a", "libopus", "-b:a", self.bitrate, "-ar", "48000", "-frame_duration", "20",
+            # one OGG page per Opus packet, so each frame reaches the client as soon as it is encoded
+            "-page_duration", "20000", "-flush_packets", "1", "-f", "ogg", "pipe:1",
+            stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE,
+        )
+        return self
+
+    async def write(self, pcm: bytes):
+        self.proc.stdin.write(pcm)
+        await self.proc.stdin.drain()
+
+    async def read(self) -> bytes:
+        """Next encoded bytes; b"" once the stream is complete"""
+        return await self.proc.stdout.read(4096)
+
+    async def close(self):
+        if self.proc.stdin and not self.proc.stdin.is_closing():
+            self.proc.stdin.close()
+
+    def kill(self):
+        if self.proc is not None and self.proc.returncode is None:
+            self.proc.kill()
+
+
+async def synthesize_segments(model, segments: asyncio.Queue, send_audio, on_segment, generate_kwargs: dict,
+                              prompt_cache=None, stopped: asyncio.Event = None):
+    """Synthesize queued text segments in order until a ``None`` arrives.
+
+    Every segment is conditioned on the same ``prompt_cache`` and prefills only
+    the prompt plus its own text. Without a voice prompt, the first segment's
+    audio becomes the prompt of the rest, so the voice stays the same.
+    """
+    sample_rate = model.tts_model.sample_rate
+    while True:
+        segment = await segments.get()
+        if segment is None or (stopped is not None and stopped.is_set()):
+            return
+        await on_segment(segment)
+        chunks = stream_scheduler.submit(
+            model, text=segment, prompt_cache=prompt_cache, retry_badcase=False, **generate_kwargs
+        )
+        spoken = []
+        try:
+            # Always pull the first chunk: closing an unstarted stream would not cancel it
+            while True:
+                wav_chunk = await asyncio.to_thread(next, chunks, None)
+                if wav_chunk is None or (stopped is not None and stopped.is_set()):
+                    break
+                if prompt_cache is None:
+                    spoken.append(wav_chunk)
+                await send_audio(wav_chunk)
+        finally:
+            chunks.close()
+        if prompt_cache is None and spoken:
+            prompt_cache = await asyncio.to_thread(
+                model.tts_model.build_prompt_cache_from_audio,
+                prompt_text=segment, audio=torch.from_numpy(np.concatenate(spoken)), sample_rate=sample_rate,
+            )
+
+
+@app.websocket("/api/tts/ws")
+async def tts_websocket(websocket: WebSocket):
+    """Incremental text-in / audio-out TTS for token streams (e.g. an LLM reply).
+
+    Client -> server (JSON):
+        {"type": "start", "voice_id": ..., "prompt_text": ..., "cfg_value": 2.0,
+         "inference_timesteps": ..., "normalize": false, "denoise": false, "seed": null,
+         "format": "pcm" | "opus"}                        (first message, all fields optional)
+        {"type": "text", "text": "<delta>"}                (any number)
+        {"type": "flush"}                                  (end of a turn: speak what is buffered)
+        {"type": "end"}                                    (flush, then close once the audio is sent)
+    Server -> client:
+        {"type": "ready", "format": ..., "sample_rate": ...}
+        {"type": "segment", "text": ...} before the audio of each segment
+        binary frames: int16 mono PCM at the model rate, or an OGG/Opus stream at 48 kHz
+        {"type": "done"} / {"type": "error", "detail": ...}
+
+    Text is cut into clauses by ``IncrementalSegmenter`` as it arrives; the first
+    clause of a turn is spoken as soon as it is complete.
+    """
+    await websocket.accept()
+    start = time.perf_counter()
+    status = 200
+    stopped = asyncio.Event()
+    segments: asyncio.Queue = asyncio.Queue()
+    synth = encoder = forward = None
+    first_text = None
+    try:
+        config = await websocket.receive_json()
+        if config.get("type") != "start":
+            raise ValueError('the first message must be {"type": "start", ...}')
+        audio_format = config.get("format", "pcm")
+        if audio_format not in ("pcm", "opus"):
+            raise ValueError(f"unsupported format: {audio_format}")
+        voice_id = config.get("voice_id")
+        if voice_id and voice_id not in PRESET_VOICES:
+            raise ValueError(f"unknown voice_id: {voice_id}")
+
+        model = await asyncio.to_thread(gpu_manager.get_model, load_model)
+        sample_rate = model.tts_model.sample_rate
+        prompt_cache = None
+        if voice_id:
+            preset = PRESET_VOICES[voice_id]
+            prompt_cache = await asyncio.to_thread(
+                model.build_prompt_cache, preset["path"], config.get("prompt_text") or preset["text"],
+                bool(config.get("denoise", False)),
+            )
+        generate_kwargs = dict(
+            cfg_value=float(config.get("cfg_value", 2.0)),
+            inference_timesteps=int(config.get("inference_timesteps", DEFAULT_TIMESTEPS)),
+            min_len=int(config.get("min_len", 2)),
+            max_len=int(config.get("max_len", 4096)),
+            normalize=bool(config.get("normalize", False)),
+            seed=config.get("seed"),
+        )
+
+        if audio_format == "opus":
+            encoder = await OggOpusEncoder(sample_rate).start()
+
+            async def forward_encoded():
+                while data := await encoder.read():
+                    await websocket.send_bytes(data)
+
+            forward = asyncio.create_task(forward_encoded())
+
+        async def send_audio(wav_chunk):
+            nonlocal first_text
+            if first_text is not None:
+                TIME_TO_FIRST_CHUNK.labels(endpoint="/api/tts/ws").observe(time.perf_counter() - first_text)
+                first_text = None
+            pcm = (np.clip(wav_chunk, -1.0, 1.0) * 32767).astype(np.int16).tobytes()
+            if encoder is not None:
+                await encoder.write(pcm)
+            else:
+                await websocket.send_bytes(pcm)
+
+        async def on_segment(segment):
+            await websocket.send_json({"type": "segment", "text": segment})
+
+        await websocket.send_json(
+            {"type": "ready", "format": audio_format, "sample_rate": 48000 if encoder is not None else sample_rate}
+        )
+        synth = asyncio.create_task(
+            synthesize_segments(model, segments, send_audio, on_segment, generate_kwargs, prompt_cache, stopped)
+        )
+
+        segmenter = IncrementalSegmenter()
+        turn_started = False
+        while True:
+            message = await websocket.receive_json()
+            kind = message.get("type")
+            if kind == "text":
+                if not turn_started:
+                    # time to first audio counts from the first text of a turn
+                    first_text, turn_started = time.perf_counter(), True
+                ready = segmenter.feed(message.get("text", ""))
+            elif kind in ("flush", "end"):
+                ready = segmenter.flush()
+                turn_started = False
+            else:
+                raise ValueError(f"unknown message type: {kind}")
+            for segment in ready:
+                segments.put_nowait(segment)
+            if synth.done():
+                synth.result()  # surface a failed synthesis without waiting for "end"
+                raise RuntimeError("synthesis stopped")
+            if kind == "end":
+                break
+
+        segments.put_nowait(None)
+        await synth
+        if encoder is not None:
+            await encoder.close()
+            await forward
+        await websocket.send_json({"type": "done"})
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass  # closing the socket is how clients cancel
+    except Exception as e:
+        status = 500
+        try:
+            await websocket.send_json({"type": "error", "detail": str(e)})
+            await websocket.close(code=1011)
+        except Exception:
+            pass
+    finally:
+        # Let the synthesis task stop after its current chunk instead of cancelling it mid-step
+        stopped.set()
+        segments.put_nowait(None)
+        if synth is not None:
+            try:
+                await synth
+            except Exception:
+                pass
+        if encoder is not None:
+            encoder.kill()
+        if forward is not None:
+            forward.cancel()
+        REQUESTS.labels(endpoint="/api/tts/ws", status=status).inc()
+        REQUEST_SECONDS.labels(endpoint="/api/tts/ws").observe(time.perf_counter() - start)
+
 # Gradio UI - Chinese Interface
 def create_ui():
     with gr.Blocks(title="VoxCPM 语音合成", theme=gr.themes.Soft()) as demo:
@@ -507,7 +885,9 @@ def create_ui():
             
             # 使用流式生成（更快的首块响应）
             chunks = []
-            for wav_chunk in model.generate_streaming(
+            for wav_chunk in stream_scheduler.submit(
+                model,
+                playback=False,
                 text=text, 
                 cfg_value=cfg, 
                 inference_timesteps=steps,
@@ -518,7 +898,9 @@ def create_ui():
                 chunks.append(wav_chunk)
             
             wav = np.concatenate(chunks)
-            path = OUTPUT_DIR / f"synth_{int(time.time())}.wav"
+            if IN_MEMORY_RESPONSES:
+                return model.tts_model.sample_rate, wav
+            path = storage_manager.new_path("outputs", "synth", ".wav")
             sf.write(path, wav, model.tts_model.sample_rate)
             return str(path)
         
@@ -534,28 +916,24 @@ def create_ui():
             import shutil
             audio_path = audio.name if hasattr(audio, 'name') else audio
             
-            # Copy to uploads directory to prevent deletion
-            persistent_path = UPLOAD_DIR / f"ref_{int(time.time())}_{Path(audio_path).name}"
+            # Copy to uploads directory to prevent deletion; hash the upload once for all cache lookups
+            audio_digest = cache_manager.get_file_digest(audio_path)
+            persistent_path = storage_manager.new_path("uploads", "ref", Path(audio_path).suffix)
             shutil.copy2(audio_path, persistent_path)
+            cache_manager.register_file(persistent_path, audio_digest)
             audio_path = str(persistent_path)
             
             # Check cache for transcription
             if not transcript or not transcript.strip():
-                cached_text = cache_manager.get_whisper_cache(audio_path)
+                cached_text = cache_manager.get_whisper_cache(audio_path, digest=audio_digest)
                 if cached_text:
                     transcript = cached_text
                     status_msg = f"✅ 使用缓存的参考文本: {transcript[:50]}..."
                     print(f"📝 Cache hit: {transcript[:100]}")
                 else:
                     try:
-                        global WHISPER_MODEL
-                        if WHISPER_MODEL is None:
-                            import whisper
-                            WHISPER_MODEL = whisper.load_model("base")
                         print(f"🎤 Transcribing audio: {audio_path}")
-                        result = WHISPER_MODEL.transcribe(audio_path, language="zh")
-                        transcript = result["text"]
-                        cache_manager.set_whisper_cache(audio_path, transcript)
+                        transcript = asr_service.transcribe(audio_path, digest=audio_digest)
                         status_msg = f"✅ 自动识别参考文本: {transcript[:50]}..."
                         print(f"📝 Transcribed: {transcript[:100]}")
                     except Exception as e:
@@ -573,7 +951,9 @@ def create_ui():
             
             # 使用流式生成
             chunks = []
-            for wav_chunk in model.generate_streaming(
+            for wav_chunk in stream_scheduler.submit(
+                model,
+                playback=False,
                 text=text, 
                 prompt_wav_path=audio_path, 
                 prompt_text=transcript,
@@ -586,7 +966,9 @@ def create_ui():
                 chunks.append(wav_chunk)
             
             wav = np.concatenate(chunks)
-            path = OUTPUT_DIR / f"clone_{int(time.time())}.wav"
+            if IN_MEMORY_RESPONSES:
+                return (model.tts_model.sample_rate, wav), status_msg
+            path = storage_manager.new_path("outputs", "clone", ".wav")
             sf.write(path, wav, model.tts_model.sample_rate)
             return str(path), status_msg
         
@@ -0,0 +1,14 @@
+from .tiny import PRESETS, build_tiny_model, build_tiny_pipeline, tiny_config, tiny_tokenizer
+from .suite import Result, compare_to_baseline, load_report, run_benchmarks
+
+__all__ = [
+    "PRESETS",
+    "build_tiny_model",
+    "build_tiny_pipeline",
+    "tiny_config",
+    "tiny_tokenizer",
+    "Result",
+    "run_benchmarks",
+    "compare_to_baseline",
+    "load_report",
+]
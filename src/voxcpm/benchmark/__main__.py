@@ -0,0 +1,76 @@
+"""
+In-process VoxCPM inference benchmark.
+
+Runs against a randomly initialized model by default, so no weights, server or
+network are needed:
+
+    python -m voxcpm.benchmark --preset tiny --quick --output bench.json
+
+Save a report as the baseline and compare later runs against it; the exit code
+is 1 when any metric regressed by more than ``--tolerance``:
+
+    python -m voxcpm.benchmark --output new.json --baseline bench.json --tolerance 0.15
+
+``--model_dir`` benchmarks a downloaded checkpoint instead of a preset. The
+decode loop's progress bars go to stderr; set ``TQDM_DISABLE=1`` to hide them.
+"""
+
+import argparse
+import json
+import sys
+
+import torch
+
+from . import PRESETS, build_tiny_model, compare_to_baseline, load_report, run_benchmarks
+
+
+def parse_args():
+    parser = argparse.ArgumentParser("python -m voxcpm.benchmark", description="VoxCPM in-process inference benchmark")
+    parser.add_argument("--preset", type=str, default="tiny", choices=sorted(PRESETS), help="Random model size")
+    parser.add_argument("--model_dir", type=str, default="", help="Benchmark a real checkpoint instead of a preset")
+    parser.add_argument("--device", type=str, default="cuda" if torch.cuda.is_available() else "cpu")
+    parser.add_argument("--dtype", type=str, default="float32", help="Preset dtype (float32 / bfloat16 / float16)")
+    parser.add_argument("--timesteps", type=int, default=10, help="inference_timesteps for decode and RTF")
+    parser.add_argument("--quick", action="store_true", help="Fewer sizes and repeats (CI smoke run)")
+    parser.add_argument("--threads", type=int, default=0, help="torch CPU threads (0 = torch default)")
+    parser.add_argument("--output", type=str, default="", help="Write the JSON report here")
+    parser.add_argument("--baseline", type=str, default="", help="Compare against a saved JSON report")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed relative slowdown before failing")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    if args.model_dir:
+        from ..model.voxcpm import VoxCPMModel
+        model = VoxCPMModel.from_local(args.model_dir, optimize=False)
+    else:
+        model = build_tiny_model(args.preset, device=args.device, dtype=args.dtype)
+
+    report = run_benchmarks(model, quick=args.quick, timesteps=args.timesteps)
+    report["meta"]["model"] = args.model_dir or f"random:{args.preset}"
+
+    print(f"{'metric':<32} {'value':>12}")
+    for name, result in report["results"].items():
+        print(f"{name:<32} {result['value']:>10.3f} {result['unit']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+    if args.baseline:
+        rows = compare_to_baseline(report, load_report(args.baseline), args.tolerance)
+        print(f"\n{'metric':<32} {'baseline':>10} {'current':>10} {'change':>8}")
+        for row in rows:
+            flag = "  REGRESSION" if row["regression"] else ""
+            print(f"{row['name']:<32} {row['baseline']:>10.3f} {row['current']:>10.3f} {row['change']:>+7.1%}{flag}")
+        if any(row["regression"] for row in rows):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+"""
+In-process inference benchmarks.
+
+Each benchmark returns ``Result`` entries (name, value, unit, direction). Model
+stages are read from the ``voxcpm_stage_seconds`` histograms that the inference
+code already records, with CUDA synchronization switched on for the run so GPU
+time lands in the right stage.
+"""
+
+import json
+import math
+import platform
+import random
+import statistics
+import time
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, List, Sequence, Tuple
+
+import torch
+
+from ..model.voxcpm import VoxCPMModel
+from ..modules.audiovae import AudioVAE
+from ..utils import metrics
+from ..utils.audio_quality import compare_audio
+
+STAGES = ("prefill", "dit_solve", "lm_step", "vae_decode")
+# Folding weight norm / Snake reciprocals only reorders float ops
+VAE_EXPORT_TOLERANCE = 1e-5
+
+
+@dataclass
+class Result:
+    name: str
+    value: float
+    unit: str
+    lower_is_better: bool = True
+
+
+def _sync(device: str):
+    if str(device).startswith("cuda"):
+        torch.cuda.synchronize()
+
+
+def _median_time(fn: Callable[[], None], device: str, repeats: int, warmup: int) -> float:
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(repeats):
+        _sync(device)
+        start = time.perf_counter()
+        fn()
+        _sync(device)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def _stage_snapshot() -> Dict[str, Tuple[float, int]]:
+    snapshot = {}
+    for stage in STAGES:
+        child = metrics.STAGE_SECONDS.labels(stage=stage)
+        snapshot[stage] = (child.sum, sum(child.counts))
+    return snapshot
+
+
+def _stage_means(before, after) -> Dict[str, float]:
+    means = {}
+    for stage in STAGES:
+        total = after[stage][0] - before[stage][0]
+        count = after[stage][1] - before[stage][1]
+        if count:
+            means[stage] = total / count
+    return means
+
+
+def _random_text(length: int, rng: random.Random) -> str:
+    words = ["hello", "world", "voice", "speech", "model", "test", "你好", "世界", "语音", "合成"]
+    text = ""
+    while len(text) < length:
+        text += rng.choice(words) + " "
+    return text[:length]
+
+
+def bench_tokenize(model: VoxCPMModel, text_length: int, repeats: int) -> List[Result]:
+    """Text tokenization: token-level reference path vs. the id-table fast path (uncached)"""
+    tokenizer = model.text_tokenizer
+    texts = [_random_text(text_length, random.Random(seed)) for seed in range(8)]
+    for text in texts:
+        expected = tokenizer.tokenizer.convert_tokens_to_ids(tokenizer.tokenize(text))
+        if list(tokenizer._encode(text)) != expected:
+            raise AssertionError(f"tokenizer fast path differs from the reference for {text!r}")
+    reference = lambda: [tokenizer.tokenizer.convert_tokens_to_ids(tokenizer.tokenize(t)) for t in texts]
+    fast = lambda: [tokenizer._encode(t) for t in texts]
+    return [
+        Result(f"tokenize_us/{label}", _median_time(fn, "cpu", repeats, 1) / len(texts) * 1e6, "us")
+        for label, fn in (("reference", reference), ("fast", fast))
+    ]
+
+
+def bench_prefill(model: VoxCPMModel, text_lengths: Sequence[int], repeats: int, warmup: int) -> List[Result]:
+    """Prefill latency of both LMs for different prompt text lengths"""
+    rng = random.Random(0)
+    results = []
+    for length in text_lengths:
+        text = _random_text(length, rng)
+        run = lambda: model.generate(target_text=text, min_len=0, max_len=1, retry_badcase=False)
+        for _ in range(warmup):
+            run()
+        before = _stage_snapshot()
+        for _ in range(repeats):
+            run()
+        means = _stage_means(before, _stage_snapshot())
+        results.append(Result(f"prefill_ms/text_{length}", means["prefill"] * 1000, "ms"))
+    return results
+
+
+def bench_decode(model: VoxCPMModel, patches: int, timesteps: int, repeats: int, warmup: int) -> List[Result]:
+    """Per-patch decode latency split into DiT solve and LM step"""
+    run = lambda: model.generate(
+        target_text="benchmark decode loop", min_len=patches, max_len=patches,
+        inference_timesteps=timesteps, retry_badcase=False,
+    )
+    for _ in range(warmup):
+        run()
+    before = _stage_snapshot()
+    for _ in range(repeats):
+        run()
+    means = _stage_means(before, _stage_snapshot())
+    return [
+        Result("decode_ms_per_patch", (means["dit_solve"] + means["lm_step"]) * 1000, "ms"),
+        Result("dit_solve_ms_per_patch", means["dit_solve"] * 1000, "ms"),
+        Result("lm_step_ms_per_patch", means["lm_step"] * 1000, "ms"),
+    ]
+
+
+@torch.inference_mode()
+def bench_dit_timesteps(model: VoxCPMModel, timesteps: Sequence[int], repeats: int, warmup: int) -> List[Result]:
+    """LocDiT flow-matching solve time for one patch as a function of ``inference_timesteps``"""
+    dtype = next(model.feat_decoder.parameters()).dtype
+    mu = torch.randn(1, model.config.dit_config.hidden_dim, device=model.device, dtype=dtype)
+    cond = torch.randn(1, model.feat_dim, model.patch_size, device=model.device, dtype=dtype)
+    results = []
+    for n in timesteps:
+        solve = lambda: model.feat_decoder(mu=mu, n_timesteps=n, patch_size=model.patch_size, cond=cond, cfg_value=2.0)
+        seconds = _median_time(solve, model.device, repeats, warmup)
+        results.append(Result(f"dit_solve_ms/timesteps_{n}", seconds * 1000, "ms"))
+    return results
+
+
+@torch.inference_mode()
+def bench_vae(model: VoxCPMModel, audio_seconds: float, repeats: int, warmup: int) -> List[Result]:
+    """AudioVAE encode/decode throughput in audio seconds processed per wall second"""
+    vae = model.audio_vae
+    audio = torch.randn(1, 1, int(audio_seconds * vae.sample_rate), device=model.device) * 0.1
+    latent = vae.encode(audio, vae.sample_rate)
+    encode = _median_time(lambda: vae.encode(audio, vae.sample_rate), model.device, repeats, warmup)
+    decode = _median_time(lambda: vae.decode(latent), model.device, repeats, warmup)
+    return [
+        Result("vae_encode_audio_s_per_s", audio_seconds / encode, "x", lower_is_better=False),
+        Result("vae_decode_audio_s_per_s", audio_seconds / decode, "x", lower_is_better=False),
+    ]
+
+
+@torch.inference_mode()
+def bench_vae_export(model: VoxCPMModel, repeats: int, warmup: int) -> List[Result]:
+    """Streaming-chunk VAE decode with weight norm vs ``prepare_for_inference``, plus their max difference"""
+    reference = AudioVAE(model.config.audio_vae_config).to(model.device).eval()
+    exported = AudioVAE(model.config.audio_vae_config).to(model.device).eval()
+    exported.load_state_dict(reference.state_dict())
+    exported.prepare_for_inference()
+    # The decoder runs once per streamed patch on the last three patches
+    z = torch.randn(1, reference.latent_dim, 3 * model.patch_size, device=model.device)
+    error = (reference.decode(z) - exported.decode(z)).abs().max().item()
+    if error > VAE_EXPORT_TOLERANCE:
+        raise AssertionError(f"folded VAE decoder differs from the weight-norm one by {error:.3g}")
+    results = [Result("vae_export_max_abs_error", error, "abs")]
+    for label, vae in (("weight_norm", reference), ("exported", exported)):
+        seconds = _median_time(lambda: vae.decode(z), model.device, repeats, warmup)
+        results.append(Result(f"vae_decode_chunk_ms/{label}", seconds * 1000, "ms"))
+    return results
+
+
+@torch.inference_mode()
+def bench_vae_decoder_precision(model: VoxCPMModel, dtypes: Sequence[str], repeats: int, warmup: int) -> List[Result]:
+    """Half-precision VAE decoder: drift from fp32 (SNR, SI-SNR, LSD) and per-chunk decode latency"""
+    config = model.config.audio_vae_config
+    reference = AudioVAE(config).to(model.device).eval().prepare_for_inference()
+    generator = torch.Generator(device="cpu").manual_seed(0)
+    z = torch.randn(1, reference.latent_dim, 64, generator=generator).to(model.device)
+    chunk = z[..., : 3 * model.patch_size]
+    audio = reference.decode(z)
+    results = []
+    for dtype in dtypes:
+        vae = AudioVAE(config).to(model.device).eval().prepare_for_inference()
+        vae.load_state_dict(reference.state_dict())
+        vae.set_decoder_dtype(dtype)
+        quality = compare_audio(audio, vae.decode(z), vae.sample_rate)
+        seconds = _median_time(lambda: vae.decode(chunk), model.device, repeats, warmup)
+        results += [
+            Result(f"vae_decoder_snr_db/{dtype}", quality["snr_db"], "dB", lower_is_better=False),
+            Result(f"vae_decoder_si_snr_db/{dtype}", quality["si_snr_db"], "dB", lower_is_better=False),
+            Result(f"vae_decoder_lsd_db/{dtype}", quality["lsd_db"], "dB"),
+            Result(f"vae_decode_chunk_ms/{dtype}", seconds * 1000, "ms"),
+        ]
+        if "pesq" in quality:
+            results.append(Result(f"vae_decoder_pesq/{dtype}", quality["pesq"], "MOS", lower_is_better=False))
+    return results
+
+
+def _peak_memory_mb(fn: Callable[[], None], device: str, module: torch.nn.Module) -> float:
+    """Peak memory of ``fn`` above the starting allocation.
+
+    Measured by the CUDA caching allocator on GPU. On CPU, where torch keeps no
+    allocator statistics, it is estimated as the largest input + output
+    activation of any leaf module of ``module``.
+    """
+    if str(device).startswith("cuda"):
+        torch.cuda.synchronize()
+        torch.cuda.reset_peak_memory_stats()
+        base = torch.cuda.memory_allocated()
+        fn()
+        torch.cuda.synchronize()
+        return (torch.cuda.max_memory_allocated() - base) / 2**20
+    peak = [0]
+
+    def hook(_, inputs, output):
+        size = sum(t.numel() * t.element_size() for t in inputs if torch.is_tensor(t))
+        peak[0] = max(peak[0], size + output.numel() * output.element_size())
+
+    handles = [m.register_forward_hook(hook) for m in module.modules() if not list(m.children())]
+    try:
+        fn()
+    finally:
+        for handle in handles:
+            handle.remove()
+    return peak[0] / 2**20
+
+
+@torch.inference_mode()
+def bench_vae_encode_memory(model: VoxCPMModel, audio_seconds: float, chunk_seconds: float,
+                            repeats: int, warmup: int) -> List[Result]:
+    """Peak memory and throughput of one-pass vs chunked AudioVAE encoding of long audio"""
+    vae = model.audio_vae
+    audio = torch.randn(1, 1, int(audio_seconds * vae.sample_rate), device=model.device) * 0.1
+    results = []
+    for label, chunk in (("full", 0.0), (f"chunk_{chunk_seconds:g}s", chunk_seconds)):
+        encode = lambda: vae.encode(audio, vae.sample_rate, chunk_seconds=chunk)
+        peak = _peak_memory_mb(encode, model.device, vae.encoder)
+        seconds = _median_time(encode, model.device, repeats, warmup)
+        results += [
+            Result(f"vae_encode_peak_mb/{label}", peak, "MB"),
+            Result(f"vae_encode_audio_s_per_s/{label}", audio_seconds / seconds, "x", lower_is_better=False),
+        ]
+    return results
+
+
+def bench_end_to_end(model: VoxCPMModel, patches: int, timesteps: int, repeats: int, warmup: int) -> List[Result]:
+    """Real-time factor of a full non-streaming generation (wall time / audio duration)"""
+    text = "the quick brown fox jumps over the lazy dog"
+    audio = {}
+
+    def run():
+        audio["wav"] = model.generate(target_text=text, min_len=patches, max_len=patches,
+                                      inference_timesteps=timesteps, retry_badcase=False)
+
+    seconds = _median_time(run, model.device, repeats, warmup)
+    duration = audio["wav"].shape[-1] / model.sample_rate
+    return [Result("rtf", seconds / duration, "x")]
+
+
+def run_benchmarks(model: VoxCPMModel, quick: bool = False, timesteps: int = 10) -> Dict:
+    """Run the whole suite; ``quick`` trims sizes and repeats for CI smoke runs"""
+    repeats, warmup = (3, 1) if quick else (10, 2)
+    patches = 16 if quick else 64
+    previous = metrics.ENABLED, metrics.CUDA_SYNC
+    metrics.ENABLED, metrics.CUDA_SYNC = True, True
+    try:
+        results: List[Result] = []
+        results += bench_tokenize(model, 200, repeats * 10)
+        results += bench_prefill(model, [32, 128] if quick else [32, 128, 512], repeats, warmup)
+        results += bench_decode(model, patches, timesteps, repeats, warmup)
+        results += bench_dit_timesteps(model, [5, 10] if quick else [2, 5, 10, 20], repeats, warmup)
+        results += bench_vae(model, 2.0 if quick else 10.0, repeats, warmup)
+        results += bench_vae_export(model, repeats * 3, warmup)
+        results += bench_vae_decoder_precision(model, ["bfloat16", "float16"], repeats * 3, warmup)
+        results += bench_vae_encode_memory(model, 10.0 if quick else 60.0, 2.0 if quick else 10.0,
+                                           1 if quick else 3, 0 if quick else 1)
+        results += bench_end_to_end(model, patches, timesteps, repeats, warmup)
+    finally:
+        metrics.ENABLED, metrics.CUDA_SYNC = previous
+    return {
+        "meta": {
+            "timestamp": time.time(),
+            "python": platform.python_version(),
+            "torch": torch.__version__,
+            "device": str(model.device),
+            "device_name": torch.cuda.get_device_name(0) if str(model.device).startswith("cuda") else platform.processor(),
+            "dtype": model.config.dtype,
+            "quick": quick,
+            "timesteps": timesteps,
+        },
+        "results": {r.name: asdict(r) for r in results},
+    }
+
+
+def compare_to_baseline(report: Dict, baseline: Dict, tolerance: float = 0.10,
+                        abs_tolerance: float = 1e-6) -> List[Dict]:
+    """Relative change of every metric present in both reports.
+
+    A metric regresses when it is worse than the baseline by more than
+    ``tolerance`` (0.10 = 10%), taking its direction into account. Metrics
+    with a zero baseline (e.g. an exact-equivalence error) have no relative
+    change; they regress when worse by more than ``abs_tolerance``.
+    """
+    rows = []
+    for name, current in report["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            continue
+        delta = current["value"] - base["value"]
+        worse = delta if current["lower_is_better"] else -delta
+        if base["value"]:
+            change = delta / base["value"]
+            regression = worse / abs(base["value"]) > tolerance
+        else:
+            change = math.copysign(math.inf, delta) if delta else 0.0
+            regression = worse > abs_tolerance
+        rows.append({
+            "name": name,
+            "baseline": base["value"],
+            "current": current["value"],
+            "unit": current["unit"],
+            "change": change,
+            "regression": regression,
+        })
+    return rows
+
+
+def load_report(path: str) -> Dict:
+    with open(path) as f:
+        return json.load(f)
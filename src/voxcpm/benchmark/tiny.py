@@ -0,0 +1,114 @@
+"""
+Randomly initialized VoxCPM models for benchmarks and tests.
+
+The presets keep the real architecture (MiniCPM base/residual LMs, LocEnc,
+LocDiT flow matching, causal AudioVAE) at a fraction of the width and depth so
+every code path runs on a laptop CPU in seconds. Absolute numbers are not
+comparable with the released checkpoints; relative changes between two commits
+on the same machine are what the benchmark tracks.
+"""
+
+from typing import Dict, Optional
+
+import torch
+from tokenizers import Tokenizer, models, pre_tokenizers
+from transformers import LlamaTokenizerFast
+
+from ..model.utils import get_dtype
+from ..model.voxcpm import VoxCPMConfig, VoxCPMModel
+from ..modules.audiovae import AudioVAE, AudioVAEConfig
+
+PRESETS: Dict[str, dict] = {
+    # CI smoke size: every stage runs in milliseconds on CPU
+    "tiny": dict(hidden=64, layers=2, residual_layers=1, heads=4, kv_heads=2, local_hidden=32,
+                 local_layers=1, feat_dim=16, vae_encoder_dim=8, vae_decoder_dim=32),
+    # Closer ratios between LM, DiT and VAE cost, still CPU-friendly
+    "small": dict(hidden=256, layers=4, residual_layers=2, heads=8, kv_heads=2, local_hidden=128,
+                  local_layers=2, feat_dim=32, vae_encoder_dim=32, vae_decoder_dim=128),
+}
+
+_CJK_CHARS = "你好世界中文语音合成测试我们今天天气很不错的是了在有人这个"
+
+
+def tiny_tokenizer() -> LlamaTokenizerFast:
+    """Character-level tokenizer covering printable ASCII and a few CJK characters"""
+    vocab = {"<unk>": 0, "<s>": 1, "</s>": 2}
+    for char in [chr(c) for c in range(32, 127)] + list(_CJK_CHARS):
+        vocab.setdefault(char, len(vocab))
+    tokenizer = Tokenizer(models.WordLevel(vocab, unk_token="<unk>"))
+    tokenizer.pre_tokenizer = pre_tokenizers.Split("", "isolated")
+    return LlamaTokenizerFast(tokenizer_object=tokenizer, bos_token="<s>", eos_token="</s>", unk_token="<unk>")
+
+
+def tiny_config(preset: str = "tiny", device: str = "cpu", dtype: str = "float32",
+                max_length: int = 1024) -> VoxCPMConfig:
+    if preset not in PRESETS:
+        raise ValueError(f"Unknown preset {preset!r}, expected one of {sorted(PRESETS)}")
+    p = PRESETS[preset]
+    head_dim = p["hidden"] // p["heads"]
+    lm_config = dict(
+        bos_token_id=1,
+        eos_token_id=2,
+        hidden_size=p["hidden"],
+        intermediate_size=p["hidden"] * 2,
+        max_position_embeddings=max(4096, max_length),
+        num_attention_heads=p["heads"],
+        num_hidden_layers=p["layers"],
+        num_key_value_heads=p["kv_heads"],
+        rms_norm_eps=1e-5,
+        rope_scaling=dict(
+            type="longrope",
+            long_factor=[1.0] * (head_dim // 2),
+            short_factor=[1.0] * (head_dim // 2),
+            original_max_position_embeddings=4096,
+        ),
+        vocab_size=256,
+        scale_emb=12,
+        dim_model_base=256,
+        scale_depth=1.4,
+        rope_theta=10000,
+    )
+    local = dict(hidden_dim=p["local_hidden"], ffn_dim=p["local_hidden"] * 2,
+                 num_heads=max(2, p["local_hidden"] // 32), num_layers=p["local_layers"])
+    return VoxCPMConfig(
+        lm_config=lm_config,
+        patch_size=2,
+        feat_dim=p["feat_dim"],
+        residual_lm_num_layers=p["residual_layers"],
+        scalar_quantization_latent_dim=p["hidden"] // 2,
+        scalar_quantization_scale=9,
+        encoder_config=dict(local),
+        dit_config=dict(local, cfm_config={}),
+        audio_vae_config=AudioVAEConfig(
+            encoder_dim=p["vae_encoder_dim"],
+            latent_dim=p["feat_dim"],
+            decoder_dim=p["vae_decoder_dim"],
+            encoder_rates=[2, 5, 8, 8],
+            decoder_rates=[8, 8, 5, 2],
+        ),
+        max_length=max_length,
+        device=device,
+        dtype=dtype,
+    )
+
+
+def build_tiny_model(preset: str = "tiny", device: Optional[str] = None, dtype: str = "float32",
+                     max_length: int = 1024, seed: int = 0) -> VoxCPMModel:
+    """Randomly initialized ``VoxCPMModel`` placed like ``VoxCPMModel.from_local`` does"""
+    device = device or ("cuda" if torch.cuda.is_available() else "cpu")
+    torch.manual_seed(seed)
+    config = tiny_config(preset, device=device, dtype=dtype, max_length=max_length)
+    model = VoxCPMModel(config, tiny_tokenizer(), AudioVAE(config.audio_vae_config))
+    model = model.to(get_dtype(config.dtype))
+    model.audio_vae = model.audio_vae.to(torch.float32).prepare_for_inference()
+    return model.to(model.device).eval()
+
+
+def build_tiny_pipeline(preset: str = "tiny", device: Optional[str] = None, dtype: str = "float32",
+                        max_length: int = 1024, seed: int = 0):
+    """``VoxCPM`` pipeline around a random preset model, a stand-in for serving benchmarks"""
+    from ..core import VoxCPM
+    return VoxCPM.from_model(
+        build_tiny_model(preset, device=device, dtype=dtype, max_length=max_length, seed=seed),
+        model_path=f"tiny:{preset}:{dtype}:seed={seed}",
+    )
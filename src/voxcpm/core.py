@@ -1,10 +1,16 @@
+import io
 import os
 import re
-import tempfile
+import threading
+import time
 import numpy as np
-from typing import Generator, Optional
+import torch
+import torchaudio
+from typing import Generator, Optional, Tuple, Union
 from huggingface_hub import snapshot_download
 from .model.voxcpm import VoxCPMModel, LoRAConfig
+from .utils.metrics import record_generation, stage_timer
+from .utils.tracing import span
 
 class VoxCPM:
     def __init__(self,
@@ -14,6 +20,7 @@ class VoxCPM:
             optimize: bool = True,
             lora_config: Optional[LoRAConfig] = None,
             lora_weights_path: Optional[str] = None,
+            load_normalizer: bool = False,
         ):
         """Initialize VoxCPM TTS pipeline.
 
@@ -29,6 +36,8 @@ class VoxCPM:
                 provided without lora_config, a default config will be created.
             lora_weights_path: Path to pre-trained LoRA weights (.pth file or directory
                 containing lora_weights.ckpt). If provided, LoRA weights will be loaded.
+            load_normalizer: Build and warm up the text normalizer now instead of
+                on the first ``normalize=True`` request.
         """
         print(f"voxcpm_model_path: {voxcpm_model_path}, zipenhancer_model_path: {zipenhancer_model_path}, enable_denoiser: {enable_denoiser}")
         
@@ -42,14 +51,20 @@ class VoxCPM:
             print(f"Auto-created default LoRAConfig for loading weights from: {lora_weights_path}")
         
         self.tts_model = VoxCPMModel.from_local(voxcpm_model_path, optimize=optimize, lora_config=lora_config)
+        self.model_path = voxcpm_model_path
+        self.lora_weights_path = None
+        self._lora_active = True
         
         # Load LoRA weights if path is provided
         if lora_weights_path is not None:
             print(f"Loading LoRA weights from: {lora_weights_path}")
             loaded_keys, skipped_keys = self.tts_model.load_lora_weights(lora_weights_path)
+            self.lora_weights_path = lora_weights_path
             print(f"Loaded {len(loaded_keys)} LoRA parameters, skipped {len(skipped_keys)}")
         
         self.text_normalizer = None
+        if load_normalizer:
+            self.load_text_normalizer()
         if enable_denoiser and zipenhancer_model_path is not None:
             from .zipenhancer import ZipEnhancer
             self.denoiser = ZipEnhancer(zipenhancer_model_path)
@@ -57,6 +72,7 @@ class VoxCPM:
             self.denoiser = None
         if optimize:
             print("Warm up VoxCPMModel...")
+            self.tts_model.warmup_prefill()
             self.tts_model.generate(
                 target_text="Hello, this is the first test sentence.",
                 max_len=10,
@@ -127,6 +143,88 @@ class VoxCPM:
             **kwargs,
         )
 
+    @classmethod
+    def from_model(cls, tts_model: VoxCPMModel, denoiser=None, model_path: Optional[str] = None) -> "VoxCPM":
+        """Wrap an already constructed ``VoxCPMModel`` (e.g. a random benchmark model) without loading weights.
+
+        ``model_path`` names the weights in ``identity``; defaults to a per-object name.
+        """
+        self = cls.__new__(cls)
+        self.tts_model = tts_model
+        self.model_path = model_path if model_path is not None else f"in-memory:{id(tts_model):x}"
+        self.lora_weights_path = None
+        self._lora_active = True
+        self.text_normalizer = None
+        self.denoiser = denoiser
+        return self
+
+    _normalizer_lock = threading.Lock()
+
+    def configure_vae_from_env(self) -> "VoxCPM":
+        """Apply the serving AudioVAE settings from environment variables.
+
+        ``VAE_ENCODE_CHUNK_S``: prompt audio longer than this is encoded in chunks
+        (0 = always one pass; default 30). ``VAE_DECODER_DTYPE``: opt-in bfloat16 /
+        float16 decoder (default float32), kept only if a probe decode reaches
+        ``VAE_DECODER_MIN_SNR_DB`` (default 30) against float32.
+        """
+        audio_vae = self.tts_model.audio_vae
+        audio_vae.encode_chunk_seconds = float(os.getenv("VAE_ENCODE_CHUNK_S", "30"))
+        decoder_dtype = os.getenv("VAE_DECODER_DTYPE", "float32")
+        if decoder_dtype != "float32":
+            audio_vae.set_decoder_dtype(decoder_dtype, min_snr_db=float(os.getenv("VAE_DECODER_MIN_SNR_DB", "30")))
+        return self
+
+    @property
+    def identity(self) -> dict:
+        """Everything besides the request that decides the output (weights, LoRA, VAE precision), for cache keys"""
+        audio_vae = self.tts_model.audio_vae
+        return {
+            "model": self.model_path,
+            "lora": self.lora_weights_path if self._lora_active else None,
+            "vae_decoder_dtype": str(audio_vae.decoder_dtype),
+            "vae_encode_chunk_seconds": audio_vae.encode_chunk_seconds,
+        }
+
+    def load_text_normalizer(self, warmup: bool = True):
+        """Return the text normalizer, building (and warming up) it on first use"""
+        with self._normalizer_lock:
+            if self.text_normalizer is None:
+                from .utils.text_normalize import TextNormalizer
+                normalizer = TextNormalizer()
+                self.text_normalizer = normalizer.warmup() if warmup else normalizer
+        return self.text_normalizer
+
+    def build_prompt_cache(self,
+            prompt_wav_path: str = None,
+            prompt_text: str = None,
+            denoise: bool = False,
+            prompt_wav: Optional[Union[bytes, Tuple[np.ndarray, int]]] = None,
+        ) -> dict:
+        """Load (and optionally denoise) a voice prompt once, for the ``prompt_cache`` argument of ``generate``"""
+        if prompt_wav_path is not None and prompt_wav is not None:
+            raise ValueError("pass either prompt_wav_path or prompt_wav, not both")
+        prompt_source = prompt_wav if prompt_wav is not None else prompt_wav_path
+        
+        if prompt_wav_path is not None:
+            if not os.path.exists(prompt_wav_path):
+                raise FileNotFoundError(f"prompt_wav_path does not exist: {prompt_wav_path}")
+        
+        if prompt_source is None or prompt_text is None:
+            raise ValueError("prompt audio (prompt_wav_path or prompt_wav) and prompt_text must both be provided or both be None")
+        
+        with span("build_prompt_cache", denoise=bool(denoise and self.denoiser is not None)):
+            with stage_timer("prompt_load"):
+                if denoise and self.denoiser is not None:
+                    prompt_audio, prompt_sr = self.denoiser.enhance_audio(prompt_source)
+                else:
+                    prompt_audio, prompt_sr = self._load_prompt_audio(prompt_source)
+            return self.tts_model.build_prompt_cache_from_audio(
+                prompt_text=prompt_text,
+                audio=prompt_audio,
+                sample_rate=prompt_sr,
+            )
+
     def generate(self, *args, **kwargs) -> np.ndarray:
         return next(self._generate(*args, streaming=False, **kwargs))
 
@@ -147,6 +245,10 @@ class VoxCPM:
             retry_badcase_max_times : int = 3,
             retry_badcase_ratio_threshold : float = 6.0,
             streaming: bool = False,
+            seed: Optional[int] = None,
+            prompt_wav: Optional[Union[bytes, Tuple[np.ndarray, int]]] = None,
+            low_latency: bool = False,
+            prompt_cache: Optional[dict] = None,
         ) -> Generator[np.ndarray, None, None]:
         """Synthesize speech for the given text and return a single waveform.
 
@@ -170,6 +272,19 @@ class VoxCPM:
             retry_badcase_max_times: Maximum number of times to retry badcase.
             retry_badcase_ratio_threshold: Threshold for audio-to-text ratio.
             streaming: Whether to return a generator of audio chunks.
+            seed: Optional seed for the diffusion noise. With a fixed seed the
+                same inputs always produce the same waveform.
+            prompt_wav: In-memory alternative to ``prompt_wav_path``: encoded
+                audio bytes (e.g. an uploaded file) or a ``(waveform, sample_rate)``
+                tuple. The prompt is decoded and denoised without touching disk.
+            low_latency: Streaming only. Split the text with
+                ``IncrementalSegmenter`` and synthesize segment by segment, so the
+                first audio only waits for the prefill of a short first clause.
+                Without a prompt, the first segment's audio becomes the prompt of
+                the rest to keep the voice consistent.
+            prompt_cache: A prompt built once with ``build_prompt_cache``, in
+                place of prompt audio and text (e.g. for a voice reused across
+                many requests).
         Returns:
             Generator of numpy.ndarray: 1D waveform array (float32) on CPU. 
             Yields audio chunks for each generations step if ``streaming=True``,
@@ -178,40 +293,35 @@ class VoxCPM:
         if not text.strip() or not isinstance(text, str):
             raise ValueError("target text must be a non-empty string")
         
-        if prompt_wav_path is not None:
-            if not os.path.exists(prompt_wav_path):
-                raise FileNotFoundError(f"prompt_wav_path does not exist: {prompt_wav_path}")
-        
-        if (prompt_wav_path is None) != (prompt_text is None):
-            raise ValueError("prompt_wav_path and prompt_text must both be provided or both be None")
+        if prompt_cache is not None and (prompt_wav_path is not None or prompt_wav is not None):
+            raise ValueError("pass either prompt_cache or prompt audio, not both")
         
         text = text.replace("\n", " ")
         text = re.sub(r'\s+', ' ', text)
-        temp_prompt_wav_path = None
+        start = time.perf_counter()
         
-        try:
-            if prompt_wav_path is not None and prompt_text is not None:
-                if denoise and self.denoiser is not None:
-                    with tempfile.NamedTemporaryFile(delete=False, suffix='.wav') as tmp_file:
-                        temp_prompt_wav_path = tmp_file.name
-                    self.denoiser.enhance(prompt_wav_path, output_path=temp_prompt_wav_path)
-                    prompt_wav_path = temp_prompt_wav_path
-                fixed_prompt_cache = self.tts_model.build_prompt_cache(
-                    prompt_wav_path=prompt_wav_path,
-                    prompt_text=prompt_text
-                )
-            else:
-                fixed_prompt_cache = None  # will be built from the first inference
-            
-            if normalize:
-                if self.text_normalizer is None:
-                    from .utils.text_normalize import TextNormalizer
-                    self.text_normalizer = TextNormalizer()
-                text = self.text_normalizer.normalize(text)
-            
+        if prompt_cache is not None:
+            fixed_prompt_cache = prompt_cache
+        elif prompt_wav_path is not None or prompt_wav is not None or prompt_text is not None:
+            fixed_prompt_cache = self.build_prompt_cache(prompt_wav_path, prompt_text, denoise, prompt_wav=prompt_wav)
+        else:
+            fixed_prompt_cache = None  # will be built from the first inference
+        
+        if normalize:
+            text = self.load_text_normalizer().normalize(text)
+        
+        if streaming and low_latency:
+            from .utils.text_segment import split_text
+            segments = split_text(text) or [text]
+        else:
+            segments = [text]
+
+        num_samples = 0
+        prompt_cache = fixed_prompt_cache
+        for segment in segments:
             generate_result = self.tts_model._generate_with_prompt_cache(
-                            target_text=text,
-                            prompt_cache=fixed_prompt_cache,
+                            target_text=segment,
+                            prompt_cache=prompt_cache,
                             min_len=min_len,
                             max_len=max_len,
                             inference_timesteps=inference_timesteps,
@@ -220,17 +330,34 @@ class VoxCPM:
                             retry_badcase_max_times=retry_badcase_max_times,
                             retry_badcase_ratio_threshold=retry_badcase_ratio_threshold,
                             streaming=streaming,
+                            seed=seed,
                         )
-        
-            for wav, _, _ in generate_result:
-                yield wav.squeeze(0).cpu().numpy()
-        
-        finally:
-            if temp_prompt_wav_path and os.path.exists(temp_prompt_wav_path):
-                try:
-                    os.unlink(temp_prompt_wav_path)
-                except OSError:
-                    pass
+
+            pred_audio_feat = None
+            for wav, _, pred_audio_feat in generate_result:
+                wav = wav.squeeze(0).cpu().numpy()
+                num_samples += wav.shape[-1]
+                if not streaming:
+                    # generate() only pulls the first item, so record before yielding
+                    record_generation(time.perf_counter() - start, num_samples / self.tts_model.sample_rate)
+                yield wav
+            if prompt_cache is None and pred_audio_feat is not None and len(segments) > 1:
+                prompt_cache = {
+                    "prompt_text": segment,
+                    "audio_feat": torch.cat(pred_audio_feat, dim=1).squeeze(0).float().cpu(),
+                }
+        if streaming:
+            record_generation(time.perf_counter() - start, num_samples / self.tts_model.sample_rate)
+
+    @staticmethod
+    def _load_prompt_audio(source) -> Tuple[torch.Tensor, int]:
+        """Decode a prompt given as a path, encoded bytes or ``(waveform, sample_rate)``."""
+        if isinstance(source, tuple):
+            waveform, sr = source
+            return torch.as_tensor(waveform, dtype=torch.float32), int(sr)
+        if isinstance(source, (bytes, bytearray)):
+            source = io.BytesIO(source)
+        return torchaudio.load(source)
 
     # ------------------------------------------------------------------ #
     # LoRA Interface (delegated to VoxCPMModel)
@@ -253,11 +380,14 @@ class VoxCPM:
                 "Cannot load LoRA weights: model was not initialized with LoRA config. "
                 "Please reinitialize with lora_config or lora_weights_path parameter."
             )
-        return self.tts_model.load_lora_weights(lora_weights_path)
+        result = self.tts_model.load_lora_weights(lora_weights_path)
+        self.lora_weights_path = lora_weights_path
+        return result
 
     def unload_lora(self):
         """Unload LoRA by resetting all LoRA weights to initial state (effectively disabling LoRA)."""
         self.tts_model.reset_lora_weights()
+        self.lora_weights_path = None
     
     def set_lora_enabled(self, enabled: bool):
         """Enable or disable LoRA layers without unloading weights.
@@ -266,6 +396,7 @@ class VoxCPM:
             enabled: If True, LoRA layers are active; if False, only base model is used.
         """
         self.tts_model.set_lora_enabled(enabled)
+        self._lora_active = enabled
     
     def get_lora_state_dict(self) -> dict:
         """Get current LoRA parameters state dict.
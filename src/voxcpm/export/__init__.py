@@ -0,0 +1,5 @@
+from .onnx_export import export_onnx
+
+__all__ = [
+    "export_onnx",
+]
@@ -0,0 +1,45 @@
+"""
+Export a VoxCPM checkpoint (or a random benchmark preset) to ONNX:
+
+    python -m voxcpm.export --model_dir /path/to/VoxCPM-0.5B --output_dir voxcpm-onnx
+    python -m voxcpm.export --preset tiny --output_dir /tmp/voxcpm-tiny-onnx
+
+The output directory is self-contained; see ``voxcpm.export.runtime``.
+"""
+
+import argparse
+
+import torch
+
+from . import export_onnx
+
+
+def parse_args():
+    parser = argparse.ArgumentParser("python -m voxcpm.export", description="Export VoxCPM inference graphs to ONNX")
+    parser.add_argument("--model_dir", type=str, default="", help="Local checkpoint directory")
+    parser.add_argument("--preset", type=str, default="tiny", help="Random benchmark preset when no --model_dir")
+    parser.add_argument("--output_dir", type=str, required=True)
+    parser.add_argument("--opset", type=int, default=17)
+    parser.add_argument("--no_verify", action="store_true", help="Skip the onnxruntime comparison")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.model_dir:
+        from ..model.voxcpm import VoxCPMModel
+        model = VoxCPMModel.from_local(args.model_dir, optimize=False)
+    else:
+        from ..benchmark import build_tiny_model
+        model = build_tiny_model(args.preset, device="cpu")
+    model = model.to("cpu").to(torch.float32)
+
+    errors = export_onnx(model, args.output_dir, opset=args.opset, verify=not args.no_verify)
+    if errors is not None:
+        for name, error in errors.items():
+            print(f"{name:<20} max abs error {error:.2e}")
+    print(f"Exported to {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
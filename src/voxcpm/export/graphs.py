@@ -0,0 +1,216 @@
+"""
+Export-friendly views of the VoxCPM inference stages.
+
+Each module here wraps submodules of a loaded ``VoxCPMModel`` (sharing its
+weights) and reproduces one stage of ``VoxCPMModel._inference`` with plain
+tensor inputs and outputs, so it can be traced by ``torch.onnx.export``:
+
+* the LM decode steps take the past KV cache of every layer as one stacked
+  ``[2, layers, batch, kv_heads, past_len, head_dim]`` tensor and return it
+  with the new position appended, instead of writing into a ``StaticKVCache``;
+* the RoPE position of a step is the past length, so no position input is needed;
+* grouped-query attention repeats the KV heads explicitly, since
+  ``scaled_dot_product_attention(enable_gqa=True)`` has no ONNX conversion.
+"""
+
+import math
+from typing import Optional, Tuple
+
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+
+from ..modules.minicpm4.model import MiniCPMAttention, MiniCPMDecoderLayer, MiniCPMModel, apply_rotary_pos_emb
+
+
+def _attention(
+    attn: MiniCPMAttention,
+    hidden: torch.Tensor,
+    cos: torch.Tensor,
+    sin: torch.Tensor,
+    past_key: Optional[torch.Tensor],
+    past_value: Optional[torch.Tensor],
+    is_causal: bool,
+) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+    bsz, q_len, _ = hidden.size()
+    query = attn.q_proj(hidden).view(bsz, q_len, attn.num_heads, attn.head_dim).transpose(1, 2)
+    key = attn.k_proj(hidden).view(bsz, q_len, attn.num_key_value_heads, attn.head_dim).transpose(1, 2)
+    value = attn.v_proj(hidden).view(bsz, q_len, attn.num_key_value_heads, attn.head_dim).transpose(1, 2)
+    query, key = apply_rotary_pos_emb(query, key, cos, sin)
+    if past_key is not None:
+        key = torch.cat([past_key, key], dim=2)
+        value = torch.cat([past_value, value], dim=2)
+
+    groups = attn.num_key_value_groups
+    if groups > 1:
+        # kv head j serves query heads j * groups ... (j + 1) * groups - 1, as with enable_gqa
+        shape = (bsz, attn.num_heads, key.size(2), attn.head_dim)
+        key_states = key.unsqueeze(2).expand(bsz, attn.num_key_value_heads, groups, key.size(2), attn.head_dim)
+        value_states = value.unsqueeze(2).expand(bsz, attn.num_key_value_heads, groups, value.size(2), attn.head_dim)
+        key_states, value_states = key_states.reshape(shape), value_states.reshape(shape)
+    else:
+        key_states, value_states = key, value
+
+    # a causal mask only matters for multi-token inputs without a past (the prefill)
+    output = F.scaled_dot_product_attention(query, key_states, value_states, is_causal=is_causal and past_key is None)
+    output = output.transpose(1, 2).reshape(bsz, q_len, attn.num_heads * attn.head_dim)
+    return attn.o_proj(output), key, value
+
+
+def _decoder_layer(layer: MiniCPMDecoderLayer, hidden, cos, sin, past_key, past_value, is_causal):
+    residual_scale = layer.scale_depth / math.sqrt(layer.num_hidden_layers) if layer.use_mup else 1.0
+    out, key, value = _attention(
+        layer.self_attn, layer.input_layernorm(hidden), cos, sin, past_key, past_value, is_causal
+    )
+    hidden = hidden + out * residual_scale
+    hidden = hidden + layer.mlp(layer.post_attention_layernorm(hidden)) * residual_scale
+    return hidden, key, value
+
+
+def run_minicpm(
+    lm: MiniCPMModel,
+    inputs_embeds: torch.Tensor,
+    past_key_values: Optional[torch.Tensor] = None,
+    is_causal: bool = True,
+) -> Tuple[torch.Tensor, torch.Tensor]:
+    """``MiniCPMModel`` over ``inputs_embeds`` [b, t, h] positioned after ``past_key_values``.
+
+    Returns the normed hidden states and the stacked keys/values of every layer,
+    past included: ``[2, layers, b, kv_heads, past_len + t, head_dim]``.
+    """
+    start = 0 if past_key_values is None else past_key_values.size(4)
+    end = start + inputs_embeds.size(1)
+    cos, sin = lm.rope_emb.cos_cached[start:end], lm.rope_emb.sin_cached[start:end]
+
+    hidden = inputs_embeds
+    keys, values = [], []
+    for i, layer in enumerate(lm.layers):
+        past_key = past_value = None
+        if past_key_values is not None:
+            past_key, past_value = past_key_values[0, i], past_key_values[1, i]
+        hidden, key, value = _decoder_layer(layer, hidden, cos, sin, past_key, past_value, is_causal)
+        keys.append(key)
+        values.append(value)
+    return lm.norm(hidden), torch.stack([torch.stack(keys), torch.stack(values)])
+
+
+class FeatEncoderGraph(nn.Module):
+    """feat [b, t, p, d] -> LM-space embedding [b, t, h] (``feat_encoder`` + ``enc_to_lm_proj``)"""
+
+    def __init__(self, model):
+        super().__init__()
+        self.feat_encoder = model.feat_encoder
+        self.enc_to_lm_proj = model.enc_to_lm_proj
+
+    def forward(self, feat: torch.Tensor) -> torch.Tensor:
+        B, T, P, D = feat.shape
+        encoder = self.feat_encoder
+        x = encoder.in_proj(feat)
+        x = torch.cat([encoder.special_token.expand(B, T, 1, -1), x], dim=2).reshape(B * T, P + 1, -1)
+        hidden, _ = run_minicpm(encoder.encoder, x, is_causal=False)
+        return self.enc_to_lm_proj(hidden[:, 0, :].reshape(B, T, -1))
+
+
+class PrefillGraph(nn.Module):
+    """Prompt prefill of both LMs: the prefill block of ``_inference`` up to the decode loop"""
+
+    def __init__(self, model):
+        super().__init__()
+        self.base_lm = model.base_lm
+        self.residual_lm = model.residual_lm
+        self.fsq_layer = model.fsq_layer
+        lm_config = model.config.lm_config
+        self.scale_emb = lm_config.scale_emb if lm_config.use_mup else 1.0
+
+    def forward(self, text_ids, text_mask, feat_mask, feat_embed):
+        text_mask = text_mask.unsqueeze(-1)
+        feat_mask = feat_mask.unsqueeze(-1)
+        text_embed = self.base_lm.embed_tokens(text_ids) * self.scale_emb
+        combined_embed = text_mask * text_embed + feat_mask * feat_embed
+
+        enc_outputs, base_kv = run_minicpm(self.base_lm, combined_embed)
+        enc_outputs = self.fsq_layer(enc_outputs) * feat_mask + enc_outputs * text_mask
+        residual_outputs, residual_kv = run_minicpm(self.residual_lm, enc_outputs + feat_mask * feat_embed)
+        return enc_outputs[:, -1, :], residual_outputs[:, -1, :], base_kv, residual_kv
+
+
+class BaseLMStepGraph(nn.Module):
+    """One ``base_lm.forward_step`` followed by ``fsq_layer``, with explicit KV in/out"""
+
+    def __init__(self, model):
+        super().__init__()
+        self.base_lm = model.base_lm
+        self.fsq_layer = model.fsq_layer
+
+    def forward(self, inputs_embeds, past_key_values):
+        hidden, present = run_minicpm(self.base_lm, inputs_embeds.unsqueeze(1), past_key_values)
+        return self.fsq_layer(hidden[:, 0, :]), present
+
+
+class ResidualLMStepGraph(nn.Module):
+    """One ``residual_lm.forward_step`` with explicit KV in/out"""
+
+    def __init__(self, model):
+        super().__init__()
+        self.residual_lm = model.residual_lm
+
+    def forward(self, inputs_embeds, past_key_values):
+        hidden, present = run_minicpm(self.residual_lm, inputs_embeds.unsqueeze(1), past_key_values)
+        return hidden[:, 0, :], present
+
+
+class DiTEstimatorGraph(nn.Module):
+    """``VoxCPMLocDiT.forward``: velocity of x [n, c, p] given mu, t, cond and dt"""
+
+    def __init__(self, model):
+        super().__init__()
+        self.estimator = model.feat_decoder.estimator
+
+    def forward(self, x, mu, t, cond, dt):
+        dit = self.estimator
+        x = dit.in_proj(x.transpose(1, 2))
+        cond = dit.cond_proj(cond.transpose(1, 2))
+        prefix = cond.size(1)
+        t = dit.time_mlp(dit.time_embeddings(t).to(x.dtype)) + dit.delta_time_mlp(dit.time_embeddings(dt).to(x.dtype))
+        x = torch.cat([(mu + t).unsqueeze(1), cond, x], dim=1)
+        hidden, _ = run_minicpm(dit.decoder, x, is_causal=False)
+        return dit.out_proj(hidden[:, prefix + 1:, :]).transpose(1, 2)
+
+
+class HeadsGraph(nn.Module):
+    """Stop logits and the DiT condition ``mu`` from the two LM hidden states"""
+
+    def __init__(self, model):
+        super().__init__()
+        self.stop_proj = model.stop_proj
+        self.stop_actn = model.stop_actn
+        self.stop_head = model.stop_head
+        self.lm_to_dit_proj = model.lm_to_dit_proj
+        self.res_to_dit_proj = model.res_to_dit_proj
+
+    def forward(self, lm_hidden, residual_hidden):
+        stop_logits = self.stop_head(self.stop_actn(self.stop_proj(lm_hidden)))
+        dit_mu = self.lm_to_dit_proj(lm_hidden) + self.res_to_dit_proj(residual_hidden)
+        return stop_logits, dit_mu
+
+
+class VAEEncoderGraph(nn.Module):
+    """Hop-padded audio [b, 1, n] -> latent mean [b, d, n / hop]"""
+
+    def __init__(self, model):
+        super().__init__()
+        self.encoder = model.audio_vae.encoder
+
+    def forward(self, audio):
+        return self.encoder(audio)["mu"]
+
+
+class VAEDecoderGraph(nn.Module):
+    """Latent [b, d, t] -> audio [b, 1, t * hop]"""
+
+    def __init__(self, model):
+        super().__init__()
+        self.decoder = model.audio_vae.decoder
+
+    def forward(self, latent):
+        return self.decoder(latent)
@@ -0,0 +1,152 @@
+"""
+Export a ``VoxCPMModel`` as separate ONNX graphs for ``runtime.OnnxVoxCPM``.
+
+The output directory holds one graph per inference stage, the tokenizer and an
+``export_config.json`` with the constants the decode loop needs, plus a copy of
+``runtime.py`` (``voxcpm_onnx.py``), so it runs with numpy, onnxruntime and
+tokenizers alone:
+
+    python -m voxcpm.export --model_dir openbmb/VoxCPM-0.5B --output_dir voxcpm-onnx
+    python voxcpm-onnx/voxcpm_onnx.py voxcpm-onnx --text "你好" --output out.wav
+"""
+
+import json
+import os
+import shutil
+from typing import Dict, Optional
+
+import torch
+
+from .graphs import (
+    BaseLMStepGraph, DiTEstimatorGraph, FeatEncoderGraph, HeadsGraph, PrefillGraph, ResidualLMStepGraph,
+    VAEDecoderGraph, VAEEncoderGraph,
+)
+
+try:
+    import onnxruntime as ort
+    ORT_AVAILABLE = True
+except ImportError:
+    ORT_AVAILABLE = False
+
+RUNTIME_SCRIPT = "voxcpm_onnx.py"
+
+
+def _kv_shape(lm, batch: int, length: int):
+    config = lm.config
+    head_dim = config.kv_channels or config.hidden_size // config.num_attention_heads
+    return (2, config.num_hidden_layers, batch, config.num_key_value_heads, length, head_dim)
+
+
+def _graph_specs(model) -> Dict[str, tuple]:
+    """name -> (module, example inputs, input names, output names, dynamic axes)"""
+    P, D = model.patch_size, model.feat_dim
+    H = model.config.lm_config.hidden_size
+    H_dit = model.config.dit_config.hidden_dim
+    vae = model.audio_vae
+    kv_axes = {2: "batch", 4: "past_len"}
+    present_axes = {2: "batch", 4: "total_len"}
+    return {
+        "feat_encoder": (
+            FeatEncoderGraph(model), (torch.randn(1, 3, P, D),),
+            ["feat"], ["feat_embed"],
+            {"feat": {0: "batch", 1: "seq_len"}, "feat_embed": {0: "batch", 1: "seq_len"}},
+        ),
+        "prefill": (
+            PrefillGraph(model),
+            (torch.ones(1, 5, dtype=torch.long), torch.tensor([[1.0, 1, 1, 0, 0]]),
+             torch.tensor([[0.0, 0, 0, 1, 1]]), torch.randn(1, 5, H)),
+            ["text_ids", "text_mask", "feat_mask", "feat_embed"],
+            ["lm_hidden", "residual_hidden", "base_kv", "residual_kv"],
+            {
+                "text_ids": {1: "seq_len"}, "text_mask": {1: "seq_len"}, "feat_mask": {1: "seq_len"},
+                "feat_embed": {1: "seq_len"}, "base_kv": {4: "seq_len"}, "residual_kv": {4: "seq_len"},
+            },
+        ),
+        "base_lm_step": (
+            BaseLMStepGraph(model), (torch.randn(1, H), torch.randn(*_kv_shape(model.base_lm, 1, 5))),
+            ["inputs_embeds", "past_key_values"], ["lm_hidden", "present_key_values"],
+            {"inputs_embeds": {0: "batch"}, "past_key_values": kv_axes, "lm_hidden": {0: "batch"},
+             "present_key_values": present_axes},
+        ),
+        "residual_lm_step": (
+            ResidualLMStepGraph(model), (torch.randn(1, H), torch.randn(*_kv_shape(model.residual_lm, 1, 5))),
+            ["inputs_embeds", "past_key_values"], ["residual_hidden", "present_key_values"],
+            {"inputs_embeds": {0: "batch"}, "past_key_values": kv_axes, "residual_hidden": {0: "batch"},
+             "present_key_values": present_axes},
+        ),
+        "dit_estimator": (
+            DiTEstimatorGraph(model),
+            (torch.randn(2, D, P), torch.randn(2, H_dit), torch.rand(2), torch.randn(2, D, P), torch.zeros(2)),
+            ["x", "mu", "t", "cond", "dt"], ["velocity"],
+            {"x": {0: "batch"}, "mu": {0: "batch"}, "t": {0: "batch"}, "cond": {0: "batch", 2: "cond_len"},
+             "dt": {0: "batch"}, "velocity": {0: "batch"}},
+        ),
+        "heads": (
+            HeadsGraph(model), (torch.randn(1, H), torch.randn(1, H)),
+            ["lm_hidden", "residual_hidden"], ["stop_logits", "dit_mu"],
+            {"lm_hidden": {0: "batch"}, "residual_hidden": {0: "batch"}, "stop_logits": {0: "batch"},
+             "dit_mu": {0: "batch"}},
+        ),
+        "vae_encoder": (
+            VAEEncoderGraph(model), (torch.randn(1, 1, int(vae.hop_length) * 4),),
+            ["audio"], ["latent"],
+            {"audio": {0: "batch", 2: "num_samples"}, "latent": {0: "batch", 2: "num_frames"}},
+        ),
+        "vae_decoder": (
+            VAEDecoderGraph(model), (torch.randn(1, vae.latent_dim, 3 * P),),
+            ["latent"], ["audio"],
+            {"latent": {0: "batch", 2: "num_frames"}, "audio": {0: "batch", 2: "num_samples"}},
+        ),
+    }
+
+
+def _runtime_config(model) -> dict:
+    return {
+        "patch_size": model.patch_size,
+        "feat_dim": model.feat_dim,
+        "latent_dim": model.audio_vae.latent_dim,
+        "sample_rate": model.sample_rate,
+        "chunk_size": model.chunk_size,
+        "hop_length": int(model.audio_vae.hop_length),
+        "audio_start_token": model.audio_start_token,
+        "dit_mean_mode": bool(model.feat_decoder.mean_mode),
+    }
+
+
+@torch.inference_mode()
+def export_onnx(model, output_dir: str, opset: int = 17, verify: bool = True) -> Optional[Dict[str, float]]:
+    """Write every inference graph of ``model`` to ``output_dir`` as ONNX.
+
+    The model must be a float32 inference model on CPU (e.g.
+    ``VoxCPMModel.from_local(path, optimize=False).to("cpu").float()``).
+    With ``verify`` and onnxruntime installed, each graph is run once on its
+    example inputs and the max abs difference against PyTorch is returned.
+    """
+    dtypes = {p.dtype for p in model.parameters()}
+    if dtypes != {torch.float32}:
+        raise ValueError(f"ONNX export expects a float32 model, got {sorted(map(str, dtypes))}")
+    if model.audio_vae.decoder_dtype != torch.float32:
+        raise ValueError("ONNX export expects the AudioVAE decoder in float32")
+    model = model.eval()
+    os.makedirs(output_dir, exist_ok=True)
+
+    errors = {}
+    for name, (module, inputs, input_names, output_names, dynamic_axes) in _graph_specs(model).items():
+        path = os.path.join(output_dir, f"{name}.onnx")
+        torch.onnx.export(
+            module, inputs, path,
+            input_names=input_names, output_names=output_names, dynamic_axes=dynamic_axes,
+            opset_version=opset, do_constant_folding=True,
+        )
+        if verify and ORT_AVAILABLE:
+            session = ort.InferenceSession(path, providers=["CPUExecutionProvider"])
+            actual = session.run(None, {k: v.numpy() for k, v in zip(input_names, inputs)})
+            expected = module(*inputs)
+            expected = expected if isinstance(expected, tuple) else (expected,)
+            errors[name] = max(float((e - torch.from_numpy(a)).abs().max()) for e, a in zip(expected, actual))
+
+    model.text_tokenizer.tokenizer.backend_tokenizer.save(os.path.join(output_dir, "tokenizer.json"))
+    with open(os.path.join(output_dir, "export_config.json"), "w") as f:
+        json.dump(_runtime_config(model), f, indent=2)
+    shutil.copyfile(os.path.join(os.path.dirname(__file__), "runtime.py"), os.path.join(output_dir, RUNTIME_SCRIPT))
+    return errors if verify and ORT_AVAILABLE else None
@@ -0,0 +1,271 @@
+"""
+VoxCPM inference on onnxruntime and numpy, without PyTorch.
+
+Runs the graphs written by ``voxcpm.export.export_onnx`` with the same decode
+loop as ``VoxCPMModel._inference``: prefill both LMs, then per patch solve the
+flow-matching ODE with the DiT estimator (Euler, CFG-zero*), re-encode the patch,
+check the stop head and advance both LMs one step with explicit KV tensors.
+
+The export copies this file next to the graphs as ``voxcpm_onnx.py``; it only
+needs numpy, onnxruntime and tokenizers:
+
+    python voxcpm_onnx.py EXPORT_DIR --text "你好，欢迎使用 VoxCPM。" --output out.wav
+
+Text normalization and prompt denoising of ``VoxCPM.generate`` are not part of
+the graphs; pass normalized text and clean prompt audio at the model sample rate.
+Diffusion noise comes from numpy, so a seed reproduces runs of this driver but
+not the PyTorch model's audio for the same seed.
+"""
+
+import argparse
+import json
+import os
+import wave
+from typing import Iterator, List, Optional
+
+import numpy as np
+import onnxruntime as ort
+from tokenizers import Tokenizer
+
+GRAPHS = (
+    "feat_encoder", "prefill", "base_lm_step", "residual_lm_step", "dit_estimator", "heads", "vae_encoder",
+    "vae_decoder",
+)
+
+
+def _is_chinese(token: str) -> bool:
+    return all("\u4e00" <= c <= "\u9fff" for c in token)
+
+
+class OnnxVoxCPM:
+    def __init__(self, export_dir: str, providers: Optional[List[str]] = None, num_threads: int = 0):
+        with open(os.path.join(export_dir, "export_config.json")) as f:
+            self.config = json.load(f)
+        self.patch_size = self.config["patch_size"]
+        self.feat_dim = self.config["feat_dim"]
+        self.sample_rate = self.config["sample_rate"]
+
+        options = ort.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        providers = providers or ["CPUExecutionProvider"]
+        self.sessions = {
+            name: ort.InferenceSession(os.path.join(export_dir, f"{name}.onnx"), options, providers=providers)
+            for name in GRAPHS
+        }
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(export_dir, "tokenizer.json"))
+        # same splitting as ``mask_multichar_chinese_tokens``
+        self.multichar_tokens = {t for t in self.tokenizer.get_vocab() if len(t) >= 2 and _is_chinese(t)}
+        unk_token = json.loads(self.tokenizer.to_str())["model"].get("unk_token")
+        self.unk_id = self.tokenizer.token_to_id(unk_token) if unk_token else None
+
+    def _run(self, name: str, **inputs) -> List[np.ndarray]:
+        return self.sessions[name].run(None, inputs)
+
+    def tokenize(self, text: str) -> List[int]:
+        ids = []
+        for token in self.tokenizer.encode(text, add_special_tokens=False).tokens:
+            clean_token = token.replace("▁", "")
+            for piece in (clean_token if clean_token in self.multichar_tokens else [token]):
+                token_id = self.tokenizer.token_to_id(piece)
+                ids.append(self.unk_id if token_id is None else token_id)
+        return ids
+
+    def encode_prompt(self, audio: np.ndarray, sample_rate: int) -> np.ndarray:
+        """Prompt latents [t, p, d] from a waveform (T,) or (channels, T)"""
+        if sample_rate != self.sample_rate:
+            raise ValueError(f"prompt audio must be {self.sample_rate} Hz, got {sample_rate} Hz")
+        audio = np.asarray(audio, dtype=np.float32)
+        if audio.ndim == 2:
+            audio = audio.mean(axis=0)
+        patch_len = self.patch_size * self.config["chunk_size"]
+        # left padding keeps the real audio at the end, next to the generated patches
+        audio = np.pad(audio, ((-len(audio)) % patch_len, 0))
+        latent, = self._run("vae_encoder", audio=audio[None, None])
+        return latent[0].reshape(self.config["latent_dim"], -1, self.patch_size).transpose(1, 2, 0)
+
+    def decode(self, latent: np.ndarray) -> np.ndarray:
+        """Latent [b, d, t] -> audio [b, t * hop]"""
+        audio, = self._run("vae_decoder", latent=np.ascontiguousarray(latent, dtype=np.float32))
+        return audio[:, 0]
+
+    def generate(self, text: str, **kwargs) -> np.ndarray:
+        return next(self._generate(text, streaming=False, **kwargs))
+
+    def generate_streaming(self, text: str, **kwargs) -> Iterator[np.ndarray]:
+        return self._generate(text, streaming=True, **kwargs)
+
+    def _generate(
+        self,
+        text: str,
+        prompt_text: str = "",
+        prompt_feat: Optional[np.ndarray] = None,
+        min_len: int = 2,
+        max_len: int = 2000,
+        inference_timesteps: int = 10,
+        cfg_value: float = 2.0,
+        retry_badcase: bool = False,
+        retry_badcase_max_times: int = 3,
+        retry_badcase_ratio_threshold: float = 6.0,
+        streaming: bool = False,
+        seed: Optional[int] = None,
+    ) -> Iterator[np.ndarray]:
+        """Mirror of ``VoxCPMModel._generate_with_prompt_cache``; ``prompt_feat`` comes from ``encode_prompt``"""
+        P, D = self.patch_size, self.feat_dim
+        if prompt_feat is None:
+            prompt_feat = np.zeros((0, P, D), dtype=np.float32)
+            full_text = text
+        else:
+            full_text = prompt_text + text
+        text_ids = self.tokenize(full_text) + [self.config["audio_start_token"]]
+        text_length, audio_length = len(text_ids), len(prompt_feat)
+
+        text_ids = np.array([text_ids + [0] * audio_length], dtype=np.int64)
+        feat = np.concatenate([np.zeros((text_length, P, D), dtype=np.float32), prompt_feat])[None]
+        text_mask = np.concatenate([np.ones(text_length), np.zeros(audio_length)])[None].astype(np.float32)
+        feat_mask = 1.0 - text_mask
+
+        target_text_length = len(self.tokenize(text))
+        max_len = min(int(target_text_length * retry_badcase_ratio_threshold + 10), max_len)
+        rng = np.random.default_rng(seed)
+        if streaming:
+            patch_len = P * self.config["chunk_size"]
+            for latent in self._inference(
+                text_ids, text_mask, feat, feat_mask, min_len, max_len, inference_timesteps, cfg_value, rng, True
+            ):
+                yield self.decode(latent)[0, -patch_len:]
+            return
+
+        for _ in range(retry_badcase_max_times):
+            latent, num_patches = next(self._inference(
+                text_ids, text_mask, feat, feat_mask, min_len, max_len, inference_timesteps, cfg_value, rng, False
+            ))
+            if not retry_badcase or num_patches < target_text_length * retry_badcase_ratio_threshold:
+                break
+        yield self.decode(latent)[0]
+
+    def _inference(self, text_ids, text_mask, feat, feat_mask, min_len, max_len, inference_timesteps, cfg_value,
+                   rng, streaming, streaming_prefix_len: int = 3):
+        feat_embed, = self._run("feat_encoder", feat=feat)
+        lm_hidden, residual_hidden, base_kv, residual_kv = self._run(
+            "prefill", text_ids=text_ids, text_mask=text_mask, feat_mask=feat_mask, feat_embed=feat_embed
+        )
+
+        prefix_feat_cond = feat[:, -1]  # b, p, d
+        pred_feat_seq = []
+        for i in range(max_len):
+            stop_logits, dit_mu = self._run("heads", lm_hidden=lm_hidden, residual_hidden=residual_hidden)
+            pred_feat = self._solve_euler(
+                dit_mu, prefix_feat_cond.transpose(0, 2, 1), inference_timesteps, cfg_value, rng
+            ).transpose(0, 2, 1)  # b, p, d
+            curr_embed, = self._run("feat_encoder", feat=np.ascontiguousarray(pred_feat[:, None]))
+            curr_embed = curr_embed[:, 0]
+            pred_feat_seq.append(pred_feat)
+            prefix_feat_cond = pred_feat
+
+            if streaming:
+                # the last patches give the causal decoder enough context for a smooth chunk
+                yield self._to_latent(pred_feat_seq[-streaming_prefix_len:])
+
+            if i > min_len and stop_logits[0].argmax() == 1:
+                break
+
+            lm_hidden, base_kv = self._run("base_lm_step", inputs_embeds=curr_embed, past_key_values=base_kv)
+            residual_hidden, residual_kv = self._run(
+                "residual_lm_step", inputs_embeds=lm_hidden + curr_embed, past_key_values=residual_kv
+            )
+
+        if not streaming:
+            yield self._to_latent(pred_feat_seq), len(pred_feat_seq)
+
+    @staticmethod
+    def _to_latent(patches: List[np.ndarray]) -> np.ndarray:
+        """[b, p, d] patches -> latent [b, d, t * p]"""
+        seq = np.stack(patches, axis=1)
+        b, t, p, d = seq.shape
+        return seq.transpose(0, 3, 1, 2).reshape(b, d, t * p)
+
+    def _solve_euler(self, mu: np.ndarray, cond: np.ndarray, n_timesteps: int, cfg_value: float,
+                     rng: np.random.Generator, sway_sampling_coef: float = 1.0) -> np.ndarray:
+        """``UnifiedCFM.forward`` + ``solve_euler`` with CFG-zero*; returns x [b, c, p]"""
+        b = mu.shape[0]
+        x = rng.standard_normal((b, self.feat_dim, self.patch_size), dtype=np.float32)
+        t_span = np.linspace(1, 0, n_timesteps + 1, dtype=np.float32)
+        t_span = t_span + sway_sampling_coef * (np.cos(np.pi / 2 * t_span) - 1 + t_span)
+
+        t, dt = t_span[0], t_span[0] - t_span[1]
+        mu_in = np.concatenate([mu, np.zeros_like(mu)])
+        cond_in = np.concatenate([cond, cond])
+        zero_init_steps = max(1, int(len(t_span) * 0.04))
+        for step in range(1, len(t_span)):
+            if step <= zero_init_steps:
+                dphi_dt = np.zeros_like(x)
+            else:
+                # conditional and unconditional (mu = 0) halves in one batch
+                velocity, = self._run(
+                    "dit_estimator",
+                    x=np.concatenate([x, x]),
+                    mu=mu_in,
+                    t=np.full(2 * b, t, dtype=np.float32),
+                    cond=cond_in,
+                    dt=np.full(2 * b, dt if self.config["dit_mean_mode"] else 0.0, dtype=np.float32),
+                )
+                positive, negative = velocity[:b], velocity[b:]
+                st_star = (
+                    np.sum(positive * negative, axis=(1, 2), keepdims=True)
+                    / (np.sum(negative ** 2, axis=(1, 2), keepdims=True) + 1e-8)
+                )
+                dphi_dt = negative * st_star + cfg_value * (positive - negative * st_star)
+            x = x - dt * dphi_dt
+            t = t - dt
+            if step < len(t_span) - 1:
+                dt = t - t_span[step + 1]
+        return x
+
+
+def read_wav(path: str):
+    with wave.open(path, "rb") as f:
+        if f.getsampwidth() != 2:
+            raise ValueError("only 16-bit PCM WAV prompts are supported")
+        audio = np.frombuffer(f.readframes(f.getnframes()), dtype=np.int16).astype(np.float32) / 32768.0
+        return audio.reshape(-1, f.getnchannels()).T, f.getframerate()
+
+
+def write_wav(path: str, audio: np.ndarray, sample_rate: int):
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes((np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16).tobytes())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="VoxCPM inference on onnxruntime")
+    parser.add_argument("export_dir", type=str)
+    parser.add_argument("--text", type=str, required=True)
+    parser.add_argument("--prompt_wav", type=str, default="", help="16-bit WAV at the model sample rate")
+    parser.add_argument("--prompt_text", type=str, default="")
+    parser.add_argument("--output", type=str, default="output.wav")
+    parser.add_argument("--timesteps", type=int, default=10)
+    parser.add_argument("--cfg_value", type=float, default=2.0)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--threads", type=int, default=0)
+    args = parser.parse_args()
+
+    model = OnnxVoxCPM(args.export_dir, num_threads=args.threads)
+    prompt_feat = None
+    if args.prompt_wav:
+        if not args.prompt_text:
+            parser.error("--prompt_text is required with --prompt_wav")
+        prompt_feat = model.encode_prompt(*read_wav(args.prompt_wav))
+    audio = model.generate(
+        args.text, prompt_text=args.prompt_text, prompt_feat=prompt_feat,
+        inference_timesteps=args.timesteps, cfg_value=args.cfg_value, seed=args.seed,
+    )
+    write_wav(args.output, audio, model.sample_rate)
+    print(f"Saved {len(audio) / model.sample_rate:.2f}s of audio to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
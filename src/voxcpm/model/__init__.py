@@ -1,3 +1,4 @@
 from .voxcpm import VoxCPMModel
+from .session import GenerationSession
 
-__all__ = ["VoxCPMModel"]
+__all__ = ["VoxCPMModel", "GenerationSession"]
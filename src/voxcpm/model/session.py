@@ -0,0 +1,118 @@
+"""
+Multi-segment generation that carries text/audio context across segments.
+
+``GenerationSession`` synthesizes long-form text one segment at a time.
+Every segment is conditioned on the voice prompt plus the most recent
+segments it generated (merged with ``VoxCPMModel.merge_prompt_cache``), so the
+voice stays consistent from one sentence to the next. A sliding window drops
+the oldest generated segments once the context exceeds ``max_context_frames``
+or ``max_segments``. The prefill cost of a segment is then bounded, instead of
+growing with everything spoken so far.
+
+The model reads its input as ``[prompt text + target text, <audio start>,
+prompt audio]``. A new segment's text is inserted before all the context audio,
+so the keys/values of that audio cannot be reused and are prefilled again.
+What does carry over is the text prefix: while the window does not slide, the
+next sequence starts with the previous one's text. The base and residual LM
+caches of that prefix are kept between segments, and only the rest is prefilled.
+
+A session decodes in its model's shared KV caches. In a server where the
+``StreamScheduler`` interleaves streams on the same model, run each segment
+through it, e.g. ``stream_scheduler.run(pipeline, session.generate, text)``.
+"""
+
+from typing import Generator, List, Optional, Tuple, Union
+
+import torch
+
+
+class GenerationSession:
+    """Generate consecutive segments of one narration with shared context.
+
+    Args:
+        model: The ``VoxCPMModel`` to generate with.
+        prompt_cache: Optional voice prompt (``build_prompt_cache``); it is
+            always kept at the start of the context.
+        max_context_frames: Audio frames (patches) of generated segments kept
+            as context; the oldest segments are dropped beyond this.
+        max_segments: Generated segments kept as context.
+    """
+
+    def __init__(self, model, prompt_cache: Optional[dict] = None, max_context_frames: int = 200,
+                 max_segments: int = 3):
+        self.model = model
+        self.anchor = prompt_cache
+        self.max_context_frames = max_context_frames
+        self.max_segments = max_segments
+        self.segments: List[Tuple[str, torch.Tensor]] = []  # (text, audio_feat [t, p, d])
+        self._prefix_tokens: List[int] = []
+        self._prefix_kv = None  # (base_lm, residual_lm) caches of _prefix_tokens
+
+    @property
+    def prompt_cache(self) -> Optional[dict]:
+        """The voice prompt followed by the generated segments in the window"""
+        cache = self.anchor
+        for text, audio_feat in self.segments:
+            cache = self.model.merge_prompt_cache(cache, text, audio_feat)
+        return cache
+
+    def reset(self):
+        """Forget the generated context (the voice prompt is kept)"""
+        self.segments = []
+        self._prefix_tokens = []
+        self._prefix_kv = None
+
+    def generate(self, *args, **kwargs) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+        return next(self._generate(*args, streaming=False, **kwargs))
+
+    def generate_streaming(self, *args, **kwargs) -> Generator[Tuple[torch.Tensor, torch.Tensor, List[torch.Tensor]], None, None]:
+        return self._generate(*args, streaming=True, **kwargs)
+
+    @torch.inference_mode()
+    def _generate(
+        self, target_text: str, streaming: bool = False, **kwargs
+    ) -> Generator[Tuple[torch.Tensor, torch.Tensor, Union[torch.Tensor, List[torch.Tensor]]], None, None]:
+        """``VoxCPMModel._generate_with_prompt_cache`` for the next segment; takes the same keyword arguments"""
+        model = self.model
+        prompt_cache = self.prompt_cache
+        text = target_text if prompt_cache is None else prompt_cache["prompt_text"] + target_text
+        tokens = list(model.text_tokenizer(text))
+
+        reused = 0
+        for previous, current in zip(self._prefix_tokens, tokens):
+            if previous != current:
+                break
+            reused += 1
+        prefix_kv = None
+        if reused:
+            prefix_kv = tuple(kv[..., :reused, :] for kv in self._prefix_kv)
+
+        result = model._generate_with_prompt_cache(
+            target_text=target_text,
+            prompt_cache=prompt_cache,
+            streaming=streaming,
+            prefix_kv=prefix_kv,
+            **kwargs,
+        )
+        pred_audio_feat = None
+        for i, (audio, target_text_token, pred_audio_feat) in enumerate(result):
+            if i == 0:
+                # the text positions are prefilled now and decoding only writes after them
+                self._prefix_tokens = tokens
+                self._prefix_kv = tuple(
+                    lm.kv_cache.kv_cache[..., : len(tokens), :].clone() for lm in (model.base_lm, model.residual_lm)
+                )
+            if not streaming:
+                # generate() only pulls the first item, so extend the context before yielding
+                self._append(target_text, pred_audio_feat)
+            yield audio, target_text_token, pred_audio_feat
+        if streaming and pred_audio_feat is not None:
+            self._append(target_text, torch.cat(pred_audio_feat, dim=1).squeeze(0).cpu())
+
+    def _append(self, text: str, audio_feat: torch.Tensor):
+        self.segments.append((text, audio_feat.float()))
+        frames = sum(feat.size(0) for _, feat in self.segments)
+        while len(self.segments) > 1 and (
+            len(self.segments) > self.max_segments or frames > self.max_context_frames
+        ):
+            frames -= self.segments.pop(0)[1].size(0)
@@ -1,17 +1,25 @@
-from typing import List
+from functools import lru_cache
+from typing import List, Tuple
+import numpy as np
 import torch
 from transformers import PreTrainedTokenizer
 
 
-def mask_multichar_chinese_tokens(tokenizer: PreTrainedTokenizer):
+def mask_multichar_chinese_tokens(tokenizer: PreTrainedTokenizer, cache_size: int = 4096):
     """Create a tokenizer wrapper that converts multi-character Chinese tokens to single characters.
     
     This function creates a wrapper around the provided tokenizer that automatically
     splits multi-character Chinese tokens into individual characters. This is useful
     for ensuring consistent tokenization of Chinese text.
     
+    Calling the wrapper takes a fast path: the base tokenizer's ids are expanded
+    through a precomputed id -> character-ids table in one numpy gather, and the
+    results of the last ``cache_size`` texts are memoized (0 disables the cache).
+    ``tokenize`` keeps the token-level reference implementation.
+
     Args:
         tokenizer: The base tokenizer to wrap
+        cache_size: Number of tokenized texts kept in the LRU cache
         
     Returns:
         A CharTokenizerWrapper instance that handles multi-character Chinese tokens
@@ -28,6 +36,25 @@ def mask_multichar_chinese_tokens(tokenizer: PreTrainedTokenizer):
         if len(token) >= 2 and all("\u4e00" <= c <= "\u9fff" for c in token)
     }
 
+    # Row i holds the ids ``tokenize`` turns token id i into: itself, or the ids of
+    # its characters when its text without the subword prefix is a multi-character token
+    vocab = tokenizer.vocab
+    splits = {}
+    for token, token_id in vocab.items():
+        clean_token = token.replace("▁", "")
+        if clean_token in multichar_tokens:
+            splits[token_id] = [
+                tokenizer.unk_token_id if i is None else i for i in tokenizer.convert_tokens_to_ids(list(clean_token))
+            ]
+    width = max((len(ids) for ids in splits.values()), default=1)
+    split_table = np.full((max(vocab.values()) + 1, width), -1, dtype=np.int64)
+    split_table[:, 0] = np.arange(split_table.shape[0])
+    split_lengths = np.ones(split_table.shape[0], dtype=np.int64)
+    for token_id, ids in splits.items():
+        split_table[token_id, : len(ids)] = ids
+        split_lengths[token_id] = len(ids)
+    columns = np.arange(width)
+
     class CharTokenizerWrapper:
         """Wrapper class for tokenizers that handles multi-character Chinese tokens.
         
@@ -43,6 +70,22 @@ def mask_multichar_chinese_tokens(tokenizer: PreTrainedTokenizer):
             """
             self.tokenizer = base_tokenizer
             self.multichar_tokens = multichar_tokens
+            self.encode = lru_cache(maxsize=cache_size)(self._encode) if cache_size else self._encode
+
+        def _encode(self, text: str) -> Tuple[int, ...]:
+            """Ids of ``text`` with multi-character Chinese tokens split (fast path of ``__call__``)"""
+            if not isinstance(text, str):
+                raise TypeError(f"Expected string input, got {type(text)}")
+            backend = getattr(self.tokenizer, "backend_tokenizer", None)
+            if backend is not None:
+                ids = backend.encode(text, add_special_tokens=False).ids
+            else:
+                ids = self.tokenizer.encode(text, add_special_tokens=False)
+            if width == 1 or not ids:
+                return tuple(ids)
+            ids = np.asarray(ids, dtype=np.int64)
+            rows = split_table[ids]
+            return tuple(rows[columns < split_lengths[ids][:, None]].tolist())
 
         def tokenize(self, text: str, **kwargs) -> List[str]:
             """Tokenize text and split multi-character Chinese tokens into single characters.
@@ -96,6 +139,8 @@ def mask_multichar_chinese_tokens(tokenizer: PreTrainedTokenizer):
                 ValueError: If tokenization fails
             """
             try:
+                if not kwargs:
+                    return list(self.encode(text))
                 tokens = self.tokenize(text, **kwargs)
                 result = self.tokenizer.convert_tokens_to_ids(tokens)
                 return result
@@ -38,6 +38,8 @@ from tqdm import tqdm
 from transformers import LlamaTokenizerFast
 
 from ..modules.audiovae import AudioVAE, AudioVAEConfig
+from ..utils.metrics import PATCHES, TEXT_TOKENS, stage_timer
+from ..utils.tracing import span
 from ..modules.layers import ScalarQuantizationLayer
 from ..modules.layers.lora import apply_lora_to_named_linear_modules
 from ..modules.locdit import CfmConfig, UnifiedCFM, VoxCPMLocDiT
@@ -45,6 +47,10 @@ from ..modules.locenc import VoxCPMLocEnc
 from ..modules.minicpm4 import MiniCPM4Config, MiniCPMModel
 from .utils import get_dtype, mask_multichar_chinese_tokens
 
+# When the model is compiled, prefill sequences are right-padded up to one of these
+# lengths so torch.compile only ever sees a small, fixed set of shapes.
+DEFAULT_PREFILL_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096)
+
 
 class VoxCPMEncoderConfig(BaseModel):
     hidden_dim: int = 1024
@@ -184,6 +190,9 @@ class VoxCPMModel(nn.Module):
         self.chunk_size = audio_vae.chunk_size
         self.sample_rate = audio_vae.sample_rate
 
+        # Prefill length buckets, enabled by ``optimize()`` (None = run prefill at its exact length)
+        self.prefill_buckets = None
+
         if self.lora_config is not None:
             self._apply_lora()
 
@@ -225,8 +234,21 @@ class VoxCPMModel(nn.Module):
                 raise ValueError("triton is not installed")
             self.base_lm.forward_step = torch.compile(self.base_lm.forward_step, mode="reduce-overhead", fullgraph=True)
             self.residual_lm.forward_step = torch.compile(self.residual_lm.forward_step, mode="reduce-overhead", fullgraph=True)
-            self.feat_encoder = torch.compile(self.feat_encoder, mode="reduce-overhead", fullgraph=True)
+            # the captured CUDA graphs address the KV storage directly: it must never move
+            self.base_lm.kv_cache.pin()
+            self.residual_lm.kv_cache.pin()
+            # static shapes: one graph per prefill bucket plus the single-patch decode step
+            self.feat_encoder = torch.compile(self.feat_encoder, mode="reduce-overhead", fullgraph=True, dynamic=False)
             self.feat_decoder.estimator = torch.compile(self.feat_decoder.estimator, mode="reduce-overhead", fullgraph=True)
+            # prefill outputs are read after the next graph has run, so no CUDA graphs here
+            self.base_lm.prefill = torch.compile(self.base_lm.prefill, fullgraph=True, dynamic=False)
+            self.residual_lm.prefill = torch.compile(self.residual_lm.prefill, fullgraph=True, dynamic=False)
+            buckets = tuple(b for b in DEFAULT_PREFILL_BUCKETS if b < self.config.max_length)
+            self.prefill_buckets = buckets + (self.config.max_length,)
+            # base and residual LM share each code object: one graph per bucket for each
+            torch._dynamo.config.cache_size_limit = max(
+                torch._dynamo.config.cache_size_limit, 2 * (len(self.prefill_buckets) + 2)
+            )
         except Exception as e:
             print(f"Warning: torch.compile disabled - {e}")
         return self
@@ -243,8 +265,15 @@ class VoxCPMModel(nn.Module):
         *,
         progress: float = 0.0,
         sample_generate: bool = False,
+        segment_ids: Optional[torch.Tensor] = None,
     ):
-        del position_ids  # not used yet
+        # Padded batches use the implicit 0..T-1 positions; packed batches (segment_ids from
+        # AudioFeatureProcessingPacker(pack_sequences=True)) need per-segment positions and masks.
+        if segment_ids is not None:
+            position_ids = position_ids.to(self.device, dtype=torch.long)
+            segment_ids = segment_ids.to(self.device)
+        else:
+            position_ids = None
 
         text_tokens = text_tokens.to(self.device, dtype=torch.long)
         text_mask = text_mask.to(self.device, dtype=self._dtype())
@@ -263,13 +292,17 @@ class VoxCPMModel(nn.Module):
         text_embed = self.base_lm.embed_tokens(text_tokens) * scale_emb
         combined_embed = text_mask.unsqueeze(-1) * text_embed + audio_mask.unsqueeze(-1) * feat_embed
 
-        enc_outputs, _ = self.base_lm(inputs_embeds=combined_embed, is_causal=True)
+        enc_outputs, _ = self.base_lm(
+            inputs_embeds=combined_embed, is_causal=True, position_ids=position_ids, segment_ids=segment_ids
+        )
         enc_outputs = enc_outputs.to(self._dtype())
         enc_outputs = self.fsq_layer(enc_outputs) * audio_mask.unsqueeze(-1) + enc_outputs * text_mask.unsqueeze(-1)
         lm_hidden = torch.cat((torch.zeros_like(enc_outputs[:, 0:1, :]), enc_outputs[:, :-1, :]), dim=1)
 
         residual_inputs = enc_outputs + audio_mask.unsqueeze(-1) * feat_embed
-        residual_outputs, _ = self.residual_lm(inputs_embeds=residual_inputs, is_causal=True)
+        residual_outputs, _ = self.residual_lm(
+            inputs_embeds=residual_inputs, is_causal=True, position_ids=position_ids, segment_ids=segment_ids
+        )
         residual_outputs = residual_outputs.to(self._dtype())
         residual_hidden = torch.cat(
             (torch.zeros_like(residual_outputs[:, 0:1, :]), residual_outputs[:, :-1, :]),
@@ -330,6 +363,68 @@ class VoxCPMModel(nn.Module):
     def _dtype(self):
         return get_dtype(self.config.dtype)
 
+    def _noise_generator(self, seed: Optional[int]) -> Optional[torch.Generator]:
+        """Generator for seeded diffusion noise; ``None`` keeps the global RNG."""
+        if seed is None:
+            return None
+        return torch.Generator(device=self.device).manual_seed(int(seed))
+
+    def _prefill_bucket(self, length: int) -> int:
+        """Return the padded prefill length for ``length`` (unchanged when bucketing is disabled)."""
+        if not self.prefill_buckets:
+            return length
+        for bucket in self.prefill_buckets:
+            if length <= bucket:
+                return bucket
+        return length
+
+    def _encode_prefill_feat(self, feat: torch.Tensor) -> torch.Tensor:
+        """Run ``feat_encoder`` over a [b, t, p, d] prefill, padding t up to its bucket."""
+        T = feat.size(1)
+        pad = self._prefill_bucket(T) - T
+        if pad > 0:
+            feat = F.pad(feat, (0, 0, 0, 0, 0, pad))
+        # every patch is encoded independently, so the padded rows never touch the real ones
+        return self.feat_encoder(feat)[:, :T]
+
+    def _prefill_lm(self, lm: MiniCPMModel, inputs_embeds: torch.Tensor, past_key_values=None):
+        """Causal prefill of ``lm`` with the sequence right-padded up to its bucket.
+
+        Padding sits after the last real position, so the causal mask already hides it;
+        outputs and KV caches are cut back to the real length before they are used.
+        With ``past_key_values`` the sequence continues a prefix that was already run
+        and is not bucketed; the returned caches include the prefix.
+        """
+        if past_key_values is not None:
+            return lm(inputs_embeds=inputs_embeds, is_causal=True, past_key_values=past_key_values)
+        T = inputs_embeds.size(1)
+        pad = self._prefill_bucket(T) - T
+        if pad > 0:
+            inputs_embeds = F.pad(inputs_embeds, (0, 0, 0, pad))
+        outputs, kv_cache_tuple = lm.prefill(inputs_embeds)
+        if pad > 0:
+            outputs = outputs[:, :T]
+            kv_cache_tuple = [(k[:, :, :T], v[:, :, :T]) for k, v in kv_cache_tuple]
+        return outputs, kv_cache_tuple
+
+    @torch.inference_mode()
+    def warmup_prefill(self, max_length: int = 1024):
+        """Compile the prefill path for every bucket up to ``max_length``.
+
+        Call this at startup so the first requests after a deploy do not pay for
+        compiling the shapes that random text/prompt lengths would otherwise hit.
+        """
+        if not self.prefill_buckets:
+            return
+        dtype = self._dtype()
+        for bucket in self.prefill_buckets:
+            if bucket > max_length:
+                break
+            feat = torch.zeros((1, bucket, self.patch_size, self.feat_dim), device=self.device, dtype=dtype)
+            feat_embed = self.enc_to_lm_proj(self._encode_prefill_feat(feat))
+            self._prefill_lm(self.base_lm, feat_embed)
+            self._prefill_lm(self.residual_lm, feat_embed)
+
 
     def generate(self, *args, **kwargs) -> torch.Tensor:
         return next(self._generate(*args, streaming=False, **kwargs))
@@ -351,6 +446,7 @@ class VoxCPMModel(nn.Module):
         retry_badcase_max_times: int = 3,
         retry_badcase_ratio_threshold: float = 6.0, # setting acceptable ratio of audio length to text length (for badcase detection)
         streaming: bool = False,
+        seed: Optional[int] = None,
     ) -> Generator[torch.Tensor, None, None]:
         if retry_badcase and streaming:
             warnings.warn("Retry on bad cases is not supported in streaming mode, setting retry_badcase=False.")
@@ -406,7 +502,8 @@ class VoxCPMModel(nn.Module):
                 audio = torch.nn.functional.pad(audio, (padding_size, 0))
 
             # (B, D, T)
-            audio_feat = self.audio_vae.encode(audio.to(self.device), self.sample_rate).cpu()
+            with stage_timer("prompt_encode"):
+                audio_feat = self.audio_vae.encode(audio.to(self.device), self.sample_rate).cpu()
             audio_feat = audio_feat.view(
                 self.audio_vae.latent_dim,
                 -1,
@@ -434,7 +531,9 @@ class VoxCPMModel(nn.Module):
         audio_mask = audio_mask.unsqueeze(0).to(self.device)
 
         target_text_length = len(self.text_tokenizer(target_text))
+        TEXT_TOKENS.inc(target_text_length)
         
+        generator = self._noise_generator(seed)
         retry_badcase_times = 0
         while retry_badcase_times < retry_badcase_max_times:
             inference_result = self._inference(
@@ -447,11 +546,13 @@ class VoxCPMModel(nn.Module):
                 inference_timesteps=inference_timesteps,
                 cfg_value=cfg_value,
                 streaming=streaming,
+                generator=generator,
             )
             if streaming:
                 patch_len = self.patch_size * self.chunk_size
                 for latent_pred, _ in inference_result:
-                    decode_audio = self.audio_vae.decode(latent_pred.to(torch.float32))
+                    with stage_timer("vae_decode"):
+                        decode_audio = self.audio_vae.decode(latent_pred)
                     decode_audio = decode_audio[..., -patch_len:].squeeze(1).cpu()
                     yield decode_audio
                 break
@@ -468,7 +569,8 @@ class VoxCPMModel(nn.Module):
                     break   
                 
         if not streaming:
-            decode_audio = self.audio_vae.decode(latent_pred.to(torch.float32)).squeeze(1).cpu()  
+            with stage_timer("vae_decode"):
+                decode_audio = self.audio_vae.decode(latent_pred).squeeze(1).cpu()
             yield decode_audio        
     
     @torch.inference_mode()
@@ -493,11 +595,37 @@ class VoxCPMModel(nn.Module):
 
         # load audio
         audio, sr = torchaudio.load(prompt_wav_path)
+        return self.build_prompt_cache_from_audio(prompt_text, audio, sr)
+
+    @torch.inference_mode()
+    def build_prompt_cache_from_audio(
+        self,
+        prompt_text: str,
+        audio: torch.Tensor,
+        sample_rate: int,
+    ):
+        """
+        Build prompt cache from an in-memory waveform (no file round-trip).
+        
+        Args:
+            prompt_text: prompt text (required)
+            audio: prompt waveform, (T,) or (channels, T)
+            sample_rate: sample rate of ``audio``; resampled to the model rate
+            
+        Returns:
+            prompt_cache: same structure as ``build_prompt_cache``.
+        """
+        if not prompt_text:
+            raise ValueError("prompt_text is required")
+
+        audio = torch.as_tensor(audio, dtype=torch.float32)
+        if audio.dim() == 1:
+            audio = audio.unsqueeze(0)
         if audio.size(0) > 1:
             audio = audio.mean(dim=0, keepdim=True)
             
-        if sr != self.sample_rate:
-            audio = torchaudio.functional.resample(audio, sr, self.sample_rate)
+        if sample_rate != self.sample_rate:
+            audio = torchaudio.functional.resample(audio, sample_rate, self.sample_rate)
 
         patch_len = self.patch_size * self.chunk_size
 
@@ -507,7 +635,8 @@ class VoxCPMModel(nn.Module):
             audio = torch.nn.functional.pad(audio, (padding_size, 0))
 
         # extract audio features
-        audio_feat = self.audio_vae.encode(audio.to(self.device), self.sample_rate).cpu()
+        with stage_timer("prompt_encode"):
+            audio_feat = self.audio_vae.encode(audio.to(self.device), self.sample_rate).cpu()
 
         audio_feat = audio_feat.view(
             self.audio_vae.latent_dim,
@@ -559,6 +688,18 @@ class VoxCPMModel(nn.Module):
         
         return merged_cache
 
+    def start_session(self, prompt_cache: dict = None, max_context_frames: int = 200, max_segments: int = 3):
+        """
+        Start a ``GenerationSession``: consecutive segments share a sliding window of
+        the previously generated text/audio as prompt, and reuse its text-prefix KV.
+        
+        Args:
+            prompt_cache: optional voice prompt kept at the start of the context
+            max_context_frames: generated audio frames kept as context
+            max_segments: generated segments kept as context
+        """
+        from .session import GenerationSession
+        return GenerationSession(self, prompt_cache, max_context_frames=max_context_frames, max_segments=max_segments)
             
     def generate_with_prompt_cache(self, *args, **kwargs) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
         return next(self._generate_with_prompt_cache(*args, streaming=False, **kwargs))
@@ -583,6 +724,8 @@ class VoxCPMModel(nn.Module):
         retry_badcase_max_times: int = 3,
         retry_badcase_ratio_threshold: float = 6.0,
         streaming: bool = False,
+        seed: Optional[int] = None,
+        prefix_kv: Optional[Tuple[torch.Tensor, torch.Tensor]] = None,
     ) -> Generator[Tuple[torch.Tensor, torch.Tensor, Union[torch.Tensor, List[torch.Tensor]]], None, None]:
         """
         Generate audio using pre-built prompt cache.
@@ -598,6 +741,11 @@ class VoxCPMModel(nn.Module):
             retry_badcase_max_times: Maximum retry attempts
             retry_badcase_ratio_threshold: Threshold for audio-to-text ratio
             streaming: Whether to return a generator of audio chunks
+            seed: If set, diffusion noise is drawn from a generator seeded with it, so
+                identical requests produce identical audio
+            prefix_kv: Base / residual LM keys and values of the first positions of
+                ``prompt_text + target_text``, as stacked by ``StaticKVCache``; those
+                positions are not prefilled again (see ``GenerationSession``)
             
         Returns:
             Generator of Tuple containing:
@@ -651,7 +799,9 @@ class VoxCPMModel(nn.Module):
         audio_mask = audio_mask.unsqueeze(0).to(self.device)
     
         # run inference
-        target_text_length = len(self.text_tokenizer(target_text))
+        target_text_length = target_text_token.shape[0]
+        TEXT_TOKENS.inc(target_text_length)
+        generator = self._noise_generator(seed)
         retry_badcase_times = 0
         while retry_badcase_times < retry_badcase_max_times:
             inference_result = self._inference(
@@ -664,11 +814,14 @@ class VoxCPMModel(nn.Module):
                 inference_timesteps=inference_timesteps,
                 cfg_value=cfg_value,
                 streaming=streaming,
+                generator=generator,
+                prefix_kv=prefix_kv,
             )
             if streaming:
                 patch_len = self.patch_size * self.chunk_size
                 for latent_pred, pred_audio_feat in inference_result:
-                    decode_audio = self.audio_vae.decode(latent_pred.to(torch.float32))
+                    with stage_timer("vae_decode"):
+                        decode_audio = self.audio_vae.decode(latent_pred)
                     decode_audio = decode_audio[..., -patch_len:].squeeze(1).cpu()
                     yield (
                         decode_audio,
@@ -688,7 +841,8 @@ class VoxCPMModel(nn.Module):
                 else:
                     break
         if not streaming:
-            decode_audio = self.audio_vae.decode(latent_pred.to(torch.float32)).squeeze(1).cpu()
+            with stage_timer("vae_decode"):
+                decode_audio = self.audio_vae.decode(latent_pred).squeeze(1).cpu()
 
             yield (
                 decode_audio,
@@ -715,6 +869,8 @@ class VoxCPMModel(nn.Module):
         cfg_value: float = 2.0,
         streaming: bool = False,
         streaming_prefix_len: int = 3,
+        generator: Optional[torch.Generator] = None,
+        prefix_kv: Optional[Tuple[torch.Tensor, torch.Tensor]] = None,
     ) -> Generator[Tuple[torch.Tensor, Union[torch.Tensor, List[torch.Tensor]]], None, None]:
         """Core inference method for audio generation.
         
@@ -731,6 +887,9 @@ class VoxCPMModel(nn.Module):
             inference_timesteps: Number of diffusion steps
             cfg_value: Classifier-free guidance value
             streaming: Whether to yield each step latent feature or just the final result
+            generator: Optional random generator for the diffusion noise (seeded generation)
+            prefix_kv: Base / residual LM caches ``[2, layers, b, kv_heads, n, head_dim]`` of the
+                first ``n`` positions (text only), which are then not prefilled again
             
         Returns:
             Generator of Tuple containing:
@@ -739,81 +898,93 @@ class VoxCPMModel(nn.Module):
         """
         B, T, P, D = feat.shape
 
-        feat_embed = self.feat_encoder(feat)  # [b, t, h_feat]
-        feat_embed = self.enc_to_lm_proj(feat_embed)
-        
-        if self.config.lm_config.use_mup:
-            scale_emb = self.config.lm_config.scale_emb
-        else:
-            scale_emb = 1.0
-       
-        text_embed = self.base_lm.embed_tokens(text) * scale_emb
-        combined_embed = text_mask.unsqueeze(-1) * text_embed + feat_mask.unsqueeze(-1) * feat_embed
+        with stage_timer("prefill"):
+            base_past = residual_past = None
+            if prefix_kv is not None:
+                n = prefix_kv[0].size(4)
+                base_past = [(prefix_kv[0][0, i], prefix_kv[0][1, i]) for i in range(prefix_kv[0].size(1))]
+                residual_past = [(prefix_kv[1][0, i], prefix_kv[1][1, i]) for i in range(prefix_kv[1].size(1))]
+                text, text_mask, feat, feat_mask = text[:, n:], text_mask[:, n:], feat[:, n:], feat_mask[:, n:]
 
-        prefix_feat_cond = feat[:, -1, ...]  # b, p, d
-        pred_feat_seq = []  # b, t, p, d
-        curr_embed = None
+            feat_embed = self._encode_prefill_feat(feat)  # [b, t, h_feat]
+            feat_embed = self.enc_to_lm_proj(feat_embed)
+            
+            if self.config.lm_config.use_mup:
+                scale_emb = self.config.lm_config.scale_emb
+            else:
+                scale_emb = 1.0
+           
+            text_embed = self.base_lm.embed_tokens(text) * scale_emb
+            combined_embed = text_mask.unsqueeze(-1) * text_embed + feat_mask.unsqueeze(-1) * feat_embed
 
-        enc_outputs, kv_cache_tuple = self.base_lm(
-            inputs_embeds=combined_embed,
-            is_causal=True,
-        )
-        self.base_lm.kv_cache.fill_caches(kv_cache_tuple)
-        
-        enc_outputs = self.fsq_layer(enc_outputs) * feat_mask.unsqueeze(-1) + enc_outputs * text_mask.unsqueeze(-1)
-        lm_hidden = enc_outputs[:, -1, :]
+            enc_outputs, kv_cache_tuple = self._prefill_lm(self.base_lm, combined_embed, base_past)
+            # the cache only grows to what this request can reach: prefill + one position per patch
+            self.base_lm.kv_cache.fill_caches(kv_cache_tuple, reserve=T + max_len)
+            
+            enc_outputs = self.fsq_layer(enc_outputs) * feat_mask.unsqueeze(-1) + enc_outputs * text_mask.unsqueeze(-1)
+            lm_hidden = enc_outputs[:, -1, :]
 
-         
-        residual_enc_outputs, residual_kv_cache_tuple = self.residual_lm(
-            inputs_embeds=enc_outputs + feat_mask.unsqueeze(-1) * feat_embed,
-            is_causal=True,
-        )
-        self.residual_lm.kv_cache.fill_caches(residual_kv_cache_tuple)
-        residual_hidden = residual_enc_outputs[:, -1, :]
+            residual_enc_outputs, residual_kv_cache_tuple = self._prefill_lm(
+                self.residual_lm,
+                enc_outputs + feat_mask.unsqueeze(-1) * feat_embed,
+                residual_past,
+            )
+            self.residual_lm.kv_cache.fill_caches(residual_kv_cache_tuple, reserve=T + max_len)
+            residual_hidden = residual_enc_outputs[:, -1, :]
 
+        prefix_feat_cond = feat[:, -1, ...]  # b, p, d
+        pred_feat_seq = []  # b, t, p, d
+        curr_embed = None
 
-        for i in tqdm(range(max_len)):
-            dit_hidden_1 = self.lm_to_dit_proj(lm_hidden)  # [b, h_dit]
-            dit_hidden_2 = self.res_to_dit_proj(residual_hidden)  # [b, h_dit]
-            dit_hidden = dit_hidden_1 + dit_hidden_2  # [b, h_dit]
 
-            pred_feat = self.feat_decoder(
-                mu=dit_hidden,
-                patch_size=self.patch_size,
-                cond=prefix_feat_cond.transpose(1, 2).contiguous(),
-                n_timesteps=inference_timesteps,
-                cfg_value=cfg_value,
-            ).transpose(
-                1, 2
-            )  # [b, p, d]
+        with span("decode_loop", max_len=max_len, timesteps=inference_timesteps) as loop_span:
+            for i in tqdm(range(max_len)):
+                dit_hidden_1 = self.lm_to_dit_proj(lm_hidden)  # [b, h_dit]
+                dit_hidden_2 = self.res_to_dit_proj(residual_hidden)  # [b, h_dit]
+                dit_hidden = dit_hidden_1 + dit_hidden_2  # [b, h_dit]
+
+                with stage_timer("dit_solve", trace=False):
+                    pred_feat = self.feat_decoder(
+                        mu=dit_hidden,
+                        patch_size=self.patch_size,
+                        cond=prefix_feat_cond.transpose(1, 2).contiguous(),
+                        n_timesteps=inference_timesteps,
+                        cfg_value=cfg_value,
+                        generator=generator,
+                    ).transpose(
+                        1, 2
+                    )  # [b, p, d]
+                PATCHES.inc()
             
-            curr_embed = self.feat_encoder(pred_feat.unsqueeze(1))  # b, 1, c
-            curr_embed = self.enc_to_lm_proj(curr_embed)
+                curr_embed = self.feat_encoder(pred_feat.unsqueeze(1))  # b, 1, c
+                curr_embed = self.enc_to_lm_proj(curr_embed)
             
-            pred_feat_seq.append(pred_feat.unsqueeze(1))  # b, 1, p, d
-            prefix_feat_cond = pred_feat
+                pred_feat_seq.append(pred_feat.unsqueeze(1))  # b, 1, p, d
+                prefix_feat_cond = pred_feat
 
-            if streaming:
-                # return the last three predicted latent features to provide enough context for smooth decoding
-                pred_feat_chunk = torch.cat(pred_feat_seq[-streaming_prefix_len:], dim=1)
-                feat_pred = rearrange(pred_feat_chunk, "b t p d -> b d (t p)", b=B, p=self.patch_size)
+                if streaming:
+                    # return the last three predicted latent features to provide enough context for smooth decoding
+                    pred_feat_chunk = torch.cat(pred_feat_seq[-streaming_prefix_len:], dim=1)
+                    feat_pred = rearrange(pred_feat_chunk, "b t p d -> b d (t p)", b=B, p=self.patch_size)
                 
-                yield feat_pred, pred_feat_seq
+                    yield feat_pred, pred_feat_seq
             
-            stop_flag = self.stop_head(self.stop_actn(self.stop_proj(lm_hidden))).argmax(dim=-1)[0].cpu().item()
-            if i > min_len and stop_flag == 1:
-                break
+                stop_flag = self.stop_head(self.stop_actn(self.stop_proj(lm_hidden))).argmax(dim=-1)[0].cpu().item()
+                if i > min_len and stop_flag == 1:
+                    break
     
-            lm_hidden = self.base_lm.forward_step(
-                curr_embed[:, 0, :], torch.tensor([self.base_lm.kv_cache.step()], device=curr_embed.device)
-            ).clone()
-           
+                with stage_timer("lm_step", trace=False):
+                    lm_hidden = self.base_lm.forward_step(
+                        curr_embed[:, 0, :], torch.tensor([self.base_lm.kv_cache.step()], device=curr_embed.device)
+                    ).clone()
+
+                    lm_hidden = self.fsq_layer(lm_hidden)
+                    residual_hidden = self.residual_lm.forward_step(
+                        lm_hidden + curr_embed[:, 0, :], torch.tensor([self.residual_lm.kv_cache.step()], device=curr_embed.device)
+                    ).clone()
+            if loop_span is not None:
+                loop_span.attrs["patches"] = len(pred_feat_seq)
 
-            lm_hidden = self.fsq_layer(lm_hidden)
-            residual_hidden = self.residual_lm.forward_step(
-                lm_hidden + curr_embed[:, 0, :], torch.tensor([self.residual_lm.kv_cache.step()], device=curr_embed.device)
-            ).clone()
-                
         if not streaming:
             pred_feat_seq = torch.cat(pred_feat_seq, dim=1)  # b, t, p, d
             feat_pred = rearrange(pred_feat_seq, "b t p d -> b d (t p)", b=B, p=self.patch_size)  
@@ -873,6 +1044,7 @@ class VoxCPMModel(nn.Module):
         model.load_state_dict(model_state_dict, strict=False)
         if training:
             return model
+        model.audio_vae.prepare_for_inference()
         return model.to(model.device).eval().optimize(disable=not optimize)
 
     # ------------------------------------------------------------------ #
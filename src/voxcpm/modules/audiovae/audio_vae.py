@@ -1,11 +1,12 @@
 import math
-from typing import List, Union, Optional
+import warnings
+from typing import Iterator, List, Optional, Tuple, Union
 
 import numpy as np
 import torch
 from torch import nn
 import torch.nn.functional as F
-from torch.nn.utils import weight_norm
+from torch.nn.utils import remove_weight_norm, weight_norm
 from pydantic import BaseModel
 
 
@@ -22,6 +23,10 @@ class CausalConv1d(nn.Conv1d):
         super().__init__(*args, **kwargs)
         self.__padding = padding
 
+    @property
+    def left_padding(self) -> int:
+        return self.__padding * 2
+
     def forward(self, x):
         x_pad = F.pad(x, (self.__padding * 2, 0))
         return super().forward(x_pad)
@@ -55,12 +60,30 @@ def snake(x, alpha):
     return x
 
 
+@torch.jit.script
+def snake_inference(x, alpha, alpha_reciprocal):
+    return x + alpha_reciprocal * torch.sin(alpha * x).pow(2)
+
+
 class Snake1d(nn.Module):
     def __init__(self, channels):
         super().__init__()
         self.alpha = nn.Parameter(torch.ones(1, channels, 1))
+        self.register_buffer("alpha_reciprocal", None, persistent=False)
+
+    def freeze(self):
+        """Precompute ``1 / (alpha + 1e-9)`` for inference; alpha must not change afterwards"""
+        self.alpha_reciprocal = (self.alpha.detach() + 1e-9).reciprocal()
 
     def forward(self, x):
+        if x.dtype != self.alpha.dtype:
+            # Half-precision decoder: evaluate sin(alpha * x)^2 / alpha in the parameter dtype (fp32)
+            return self._snake(x.to(self.alpha.dtype)).to(x.dtype)
+        return self._snake(x)
+
+    def _snake(self, x):
+        if self.alpha_reciprocal is not None and x.dim() == 3:
+            return snake_inference(x, self.alpha, self.alpha_reciprocal)
         return snake(x, self.alpha)
 
 
@@ -148,6 +171,18 @@ class CausalEncoder(nn.Module):
         self.block = nn.Sequential(*self.block)
         self.enc_dim = d_model
 
+    def receptive_field(self) -> Tuple[int, int]:
+        """Input samples before and after ``t * hop_length`` that latent frame ``t`` depends on"""
+        left = right = 0
+        jump = 1
+        convs = [m for m in self.block.modules() if isinstance(m, CausalConv1d)] + [self.fc_mu]
+        for conv in convs:
+            span = (conv.kernel_size[0] - 1) * conv.dilation[0]
+            left += conv.left_padding * jump
+            right += max(0, span - conv.left_padding) * jump
+            jump *= conv.stride[0]
+        return left, right
+
     def forward(self, x):
         hidden_state = self.block(x)
         return {
@@ -276,6 +311,8 @@ class AudioVAEConfig(BaseModel):
     depthwise: bool = True
     sample_rate: int = 16000
     use_noise_block: bool = False
+    # Encode inputs longer than this in chunks with bounded activation memory (None = one pass)
+    encode_chunk_seconds: Optional[float] = None
 
 
 class AudioVAE(nn.Module):
@@ -331,6 +368,65 @@ class AudioVAE(nn.Module):
         )
         self.sample_rate = sample_rate
         self.chunk_size = math.prod(encoder_rates)
+        self.encode_chunk_seconds = config.encode_chunk_seconds
+        self.decoder_dtype = torch.float32
+
+    def prepare_for_inference(self, compile: bool = False) -> "AudioVAE":
+        """Fold weight norm into plain conv weights and precompute Snake reciprocals.
+
+        Outputs are unchanged, but every conv no longer recomputes ``g * v / ||v||``
+        per forward. The module can no longer be trained or load weight-norm
+        state dicts afterwards. Snake is nonlinear and cannot be folded into a
+        conv; ``compile=True`` lets Inductor fuse each Snake with its neighbouring
+        convolutions instead.
+        """
+        for module in self.modules():
+            if isinstance(module, (nn.Conv1d, nn.ConvTranspose1d)) and hasattr(module, "weight_g"):
+                remove_weight_norm(module)
+            elif isinstance(module, Snake1d):
+                module.freeze()
+        if compile:
+            self.encoder = torch.compile(self.encoder, dynamic=True)
+            self.decoder = torch.compile(self.decoder, dynamic=True)
+        return self
+
+    def set_decoder_dtype(self, dtype: Union[str, torch.dtype], min_snr_db: Optional[float] = None) -> "AudioVAE":
+        """Run the decoder convolutions in ``dtype`` (e.g. bfloat16 / float16 on GPU).
+
+        Snake activations keep fp32 parameters and are evaluated in fp32, and
+        ``decode`` still returns fp32 audio. With ``min_snr_db`` a probe latent is
+        decoded before and after the switch; if the SNR against the previous
+        dtype falls below the bound, the previous weights are restored and a
+        warning is issued.
+        """
+        dtype = getattr(torch, dtype) if isinstance(dtype, str) else dtype
+        previous_dtype = self.decoder_dtype
+        if min_snr_db is not None:
+            device = next(self.decoder.parameters()).device
+            generator = torch.Generator(device="cpu").manual_seed(0)
+            probe = torch.randn(1, self.latent_dim, 32, generator=generator).to(device)
+            saved = {k: v.detach().clone() for k, v in self.decoder.state_dict().items()}
+            with torch.inference_mode():
+                reference = self.decode(probe)
+
+        convs = [m for m in self.decoder.modules() if isinstance(m, (nn.Conv1d, nn.ConvTranspose1d))]
+        for module in convs:
+            module.to(dtype)
+        self.decoder_dtype = dtype
+
+        if min_snr_db is not None:
+            from ...utils.audio_quality import snr_db
+            with torch.inference_mode():
+                snr = snr_db(reference, self.decode(probe))
+            if snr < min_snr_db:
+                for module in convs:
+                    module.to(previous_dtype)
+                self.decoder.load_state_dict(saved)
+                self.decoder_dtype = previous_dtype
+                warnings.warn(
+                    f"AudioVAE decoder in {dtype} reached {snr:.1f} dB SNR (< {min_snr_db} dB), keeping {previous_dtype}"
+                )
+        return self
 
     def preprocess(self, audio_data, sample_rate):
         if sample_rate is None:
@@ -360,13 +456,15 @@ class AudioVAE(nn.Module):
             "audio" : Tensor[B x 1 x length]
                 Decoded audio data.
         """
-        return self.decoder(z)
+        return self.decoder(z.to(self.decoder_dtype)).float()
 
-    def encode(self, audio_data: torch.Tensor, sample_rate: int):
+    def encode(self, audio_data: torch.Tensor, sample_rate: int, chunk_seconds: Optional[float] = None):
         """
         Args:
             audio_data: Tensor[B x 1 x T]
             sample_rate: int
+            chunk_seconds: Encode in chunks of about this length (defaults to
+                ``encode_chunk_seconds``); the latents match a single pass.
         Returns:
             z: Tensor[B x D x T]
         """
@@ -374,4 +472,31 @@ class AudioVAE(nn.Module):
             audio_data = audio_data.unsqueeze(1)
 
         audio_data = self.preprocess(audio_data, sample_rate)
+        chunk_seconds = chunk_seconds if chunk_seconds is not None else self.encode_chunk_seconds
+        if chunk_seconds and audio_data.shape[-1] > chunk_seconds * self.sample_rate:
+            return torch.cat(list(self.encode_chunks(audio_data, sample_rate, chunk_seconds)), dim=-1)
         return self.encoder(audio_data)["mu"]
+
+    def encode_chunks(self, audio_data: torch.Tensor, sample_rate: int, chunk_seconds: float) -> Iterator[torch.Tensor]:
+        """Yield the latents of ``audio_data`` chunk by chunk, left to right.
+
+        The encoder is causal, so each chunk is encoded together with enough
+        preceding audio to cover its receptive field and the frames computed from
+        that context are dropped. Chunks start on ``hop_length`` boundaries to keep
+        every strided layer in phase with a single pass. Peak activation memory is
+        bounded by the chunk plus its context instead of the whole input.
+        """
+        if audio_data.ndim == 2:
+            audio_data = audio_data.unsqueeze(1)
+        audio_data = self.preprocess(audio_data, sample_rate)
+        hop = int(self.hop_length)
+        chunk = max(1, int(chunk_seconds * self.sample_rate) // hop) * hop
+        left, right = self.encoder.receptive_field()
+        context = math.ceil(left / hop) * hop
+        lookahead = (right // hop) * hop  # frames reaching past their own hop need later samples
+        length = audio_data.shape[-1]
+        for start in range(0, length, chunk):
+            begin = max(0, start - context)
+            end = min(length, start + chunk + lookahead)
+            z = self.encoder(audio_data[..., begin:end])["mu"]
+            yield z[..., (start - begin) // hop : (min(length, start + chunk) - begin) // hop]
@@ -1,4 +1,4 @@
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
 import torch
 import torch.nn.functional as F
@@ -58,10 +58,11 @@ class UnifiedCFM(torch.nn.Module):
         cfg_value: float = 1.0,
         sway_sampling_coef: float = 1.0, 
         use_cfg_zero_star: bool = True,
+        generator: Optional[torch.Generator] = None,
     ):
         b, _ = mu.shape
         t = patch_size
-        z = torch.randn((b, self.in_channels, t), device=mu.device, dtype=mu.dtype) * temperature
+        z = torch.randn((b, self.in_channels, t), device=mu.device, dtype=mu.dtype, generator=generator) * temperature
 
         t_span = torch.linspace(1, 0, n_timesteps + 1, device=mu.device, dtype=mu.dtype)
         t_span = t_span + sway_sampling_coef * (torch.cos(torch.pi / 2 * t_span) - 1 + t_span)
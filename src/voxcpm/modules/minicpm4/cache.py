@@ -3,6 +3,23 @@ import torch
 
 
 class StaticKVCache:
+    """Per-layer KV buffers written in place, one position per decode step.
+
+    Storage is allocated lazily and grows on demand: ``reserve`` sizes it for a
+    request's bound (prefill plus the longest generation it may run), rounded up
+    to ``block_size`` and at least doubling, so a model serving short requests
+    never holds ``max_length`` positions and the number of distinct buffer shapes
+    (one compiled decode step each) stays logarithmic. ``trim`` gives the storage
+    back once it is no longer needed (e.g. when the server is idle). Positions past
+    ``current_length`` are masked in attention and are never cleared; only newly
+    allocated storage is zero-filled. Storage is allocated as inference tensors,
+    so it is only written under ``torch.inference_mode``.
+
+    Growing and trimming move the buffer. CUDA graphs captured over the decode
+    step (``torch.compile(mode="reduce-overhead")``) keep pointing at the old
+    storage, so a compiled model ``pin``s its caches at ``max_length`` instead.
+    """
+
     def __init__(
         self,
         num_layers: int,
@@ -12,21 +29,56 @@ class StaticKVCache:
         device: torch.device,
         dtype: torch.dtype,
         max_length: int = 8192,
+        block_size: int = 256,
     ):
         self.max_length = max_length
         self.num_layers = num_layers
+        self.block_size = block_size
+        self._shape = (2, num_layers, batch_size, num_kv_heads, 0, dim_kv_head)
+        self._device = device
+        self._dtype = dtype
 
-        self.kv_cache = torch.zeros(
-            2,
-            num_layers,
-            batch_size,
-            num_kv_heads,
-            max_length,
-            dim_kv_head,
-            device=device,
-            dtype=dtype,
-        )
+        self.kv_cache = torch.zeros(self._shape, device=device, dtype=dtype)
         self.current_length = 0
+        self.pinned = False
+
+    @property
+    def capacity(self) -> int:
+        return self.kv_cache.size(4)
+
+    @torch.inference_mode()
+    def reserve(self, length: int):
+        """Make room for ``length`` positions (capped at ``max_length``), keeping the filled prefix"""
+        length = min(length, self.max_length)
+        if length <= self.capacity:
+            return
+        blocks = -(-length // self.block_size) * self.block_size
+        capacity = min(max(blocks, 2 * self.capacity), self.max_length)
+        shape = self._shape[:4] + (capacity,) + self._shape[5:]
+        kv_cache = torch.zeros(shape, device=self._device, dtype=self._dtype)
+        if self.current_length:
+            kv_cache[..., : self.current_length, :] = self.kv_cache[..., : self.current_length, :]
+        self.kv_cache = kv_cache
+
+    def pin(self):
+        """Allocate ``max_length`` positions now and never move the storage again"""
+        self.reserve(self.max_length)
+        self.pinned = True
+
+    @torch.inference_mode()
+    def trim(self, capacity: int = 0):
+        """Shrink storage to ``capacity`` positions, dropping cached positions past it; no-op when pinned"""
+        if self.pinned:
+            return
+        capacity = min(-(-capacity // self.block_size) * self.block_size, self.max_length)
+        if capacity >= self.capacity:
+            return
+        self.current_length = min(self.current_length, capacity)
+        shape = self._shape[:4] + (capacity,) + self._shape[5:]
+        kv_cache = torch.zeros(shape, device=self._device, dtype=self._dtype)
+        if self.current_length:
+            kv_cache[..., : self.current_length, :] = self.kv_cache[..., : self.current_length, :]
+        self.kv_cache = kv_cache
 
     def get_layer_cache(self, layer_idx: int) -> Tuple[torch.Tensor, torch.Tensor]:
         return self.kv_cache[0, layer_idx], self.kv_cache[1, layer_idx]
@@ -34,14 +86,33 @@ class StaticKVCache:
     def step(self) -> int:
         if self.current_length >= self.max_length:
             raise ValueError("KV cache is full")
+        self.reserve(self.current_length + 1)
 
         ret = self.current_length
         self.current_length += 1
         return ret
 
-    def fill_caches(self, kv_caches: List[Tuple[torch.Tensor, torch.Tensor]]):
-        self.current_length = kv_caches[0][0].size(2)
-        self.kv_cache.zero_()
+    def fill_caches(self, kv_caches: List[Tuple[torch.Tensor, torch.Tensor]], reserve: int = 0):
+        """Load prefill KV; ``reserve`` is the total length the request may reach"""
+        length = kv_caches[0][0].size(2)
+        if length > self.max_length:
+            raise ValueError(f"Prefill of {length} positions exceeds the KV cache limit {self.max_length}")
+        self.current_length = 0
+        self.reserve(max(length, reserve))
+        self.current_length = length
         for i in range(self.num_layers):
-            self.kv_cache[0, i, :, :, : self.current_length, :] = kv_caches[i][0]
-            self.kv_cache[1, i, :, :, : self.current_length, :] = kv_caches[i][1]
+            self.kv_cache[0, i, :, :, :length, :] = kv_caches[i][0]
+            self.kv_cache[1, i, :, :, :length, :] = kv_caches[i][1]
+
+    def snapshot(self) -> Tuple[torch.Tensor, int]:
+        """Copy of the filled prefix, for switching the cache between interleaved requests"""
+        return self.kv_cache[..., : self.current_length, :].clone(), self.current_length
+
+    @torch.inference_mode()
+    def restore(self, snapshot: Tuple[torch.Tensor, int]):
+        """Load a ``snapshot()`` in place; positions past its length are masked, so no zeroing is needed"""
+        kv, length = snapshot
+        self.current_length = 0
+        self.reserve(length)
+        self.kv_cache[..., :length, :].copy_(kv)
+        self.current_length = length
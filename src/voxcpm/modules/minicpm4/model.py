@@ -1,7 +1,7 @@
 from .config import MiniCPM4Config
 import torch
 import torch.nn as nn
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 import math
 from .cache import StaticKVCache
 
@@ -26,12 +26,6 @@ class MiniCPMRMSNorm(nn.Module):
         return rms_layernorm(hidden_states, self.weight, self.variance_epsilon)
 
 
-def rotate_half(x):
-    """Rotates half the hidden dims of the input."""
-    x1, x2 = x.chunk(2, dim=-1)
-    return torch.cat((-x2, x1), dim=-1)
-
-
 def apply_rotary_pos_emb(q: torch.Tensor, k: torch.Tensor, cos: torch.Tensor, sin: torch.Tensor):
     """
     Args:
@@ -41,13 +35,28 @@ def apply_rotary_pos_emb(q: torch.Tensor, k: torch.Tensor, cos: torch.Tensor, si
         sin: Tensor(seq_len, head_dim)
     Returns:
         Tensor(batch_size, num_heads, seq_len, head_dim), Tensor(batch_size, num_key_value_heads, seq_len, head_dim)
+
+    Equivalent to ``x * cos + rotate_half(x) * sin`` computed in float32, but q and k are
+    rotated together and the two halves are written directly, so there is no ``rotate_half``
+    allocation and no explicit float32 copy of q/k (mixed-dtype ops promote to the fp32 tables).
     """
     orig_dtype = q.dtype
-    q = q.to(torch.float32)
-    k = k.to(torch.float32)
-    q_embed = (q * cos) + (rotate_half(q) * sin)
-    k_embed = (k * cos) + (rotate_half(k) * sin)
-    return q_embed.to(orig_dtype), k_embed.to(orig_dtype)
+    num_heads = q.size(1)
+    half = q.size(-1) // 2
+    # the tables are cat(freqs, freqs), so one half of each carries all the information
+    cos = cos[..., :half]
+    sin = sin[..., :half]
+
+    qk = torch.cat((q, k), dim=1)
+    x1, x2 = qk[..., :half], qk[..., half:]
+    qk_embed = torch.cat(
+        (
+            torch.addcmul(x1 * cos, x2, sin, value=-1),
+            torch.addcmul(x2 * cos, x1, sin),
+        ),
+        dim=-1,
+    ).to(orig_dtype)
+    return qk_embed[:, :num_heads], qk_embed[:, num_heads:]
 
 
 class MiniCPMLongRoPE(nn.Module):
@@ -115,6 +124,10 @@ class MiniCPMLongRoPE(nn.Module):
 
         return cos, sin
 
+    def prefix(self, seq_len: int) -> Tuple[torch.Tensor, torch.Tensor]:
+        """cos/sin for positions ``0..seq_len-1`` as views of the cache (no gather)."""
+        return self.cos_cached[:seq_len], self.sin_cached[:seq_len]
+
 
 class MiniCPMAttention(nn.Module):
     def __init__(self, config: MiniCPM4Config, layer_idx: int):
@@ -139,6 +152,8 @@ class MiniCPMAttention(nn.Module):
         hidden_states: torch.Tensor,
         position_emb: Tuple[torch.Tensor, torch.Tensor],
         is_causal: bool,
+        attn_mask: Optional[torch.Tensor] = None,
+        past_key_value: Optional[Tuple[torch.Tensor, torch.Tensor]] = None,
     ) -> Tuple[torch.Tensor, Tuple[torch.Tensor, torch.Tensor]]:
         bsz, q_len, _ = hidden_states.size()
 
@@ -153,6 +168,9 @@ class MiniCPMAttention(nn.Module):
         cos, sin = position_emb
 
         query_states, key_states = apply_rotary_pos_emb(query_states, key_states, cos, sin)
+        if past_key_value is not None:
+            key_states = torch.cat([past_key_value[0], key_states], dim=2)
+            value_states = torch.cat([past_key_value[1], value_states], dim=2)
         
         # ref: https://github.com/pytorch/pytorch/issues/163597
         # there is a bug in MPS for non-contiguous tensors, so we need to make them contiguous
@@ -163,7 +181,8 @@ class MiniCPMAttention(nn.Module):
             query_states,
             key_states,
             value_states,
-            is_causal=is_causal,
+            attn_mask=attn_mask,
+            is_causal=is_causal and attn_mask is None,
             enable_gqa=True,
         )
 
@@ -181,6 +200,7 @@ class MiniCPMAttention(nn.Module):
         position_emb: Tuple[torch.Tensor, torch.Tensor],
         position_id: int,
         kv_cache: Tuple[torch.Tensor, torch.Tensor],
+        attn_mask: torch.Tensor = None,
     ) -> torch.Tensor:
         bsz, _ = hidden_states.size()
 
@@ -201,7 +221,8 @@ class MiniCPMAttention(nn.Module):
         key_cache[:, :, position_id, :] = key_states
         value_cache[:, :, position_id, :] = value_states
 
-        attn_mask = torch.arange(key_cache.size(2), device=key_cache.device) <= position_id
+        if attn_mask is None:
+            attn_mask = torch.arange(key_cache.size(2), device=key_cache.device) <= position_id
 
         # ref: https://github.com/pytorch/pytorch/issues/163597
         # there is a bug in MPS for non-contiguous tensors, so we need to make them contiguous
@@ -257,12 +278,18 @@ class MiniCPMDecoderLayer(nn.Module):
         hidden_states: torch.Tensor,
         position_emb: Tuple[torch.Tensor, torch.Tensor],
         is_causal: bool,
+        attn_mask: Optional[torch.Tensor] = None,
+        past_key_value: Optional[Tuple[torch.Tensor, torch.Tensor]] = None,
     ) -> Tuple[torch.Tensor, Tuple[torch.Tensor, torch.Tensor]]:
         """
         Args:
             hidden_states (`torch.FloatTensor`): input to the layer of shape `(batch, seq_len, embed_dim)`
             position_ids (`torch.LongTensor`): position ids of shape `(batch_size, seq_len)`
             is_causal (`bool`): whether the attention mask is causal
+            attn_mask (`torch.BoolTensor`, *optional*): explicit mask of shape `(batch, 1, seq_len, seq_len)`,
+                replaces ``is_causal`` when given
+            past_key_value (`Tuple(torch.FloatTensor)`, *optional*): keys/values of earlier positions;
+                the returned cache includes them
         """
         residual = hidden_states
         hidden_states = self.input_layernorm(hidden_states)
@@ -271,6 +298,8 @@ class MiniCPMDecoderLayer(nn.Module):
             hidden_states=hidden_states,
             position_emb=position_emb,
             is_causal=is_causal,
+            attn_mask=attn_mask,
+            past_key_value=past_key_value,
         )
 
         if self.use_mup:
@@ -296,6 +325,7 @@ class MiniCPMDecoderLayer(nn.Module):
         position_emb: Tuple[torch.Tensor, torch.Tensor],
         position_id: torch.Tensor,
         kv_cache: Tuple[torch.Tensor, torch.Tensor],
+        attn_mask: torch.Tensor = None,
     ) -> torch.Tensor:
         residual = hidden_states
         hidden_states = self.input_layernorm(hidden_states)
@@ -305,6 +335,7 @@ class MiniCPMDecoderLayer(nn.Module):
             position_emb=position_emb,
             position_id=position_id,
             kv_cache=kv_cache,
+            attn_mask=attn_mask,
         )
 
         if self.use_mup:
@@ -356,32 +387,71 @@ class MiniCPMModel(nn.Module):
         self,
         inputs_embeds: torch.Tensor,
         is_causal: bool = True,
+        position_ids: Optional[torch.Tensor] = None,
+        segment_ids: Optional[torch.Tensor] = None,
+        past_key_values: Optional[List[Tuple[torch.Tensor, torch.Tensor]]] = None,
     ) -> Tuple[torch.Tensor, List[Tuple[torch.Tensor, torch.Tensor]]]:
         """
         Args:
             inputs_embeds: Tensor(batch_size, seq_length, hidden_size)
             is_causal: bool, whether the attention mask is causal
+            position_ids: Tensor(batch_size, seq_length), optional; defaults to 0..seq_length-1
+            segment_ids: Tensor(batch_size, seq_length), optional; for packed sequences, tokens
+                only attend within their own segment (block-diagonal, causal if ``is_causal``)
+            past_key_values: List[(batch_size, num_kv_heads, past_length, head_dim) x 2], optional; keys/values
+                of a prefix already run, so ``inputs_embeds`` continues at position ``past_length`` (causal only)
         Returns:
             hidden_states: Tensor(batch_size, seq_length, hidden_size)
             next_decoder_cache: List[(batch_size, num_heads, seq_length, head_dim), (batch_size, num_heads, seq_length, head_dim)]
         """
-        position_ids = torch.arange(0, inputs_embeds.size(1), dtype=torch.long, device=inputs_embeds.device)
-        position_emb = self.rope_emb(position_ids)
+        past_length = 0 if past_key_values is None else past_key_values[0][0].size(2)
+        if past_key_values is not None:
+            if not is_causal or position_ids is not None or segment_ids is not None:
+                raise ValueError("past_key_values only supports plain causal attention")
+            seq_len = inputs_embeds.size(1)
+            position_emb = self.rope_emb.prefix(past_length + seq_len)
+            position_emb = tuple(x[past_length:] for x in position_emb)
+        elif position_ids is None:
+            position_emb = self.rope_emb.prefix(inputs_embeds.size(1))
+        else:
+            # [b, t, d] -> [b, 1, t, d] to broadcast over heads
+            position_emb = tuple(x.unsqueeze(1) for x in self.rope_emb(position_ids))
+
+        attn_mask = None
+        if segment_ids is not None:
+            attn_mask = segment_ids.unsqueeze(-1) == segment_ids.unsqueeze(-2)
+            if is_causal:
+                seq_len = segment_ids.size(1)
+                attn_mask = attn_mask & torch.ones(
+                    seq_len, seq_len, dtype=torch.bool, device=segment_ids.device
+                ).tril()
+            attn_mask = attn_mask.unsqueeze(1)
+        elif past_key_values is not None:
+            # query i sits at position past_length + i; SDPA's is_causal would align it to key i instead
+            attn_mask = torch.arange(past_length + seq_len, device=inputs_embeds.device) <= (
+                past_length + torch.arange(seq_len, device=inputs_embeds.device).unsqueeze(-1)
+            )
         hidden_states = inputs_embeds
 
         next_decoder_cache = []
 
-        for decoder_layer in self.layers:
+        for i, decoder_layer in enumerate(self.layers):
 
             hidden_states, this_cache = decoder_layer(
                 hidden_states,
                 position_emb,
                 is_causal,
+                attn_mask,
+                None if past_key_values is None else past_key_values[i],
             )
             next_decoder_cache.append(this_cache)
         hidden_states = self.norm(hidden_states)
         return hidden_states, next_decoder_cache
 
+    def prefill(self, inputs_embeds: torch.Tensor) -> Tuple[torch.Tensor, List[Tuple[torch.Tensor, torch.Tensor]]]:
+        """Causal ``forward`` over a whole prompt; a separate entry point so it can be compiled on its own"""
+        return self.forward(inputs_embeds, is_causal=True)
+
     def forward_step(
         self,
         inputs_embeds: torch.Tensor,
@@ -395,7 +465,9 @@ class MiniCPMModel(nn.Module):
         """
         assert self.kv_cache is not None, "KV cache is not setup"
 
+        # rotary tables and the cache mask are shared by every layer of this step
         position_emb = self.rope_emb(position_id)
+        attn_mask = torch.arange(self.kv_cache.capacity, device=inputs_embeds.device) <= position_id
         hidden_states = inputs_embeds
 
         for i, decoder_layer in enumerate(self.layers):
@@ -404,6 +476,7 @@ class MiniCPMModel(nn.Module):
                 position_emb,
                 position_id,
                 self.kv_cache.get_layer_cache(i),
+                attn_mask,
             )
 
         hidden_states = self.norm(hidden_states)
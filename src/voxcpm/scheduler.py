@@ -0,0 +1,308 @@
+"""
+Slack-ordered scheduling of concurrent streaming generations.
+
+Every streaming request submitted to a ``StreamScheduler`` becomes a generator
+that a single executor thread advances one decode step (one audio chunk) at a
+time. Each stream keeps a ``PlaybackClock`` of the client's playback position,
+assuming playback starts with the first chunk and pauses whenever the buffer
+runs dry. Its slack is the audio the client still has buffered, or the time left
+until ``first_chunk_budget`` for streams that have not emitted yet. The executor
+always steps the stream with the least slack, so a client that is about to
+stall is served before one that is seconds ahead. Under overload the streams
+that are ahead absorb the delay instead of every stream stuttering.
+
+The base and residual LMs decode from one static KV cache per model. When the
+executor switches streams, the outgoing stream's filled prefix is copied out and
+the incoming one's copied back in place. The caches grow with the longest
+stream; once no stream is left they are trimmed back to ``idle_kv_capacity``
+positions, so one long request does not hold its peak memory forever. A model
+compiled with ``optimize()`` pins its caches at ``max_length`` instead: their
+buffer addresses never change, so the CUDA graphs captured by ``torch.compile``
+remain valid, and trimming is a no-op.
+
+The scheduler therefore has to be the only user of a model's KV caches. Work
+that needs a model for one whole call (non-streaming ``generate``, a
+``GenerationSession`` segment) goes through ``run``: it executes on the same
+thread between two steps, after the current stream's KV state was copied out.
+"""
+
+import concurrent.futures
+import contextvars
+import itertools
+import os
+import queue
+import threading
+import time
+from typing import Iterator, List, Optional
+
+import numpy as np
+
+from .utils.metrics import (
+    KV_SWITCHES, SCHEDULER_STREAMS, STREAM_SLACK, STREAM_UNDERRUN_SECONDS, STREAM_UNDERRUNS,
+)
+
+_END = object()
+
+
+class PlaybackClock:
+    """Client-side playback position of one stream"""
+
+    def __init__(self, sample_rate: int, first_chunk_budget: float = 1.0, arrival: Optional[float] = None):
+        self.sample_rate = sample_rate
+        self.first_chunk_budget = first_chunk_budget
+        self.arrival = time.perf_counter() if arrival is None else arrival
+        self.first_emit: Optional[float] = None
+        self.emitted = 0.0  # seconds of audio sent
+        self.stalled = 0.0  # seconds playback was paused waiting for audio
+        self.underruns = 0
+
+    def slack(self, now: float) -> float:
+        if self.first_emit is None:
+            return self.first_chunk_budget - (now - self.arrival)
+        return self.emitted - (now - self.first_emit - self.stalled)
+
+    def emit(self, num_samples: int, now: float) -> float:
+        """Account a chunk sent at ``now``; returns how long the client was stalled before it"""
+        stall = 0.0
+        if self.first_emit is None:
+            self.first_emit = now
+        else:
+            stall = max(0.0, -self.slack(now))
+            if stall > 0:
+                self.underruns += 1
+                self.stalled += stall
+        self.emitted += num_samples / self.sample_rate
+        return stall
+
+
+class _Stream:
+    def __init__(self, stream_id: int, model, kwargs: dict, clock: PlaybackClock, playback: bool):
+        self.id = stream_id
+        self.model = model
+        self.kwargs = kwargs
+        self.clock = clock
+        self.playback = playback
+        self.context = contextvars.copy_context()
+        self.gen = None
+        self.kv = None  # (base_lm, residual_lm) cache snapshots while swapped out
+        self.out: "queue.Queue" = queue.Queue()
+        self.cancelled = False
+
+
+class _Job:
+    def __init__(self, model, fn, args: tuple, kwargs: dict):
+        self.model = model
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.context = contextvars.copy_context()
+        self.future = concurrent.futures.Future()
+
+
+class StreamScheduler:
+    """Single executor that interleaves streaming generations by playback slack.
+
+    Args:
+        first_chunk_budget: Target time to first chunk; a new stream's slack is
+            the part of this budget it has not spent waiting yet.
+        offline_slack: Extra slack for ``playback=False`` streams (consumers that
+            collect the whole audio), so they yield to live playback but still progress.
+        max_streams: Streams decoded concurrently (each holds a KV snapshot while
+            swapped out); later submissions wait in FIFO order. 0 = unlimited.
+        idle_kv_capacity: KV cache positions kept per model while no stream or
+            job is running; the rest of the storage is released.
+    """
+
+    def __init__(self, first_chunk_budget: float = 1.0, offline_slack: float = 2.0, max_streams: int = 0,
+                 idle_kv_capacity: int = 1024):
+        self.first_chunk_budget = first_chunk_budget
+        self.offline_slack = offline_slack
+        self.max_streams = max_streams
+        self.idle_kv_capacity = idle_kv_capacity
+        self._ids = itertools.count()
+        self._active: List[_Stream] = []
+        self._pending: List[_Stream] = []
+        self._jobs: List[_Job] = []
+        self._owner: Optional[_Stream] = None
+        self._used = {}  # id(model) -> model, run since the last idle trim
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def submit(self, model, playback: bool = True, **generate_kwargs) -> Iterator[np.ndarray]:
+        """Schedule ``model.generate_streaming(**generate_kwargs)``; returns its chunks.
+
+        Closing the returned iterator (e.g. on client disconnect) cancels the stream.
+        """
+        clock = PlaybackClock(model.tts_model.sample_rate, self.first_chunk_budget)
+        stream = _Stream(next(self._ids), model, generate_kwargs, clock, playback)
+        with self._cond:
+            self._pending.append(stream)
+            self._admit()
+            self._start()
+            self._cond.notify()
+        return self._consume(stream)
+
+    def run(self, model, fn, *args, **kwargs):
+        """Call ``fn(*args, **kwargs)`` on the executor with exclusive use of ``model``; returns its result.
+
+        For anything that runs ``model`` outside ``submit`` (e.g. ``model.generate``),
+        so it cannot overwrite the KV state of a stream. Blocks until done; jobs run
+        in FIFO order ahead of the next stream step.
+        """
+        job = _Job(model, fn, args, kwargs)
+        with self._cond:
+            self._jobs.append(job)
+            self._start()
+            self._cond.notify()
+        return job.future.result()
+
+    def _start(self):
+        # Called with the condition held
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="voxcpm-stream-scheduler", daemon=True)
+            self._thread.start()
+
+    def _consume(self, stream: _Stream) -> Iterator[np.ndarray]:
+        try:
+            while True:
+                item = stream.out.get()
+                if item is _END:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            with self._cond:
+                stream.cancelled = True
+                self._cond.notify()
+
+    def _admit(self):
+        while self._pending and (not self.max_streams or len(self._active) < self.max_streams):
+            self._active.append(self._pending.pop(0))
+        SCHEDULER_STREAMS.set(len(self._active))
+
+    def _slack(self, stream: _Stream, now: float) -> float:
+        slack = stream.clock.slack(now)
+        return slack if stream.playback else slack + self.offline_slack
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                for stream in [s for s in self._active + self._pending if s.cancelled]:
+                    self._remove(stream)
+                while not self._active and not self._jobs:
+                    self._trim_idle()
+                    self._cond.wait()
+                    for stream in [s for s in self._pending if s.cancelled]:
+                        self._remove(stream)
+                job = self._jobs.pop(0) if self._jobs else None
+                if job is None:
+                    now = time.perf_counter()
+                    stream = min(self._active, key=lambda s: (self._slack(s, now), s.id))
+                model = stream.model if job is None else job.model
+                self._used[id(model)] = model
+            if job is not None:
+                self._run_job(job)
+            else:
+                self._step(stream)
+
+    def _trim_idle(self):
+        # Called with the condition held, with no stream holding KV state
+        for model in self._used.values():
+            tts_model = model.tts_model
+            tts_model.base_lm.kv_cache.trim(self.idle_kv_capacity)
+            tts_model.residual_lm.kv_cache.trim(self.idle_kv_capacity)
+        self._used.clear()
+
+    def _run_job(self, job: _Job):
+        if not job.future.set_running_or_notify_cancel():
+            return
+        owner = self._owner
+        try:
+            if owner is not None and owner.gen is not None and owner.model is job.model:
+                # the job overwrites the caches; the owner is restored on its next step
+                owner.kv = _snapshot(owner.model)
+                self._owner = None
+            result = job.context.run(job.fn, *job.args, **job.kwargs)
+        except BaseException as e:
+            job.future.set_exception(e)
+        else:
+            job.future.set_result(result)
+
+    def _step(self, stream: _Stream):
+        try:
+            self._activate(stream)
+            if stream.gen is None:
+                stream.gen = stream.model.generate_streaming(**stream.kwargs)
+            chunk = stream.context.run(next, stream.gen)
+        except StopIteration:
+            self._finish(stream, _END)
+            return
+        except Exception as e:
+            self._finish(stream, e)
+            return
+        now = time.perf_counter()
+        if stream.playback:
+            if stream.clock.first_emit is not None:
+                STREAM_SLACK.observe(stream.clock.slack(now))
+            stall = stream.clock.emit(len(chunk), now)
+            if stall > 0:
+                STREAM_UNDERRUNS.inc()
+                STREAM_UNDERRUN_SECONDS.inc(stall)
+        else:
+            stream.clock.emit(len(chunk), now)
+        stream.out.put(chunk)
+
+    def _activate(self, stream: _Stream):
+        """Make ``stream``'s KV state current in its model's caches"""
+        owner = self._owner
+        if owner is stream:
+            return
+        if owner is not None and owner.gen is not None:
+            owner.kv = _snapshot(owner.model)
+        if stream.kv is not None:
+            _restore(stream.model, stream.kv)
+            stream.kv = None
+            KV_SWITCHES.inc()
+        self._owner = stream
+
+    def _finish(self, stream: _Stream, item):
+        stream.out.put(item)
+        with self._cond:
+            self._remove(stream)
+
+    def _remove(self, stream: _Stream):
+        # Called with the condition held
+        if stream in self._active:
+            self._active.remove(stream)
+        elif stream in self._pending:
+            self._pending.remove(stream)
+        if self._owner is stream:
+            self._owner = None
+        if stream.gen is not None:
+            try:
+                stream.context.run(stream.gen.close)
+            except Exception:
+                pass
+            stream.gen = None
+        stream.kv = None
+        self._admit()
+
+
+def _snapshot(model):
+    tts_model = model.tts_model
+    return tts_model.base_lm.kv_cache.snapshot(), tts_model.residual_lm.kv_cache.snapshot()
+
+
+def _restore(model, kv):
+    tts_model = model.tts_model
+    tts_model.base_lm.kv_cache.restore(kv[0])
+    tts_model.residual_lm.kv_cache.restore(kv[1])
+
+
+stream_scheduler = StreamScheduler(
+    first_chunk_budget=float(os.getenv("VOXCPM_FIRST_CHUNK_BUDGET_S", "1.0")),
+    offline_slack=float(os.getenv("VOXCPM_OFFLINE_SLACK_S", "2.0")),
+    max_streams=int(os.getenv("VOXCPM_MAX_STREAMS", "0")),
+    idle_kv_capacity=int(os.getenv("VOXCPM_IDLE_KV_CAPACITY", "1024")),
+)
@@ -13,7 +13,9 @@ from .data import (
     HFVoxCPMDataset,
     build_dataloader,
     BatchProcessor,
+    LengthBucketedBatchSampler,
 )
+from .latents import LatentShardDataset, LatentShardWriter
 from .state import TrainingState
 
 __all__ = [
@@ -21,6 +23,9 @@ __all__ = [
     "TrainingTracker",
     "HFVoxCPMDataset",
     "BatchProcessor",
+    "LengthBucketedBatchSampler",
+    "LatentShardDataset",
+    "LatentShardWriter",
     "TrainingState",
     "load_audio_text_datasets",
     "build_dataloader",
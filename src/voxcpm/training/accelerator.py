@@ -140,7 +140,18 @@ class Accelerator:
         shuffle: bool = True,
         collate_fn=None,
         drop_last: bool = False,
+        batch_sampler: typing.Optional[torch.utils.data.Sampler] = None,
     ) -> torch.utils.data.DataLoader:
+        if batch_sampler is not None:
+            # The batch sampler owns shuffling and DDP sharding (see LengthBucketedBatchSampler)
+            return torch.utils.data.DataLoader(
+                dataset,
+                batch_sampler=batch_sampler,
+                num_workers=num_workers,
+                collate_fn=collate_fn,
+                pin_memory=True,
+            )
+
         if self.world_size > 1:
             sampler = torch.utils.data.distributed.DistributedSampler(
                 dataset, num_replicas=self.world_size, rank=self.rank, shuffle=shuffle
@@ -1,14 +1,16 @@
 import math
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple, Union
 
 import argbind
 import torch
 from datasets import Audio, Dataset, DatasetDict, load_dataset
 from torch.utils.data import Dataset as TorchDataset
+from torch.utils.data import Sampler
 
 from ..model.voxcpm import VoxCPMConfig
 from ..modules.audiovae import AudioVAE
+from .latents import LatentShardDataset
 from .packers import AudioFeatureProcessingPacker
 
 
@@ -95,6 +97,100 @@ def compute_sample_lengths(
     return lengths
 
 
+class LengthBucketedBatchSampler(Sampler[List[int]]):
+    """
+    Token-budget batch sampler: groups samples of similar length so that a batch
+    costs at most ``max_batch_tokens`` after padding (or, with ``packed=True``,
+    after concatenating the samples into rows).
+
+    Each epoch the indices are shuffled, sorted by length inside windows of
+    ``sort_window`` samples, cut into batches greedily and the batch order is
+    shuffled again. ``lengths`` are the estimates from ``compute_sample_lengths``.
+
+    Under DDP every rank builds the same batch list from ``seed + epoch`` and takes
+    every ``num_replicas``-th batch; the list is trimmed (``drop_last``) or padded
+    with repeated batches so all ranks run the same number of steps. Call
+    ``set_epoch`` before each epoch, as with ``DistributedSampler``.
+    """
+
+    def __init__(
+        self,
+        lengths: List[int],
+        max_batch_tokens: int,
+        *,
+        max_batch_size: int = 0,
+        packed: bool = False,
+        sort_window: int = 1000,
+        num_replicas: int = 1,
+        rank: int = 0,
+        shuffle: bool = True,
+        seed: int = 0,
+        drop_last: bool = False,
+    ):
+        if max_batch_tokens <= 0:
+            raise ValueError("max_batch_tokens must be positive")
+        self.lengths = list(lengths)
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_size = max_batch_size
+        self.packed = packed
+        self.sort_window = max(sort_window, 1)
+        self.num_replicas = num_replicas
+        self.rank = rank
+        self.shuffle = shuffle
+        self.seed = seed
+        self.drop_last = drop_last
+        self.epoch = 0
+
+    def set_epoch(self, epoch: int):
+        self.epoch = epoch
+
+    def _batch_cost(self, batch_max_len: int, batch_sum_len: int, batch_count: int) -> int:
+        return batch_sum_len if self.packed else batch_max_len * batch_count
+
+    def _build_batches(self) -> List[List[int]]:
+        generator = torch.Generator()
+        generator.manual_seed(self.seed + self.epoch)
+        if self.shuffle:
+            order = torch.randperm(len(self.lengths), generator=generator).tolist()
+        else:
+            order = list(range(len(self.lengths)))
+
+        batches: List[List[int]] = []
+        for start in range(0, len(order), self.sort_window):
+            window = sorted(order[start : start + self.sort_window], key=lambda i: self.lengths[i])
+            batch: List[int] = []
+            batch_max, batch_sum = 0, 0
+            for idx in window:
+                length = self.lengths[idx]
+                new_max, new_sum = max(batch_max, length), batch_sum + length
+                too_many = self.max_batch_size and len(batch) >= self.max_batch_size
+                if batch and (too_many or self._batch_cost(new_max, new_sum, len(batch) + 1) > self.max_batch_tokens):
+                    batches.append(batch)
+                    batch, new_max, new_sum = [], length, length
+                batch.append(idx)
+                batch_max, batch_sum = new_max, new_sum
+            if batch:
+                batches.append(batch)
+
+        if self.shuffle:
+            batches = [batches[i] for i in torch.randperm(len(batches), generator=generator).tolist()]
+
+        if self.num_replicas > 1:
+            remainder = len(batches) % self.num_replicas
+            if remainder and self.drop_last:
+                batches = batches[: len(batches) - remainder]
+            elif remainder:
+                batches += batches[: self.num_replicas - remainder]
+            batches = batches[self.rank :: self.num_replicas]
+        return batches
+
+    def __iter__(self) -> Iterator[List[int]]:
+        return iter(self._build_batches())
+
+    def __len__(self) -> int:
+        return len(self._build_batches())
+
+
 class HFVoxCPMDataset(TorchDataset):
     """
     Thin wrapper around a tokenized HuggingFace dataset that returns
@@ -164,6 +260,8 @@ class BatchProcessor:
         audio_vae: AudioVAE,
         dataset_cnt: int,
         device: torch.device,
+        encode_batch_size: int = 8,
+        pack_sequences: bool = False,
     ):
         self.device = device
         self.dataset_cnt = dataset_cnt
@@ -175,40 +273,59 @@ class BatchProcessor:
             patch_size=config.patch_size,
             feat_dim=config.feat_dim,
             audio_vae=self.audio_vae,
+            encode_batch_size=encode_batch_size,
+            pack_sequences=pack_sequences,
         )
 
     def __call__(self, batch: Dict[str, torch.Tensor]) -> Dict[str, torch.Tensor]:
-        audio_tokens = batch["audio_tokens"].to(self.device)
         text_tokens = batch["text_tokens"].to(self.device)
         task_ids = batch["task_ids"].to(self.device)
         dataset_ids = batch["dataset_ids"].to(self.device)
 
+        if "audio_feats" in batch:
+            # Batches from LatentShardDataset already carry the VAE latents
+            audio_tokens = None
+            feats = batch["audio_feats"].to(self.device, non_blocking=True)
+            audio_feats = [
+                feats[i : i + 1, :length] for i, length in enumerate(batch["audio_feat_lens"].tolist())
+            ]
+        else:
+            audio_tokens = batch["audio_tokens"].to(self.device)
+            audio_feats = None
+
         packed = self.packer(
             audio_tokens=audio_tokens,
             text_tokens=text_tokens,
             task_ids=task_ids,
             dataset_ids=dataset_ids,
             is_prompts=batch["is_prompts"],
+            audio_feats=audio_feats,
         )
         return packed
 
 
 def build_dataloader(
-    hf_dataset: Dataset,
+    hf_dataset: Union[Dataset, LatentShardDataset],
     *,
     accelerator,
     batch_size: int,
     num_workers: int,
     drop_last: bool = False,
+    batch_sampler: Optional[LengthBucketedBatchSampler] = None,
 ) -> torch.utils.data.DataLoader:
-    torch_dataset = HFVoxCPMDataset(hf_dataset)
+    if isinstance(hf_dataset, LatentShardDataset):
+        torch_dataset, collate_fn = hf_dataset, LatentShardDataset.collate_fn
+    else:
+        torch_dataset, collate_fn = HFVoxCPMDataset(hf_dataset), HFVoxCPMDataset.collate_fn
     # Standard padding-based batching; Accelerator will attach DistributedSampler if needed.
+    # With a batch sampler, batch_size / drop_last are decided by the sampler instead.
     return accelerator.prepare_dataloader(
         torch_dataset,
         batch_size=batch_size,
         num_workers=num_workers,
         shuffle=True,
-        collate_fn=HFVoxCPMDataset.collate_fn,
+        collate_fn=collate_fn,
         drop_last=drop_last,
+        batch_sampler=batch_sampler,
     )
 
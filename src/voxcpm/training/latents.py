@@ -0,0 +1,256 @@
+"""
+Offline AudioVAE latent cache for fine-tuning.
+
+The AudioVAE is frozen during fine-tuning, so its latents are a pure function
+of the training audio. ``LatentShardWriter`` stores them once, together with the
+tokenized text, as flat ``.npy`` shards that can be memory-mapped, and
+``LatentShardDataset`` streams them back into ``BatchProcessor`` so training
+skips audio decoding and VAE encoding entirely.
+
+Cache layout::
+
+    <cache_dir>/
+        meta.json                 # feat_dim, hop_length, sample_rate, dtype, ...
+        index.npy                 # one record per sample (see INDEX_DTYPE)
+        shard_00000.feats.npy     # [sum(feat_len), feat_dim] concatenated latents
+        shard_00000.text.npy      # [sum(text_len)] concatenated text ids (int32)
+        ...
+"""
+
+import json
+import os
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import torch
+from torch.utils.data import Dataset as TorchDataset
+
+
+CACHE_FORMAT_VERSION = 1
+META_FILE = "meta.json"
+INDEX_FILE = "index.npy"
+
+INDEX_DTYPE = np.dtype(
+    [
+        ("shard", np.int32),
+        ("feat_offset", np.int64),
+        ("feat_len", np.int32),
+        ("text_offset", np.int64),
+        ("text_len", np.int32),
+        ("dataset_id", np.int32),
+        ("is_prompt", np.bool_),
+    ]
+)
+
+
+def _shard_paths(cache_dir: str, shard: int):
+    prefix = os.path.join(cache_dir, f"shard_{shard:05d}")
+    return f"{prefix}.feats.npy", f"{prefix}.text.npy"
+
+
+class LatentShardWriter:
+    """
+    Accumulates (latents, text ids) samples and flushes them into shards of
+    roughly ``shard_frames`` latent frames each.
+
+    Latents are stored exactly as ``AudioFeatureProcessingPacker.encode_audio``
+    returns them (``[T, D]``, audio already padded to ``patch_len``), so the packer
+    produces identical training batches from the cache.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str,
+        *,
+        feat_dim: int,
+        hop_length: int,
+        sample_rate: int,
+        patch_size: int,
+        shard_frames: int = 1 << 20,
+        dtype: str = "float32",
+    ):
+        if dtype not in ("float32", "float16"):
+            raise ValueError(f"Unsupported latent dtype '{dtype}', expected 'float32' or 'float16'.")
+        os.makedirs(cache_dir, exist_ok=True)
+        self.cache_dir = cache_dir
+        self.meta = {
+            "version": CACHE_FORMAT_VERSION,
+            "feat_dim": int(feat_dim),
+            "hop_length": int(hop_length),
+            "sample_rate": int(sample_rate),
+            "patch_size": int(patch_size),
+            "dtype": dtype,
+        }
+        self.shard_frames = shard_frames
+        self.dtype = np.dtype(dtype)
+
+        self._records: List[tuple] = []
+        self._shard = 0
+        self._feats: List[np.ndarray] = []
+        self._texts: List[np.ndarray] = []
+        self._feat_offset = 0
+        self._text_offset = 0
+
+    def __len__(self):
+        return len(self._records)
+
+    def add(self, audio_feats, text_ids: Sequence[int], dataset_id: int = 0, is_prompt: bool = False):
+        """Append one sample. ``audio_feats`` is ``[T, D]`` or ``[1, T, D]``."""
+        if isinstance(audio_feats, torch.Tensor):
+            audio_feats = audio_feats.detach().float().cpu().numpy()
+        audio_feats = np.asarray(audio_feats).reshape(-1, self.meta["feat_dim"]).astype(self.dtype, copy=False)
+        text_ids = np.asarray(text_ids, dtype=np.int32).reshape(-1)
+
+        self._records.append(
+            (
+                self._shard,
+                self._feat_offset,
+                audio_feats.shape[0],
+                self._text_offset,
+                text_ids.shape[0],
+                int(dataset_id),
+                bool(is_prompt),
+            )
+        )
+        self._feats.append(audio_feats)
+        self._texts.append(text_ids)
+        self._feat_offset += audio_feats.shape[0]
+        self._text_offset += text_ids.shape[0]
+
+        if self._feat_offset >= self.shard_frames:
+            self._flush()
+
+    def _flush(self):
+        if not self._feats:
+            return
+        feats_path, text_path = _shard_paths(self.cache_dir, self._shard)
+        np.save(feats_path, np.concatenate(self._feats, axis=0))
+        np.save(text_path, np.concatenate(self._texts, axis=0))
+        self._shard += 1
+        self._feats, self._texts = [], []
+        self._feat_offset = self._text_offset = 0
+
+    def close(self):
+        """Flush the last shard and write ``index.npy`` / ``meta.json``."""
+        self._flush()
+        index = np.array(self._records, dtype=INDEX_DTYPE)
+        np.save(os.path.join(self.cache_dir, INDEX_FILE), index)
+        meta = dict(self.meta, num_samples=len(self._records), num_shards=self._shard)
+        with open(os.path.join(self.cache_dir, META_FILE), "w") as f:
+            json.dump(meta, f, indent=2)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+
+
+class LatentShardDataset(TorchDataset):
+    """
+    Memory-mapped reader for a cache written by ``LatentShardWriter``.
+
+    Shards are opened lazily in each DataLoader worker; only the slices of a
+    sample are read from disk. ``select`` mirrors ``datasets.Dataset.select`` so
+    the training script can filter both dataset kinds the same way.
+    """
+
+    def __init__(self, cache_dir: str, indices: Optional[Sequence[int]] = None):
+        self.cache_dir = cache_dir
+        with open(os.path.join(cache_dir, META_FILE)) as f:
+            self.meta = json.load(f)
+        if self.meta.get("version") != CACHE_FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported latent cache version {self.meta.get('version')} in {cache_dir}, "
+                f"expected {CACHE_FORMAT_VERSION}. Re-run scripts/preextract_latents.py."
+            )
+        index = np.load(os.path.join(cache_dir, INDEX_FILE))
+        self.index = index if indices is None else index[np.asarray(indices, dtype=np.int64)]
+        self._shards: Dict[int, tuple] = {}
+
+    def __getstate__(self):
+        # Never pickle open memmaps into DataLoader workers
+        state = self.__dict__.copy()
+        state["_shards"] = {}
+        return state
+
+    def __len__(self):
+        return len(self.index)
+
+    @property
+    def feat_dim(self) -> int:
+        return int(self.meta["feat_dim"])
+
+    @property
+    def dataset_cnt(self) -> int:
+        return int(self.index["dataset_id"].max()) + 1 if len(self.index) else 1
+
+    def select(self, indices: Sequence[int]) -> "LatentShardDataset":
+        subset = LatentShardDataset.__new__(LatentShardDataset)
+        subset.cache_dir = self.cache_dir
+        subset.meta = self.meta
+        subset.index = self.index[np.asarray(indices, dtype=np.int64)]
+        subset._shards = {}
+        return subset
+
+    def sample_lengths(self, patch_size: int = 1) -> List[int]:
+        """Packed sequence length per sample, same estimate as ``compute_sample_lengths``."""
+        feat_len = self.index["feat_len"].astype(np.int64)
+        text_len = self.index["text_len"].astype(np.int64)
+        return (text_len + -(-feat_len // patch_size) + 2).tolist()
+
+    def _open_shard(self, shard: int):
+        arrays = self._shards.get(shard)
+        if arrays is None:
+            feats_path, text_path = _shard_paths(self.cache_dir, shard)
+            arrays = (np.load(feats_path, mmap_mode="r"), np.load(text_path, mmap_mode="r"))
+            self._shards[shard] = arrays
+        return arrays
+
+    def __getitem__(self, idx: int):
+        record = self.index[idx]
+        feats, texts = self._open_shard(int(record["shard"]))
+        feat_offset, text_offset = int(record["feat_offset"]), int(record["text_offset"])
+        audio_feats = np.array(feats[feat_offset : feat_offset + int(record["feat_len"])], dtype=np.float32)
+        text_ids = np.array(texts[text_offset : text_offset + int(record["text_len"])])
+        return {
+            "text_ids": text_ids,
+            "audio_feats": audio_feats,
+            "dataset_id": int(record["dataset_id"]),
+            "is_prompt": bool(record["is_prompt"]),
+        }
+
+    @staticmethod
+    def collate_fn(batch: List[Dict]):
+        text_tensors = [torch.from_numpy(sample["text_ids"]).to(torch.int32) for sample in batch]
+        feat_lens = torch.tensor([sample["audio_feats"].shape[0] for sample in batch], dtype=torch.int32)
+        max_feat_len = int(feat_lens.max()) if len(batch) else 0
+        feat_dim = batch[0]["audio_feats"].shape[1] if batch else 0
+
+        audio_feats = torch.zeros(len(batch), max_feat_len, feat_dim, dtype=torch.float32)
+        for i, sample in enumerate(batch):
+            audio_feats[i, : sample["audio_feats"].shape[0]] = torch.from_numpy(sample["audio_feats"])
+
+        max_text_len = max((t.shape[0] for t in text_tensors), default=0)
+        text_padded = torch.full((len(batch), max_text_len), -100, dtype=torch.int32)
+        for i, text in enumerate(text_tensors):
+            text_padded[i, : text.shape[0]] = text
+
+        return {
+            "text_tokens": text_padded,
+            "audio_feats": audio_feats,
+            "audio_feat_lens": feat_lens,
+            "task_ids": torch.ones(len(batch), dtype=torch.int32),
+            "dataset_ids": torch.tensor([sample["dataset_id"] for sample in batch], dtype=torch.int32),
+            "is_prompts": [sample["is_prompt"] for sample in batch],
+        }
+
+
+def check_cache_compatible(dataset: LatentShardDataset, *, feat_dim: int, hop_length: int, sample_rate: int):
+    """Fail early if a cache was extracted with a different AudioVAE."""
+    expected = {"feat_dim": int(feat_dim), "hop_length": int(hop_length), "sample_rate": int(sample_rate)}
+    mismatched = {k: (dataset.meta.get(k), v) for k, v in expected.items() if dataset.meta.get(k) != v}
+    if mismatched:
+        details = ", ".join(f"{k}: cache={c} model={m}" for k, (c, m) in mismatched.items())
+        raise ValueError(f"Latent cache {dataset.cache_dir} does not match the model's AudioVAE ({details}).")
@@ -1,8 +1,9 @@
 
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 
 import torch
 import torch.nn as nn
+import torch.nn.functional as F
 from einops import rearrange
 
 
@@ -12,7 +13,16 @@ class AudioFeatureProcessingPacker:
     audio tokens into the packed multimodal representation required by VoxCPM.
     """
 
-    def __init__(self, dataset_cnt: int, max_len: int, patch_size: int, feat_dim: int, audio_vae: nn.Module):
+    def __init__(
+        self,
+        dataset_cnt: int,
+        max_len: int,
+        patch_size: int,
+        feat_dim: int,
+        audio_vae: nn.Module,
+        encode_batch_size: int = 8,
+        pack_sequences: bool = False,
+    ):
         self.audio_start_id = 101
         self.audio_end_id = 102
         # unused now 
@@ -27,6 +37,10 @@ class AudioFeatureProcessingPacker:
         self.max_len = max_len
 
         self.audio_vae = audio_vae
+        # number of waveforms sent through the VAE encoder per call (1 = one call per sample)
+        self.encode_batch_size = max(int(encode_batch_size), 1)
+        # concatenate samples into rows of up to max_len instead of one padded row per sample
+        self.pack_sequences = pack_sequences
 
         self.process_functions = {"tts": self.process_tts_data}
         self.task_id_map = {"tts": 1}
@@ -50,6 +64,14 @@ class AudioFeatureProcessingPacker:
         pad_pos = self._first_pad_position(tokens)
         return tokens if pad_pos is None else tokens[:pad_pos]
 
+    @staticmethod
+    def _unpadded_lengths(tokens: torch.Tensor) -> List[int]:
+        """Per-row length before the first -100 pad, computed for the whole batch with one sync."""
+        is_pad = tokens == -100
+        first_pad = is_pad.int().argmax(dim=1)
+        lengths = torch.where(is_pad.any(dim=1), first_pad, torch.full_like(first_pad, tokens.size(1)))
+        return lengths.tolist()
+
     def encode_audio(self, wav: torch.Tensor):
         """
         Encode raw waveform into latent features using AudioVAE.
@@ -69,6 +91,30 @@ class AudioFeatureProcessingPacker:
             feat = z.transpose(1, 2)  # [1, T', D]
         return feat
 
+    def encode_audio_batch(self, wavs: List[torch.Tensor]) -> List[torch.Tensor]:
+        """
+        Batched ``encode_audio``: returns the same [1, T', D] features per waveform.
+
+        Samples are sorted by length and encoded ``encode_batch_size`` at a time, each
+        group right-padded to its longest member. The encoder is causal and every
+        sample is first padded to a multiple of ``patch_len`` exactly as in
+        ``encode_audio``, so the extra group padding never reaches a sample's own frames.
+        """
+        hop_length = self.audio_vae.hop_length
+        padded_lens = [-(-wav.size(-1) // self.patch_len) * self.patch_len for wav in wavs]
+        order = sorted(range(len(wavs)), key=lambda i: padded_lens[i])
+
+        feats: List[torch.Tensor] = [None] * len(wavs)
+        for start in range(0, len(order), self.encode_batch_size):
+            group = order[start : start + self.encode_batch_size]
+            group_len = padded_lens[group[-1]]
+            wav = torch.stack([F.pad(wavs[i], (0, group_len - wavs[i].size(-1))) for i in group]).unsqueeze(1)
+            with torch.no_grad():
+                z = self.audio_vae.encode(wav, self.audio_vae.sample_rate)  # [G, D, T']
+            for row, i in enumerate(group):
+                feats[i] = z[row : row + 1, :, : padded_lens[i] // hop_length].transpose(1, 2)
+        return feats
+
     # ------------------------------------------------------------------ #
     # Main entry point
     # ------------------------------------------------------------------ #
@@ -79,13 +125,17 @@ class AudioFeatureProcessingPacker:
         task_ids: torch.Tensor,
         dataset_ids: torch.Tensor,
         is_prompts: List[bool],
+        audio_feats: Optional[List[torch.Tensor]] = None,
     ) -> Dict[str, torch.Tensor]:
         """
         Padding-based batching: each sample in the input batch is processed
         independently and then padded to a common length (capped by ``max_len``).
         The result tensors all have shape [B, T, ...].
+
+        ``audio_feats`` optionally provides precomputed [1, T', D] VAE latents per
+        sample (see ``training.latents``); ``audio_tokens`` is then ignored.
         """
-        device = audio_tokens.device
+        device = text_tokens.device
         max_dataset_id = int(dataset_ids.max().item()) if dataset_ids.numel() > 0 else -1
         dataset_cnt = max(self.dataset_cnt, max_dataset_id + 1)
 
@@ -102,11 +152,22 @@ class AudioFeatureProcessingPacker:
         audio_duration_consumed = torch.zeros(dataset_cnt, dtype=torch.float32, device=device)
         text_token_consumed = torch.zeros(dataset_cnt, dtype=torch.float32, device=device)
 
-        for audio_token, text_token, task_id, dataset_idx, is_prompt in zip(
-            audio_tokens, text_tokens, task_ids.tolist(), dataset_ids.tolist(), is_prompts
+        unpad_text_tokens = [
+            text_token[:length] for text_token, length in zip(text_tokens, self._unpadded_lengths(text_tokens))
+        ]
+        if audio_feats is None:
+            unpad_audio_tokens = [
+                audio_token[:length].to(torch.float32)
+                for audio_token, length in zip(audio_tokens, self._unpadded_lengths(audio_tokens))
+            ]
+            batch_audio_feats = self.encode_audio_batch(unpad_audio_tokens)
+        else:
+            unpad_audio_tokens = [None] * len(audio_feats)
+            batch_audio_feats = audio_feats
+
+        for unpad_audio_token, unpad_text_token, audio_feats, task_id, dataset_idx, is_prompt in zip(
+            unpad_audio_tokens, unpad_text_tokens, batch_audio_feats, task_ids.tolist(), dataset_ids.tolist(), is_prompts
         ):
-            unpad_audio_token = self.unpad_audio_tokens(audio_token).to(torch.float32)
-            unpad_text_token = self.unpad_text_tokens(text_token)
             usage = self.id_to_task[task_id]
 
             (
@@ -118,7 +179,7 @@ class AudioFeatureProcessingPacker:
                 labels,
                 audio_duration,
                 text_token_count,
-            ) = self.process_functions[usage](unpad_audio_token, unpad_text_token, is_prompt)
+            ) = self.process_functions[usage](unpad_audio_token, unpad_text_token, is_prompt, audio_feats=audio_feats)
 
             audio_duration_consumed[dataset_idx] += audio_duration
             text_token_consumed[dataset_idx] += text_token_count
@@ -139,6 +200,30 @@ class AudioFeatureProcessingPacker:
             audio_dataset_ids_list.append(audio_dataset_id)
             lengths.append(packed_text.shape[0])
 
+        segment_ids_list: Optional[List[torch.Tensor]] = None
+        if self.pack_sequences and lengths:
+            rows = self._pack_rows(lengths)
+            segment_ids_list = [
+                torch.cat(
+                    [torch.full((lengths[i],), seg + 1, dtype=torch.int32, device=device) for seg, i in enumerate(row)]
+                )
+                for row in rows
+            ]
+            packed_position_ids = [torch.cat([torch.arange(0, lengths[i], device=device) for i in row]) for row in rows]
+
+            def concat_rows(items: List[torch.Tensor]) -> List[torch.Tensor]:
+                return [torch.cat([items[i] for i in row], dim=0) for row in rows]
+
+            text_tokens_list = concat_rows(text_tokens_list)
+            text_mask_list = concat_rows(text_mask_list)
+            audio_feats_list = concat_rows(audio_feats_list)
+            audio_mask_list = concat_rows(audio_mask_list)
+            loss_mask_list = concat_rows(loss_mask_list)
+            labels_list = concat_rows(labels_list)
+            audio_task_ids_list = concat_rows(audio_task_ids_list)
+            audio_dataset_ids_list = concat_rows(audio_dataset_ids_list)
+            lengths = [segment_ids.shape[0] for segment_ids in segment_ids_list]
+
         # Determine padded length per batch (cap by self.max_len)
         if lengths:
             max_len = min(self.max_len, max(lengths))
@@ -173,16 +258,21 @@ class AudioFeatureProcessingPacker:
                 [pad_1d(d, pad_value=0) for d in audio_dataset_ids_list], dim=0
             )
 
-            # Position ids: [B, T], simple 0..L_i-1 then padded with 0
-            position_ids_list = []
-            for L in lengths:
-                L_clip = min(L, max_len)
-                pos = torch.arange(0, L_clip, device=device)
-                if L_clip < max_len:
-                    pad = torch.zeros(max_len - L_clip, dtype=pos.dtype, device=device)
-                    pos = torch.cat([pos, pad], dim=0)
-                position_ids_list.append(pos)
-            position_ids = torch.stack(position_ids_list, dim=0)
+            if segment_ids_list is not None:
+                # Packed rows: positions restart at 0 for every segment, padding has segment id 0
+                position_ids = torch.stack([pad_1d(p, pad_value=0) for p in packed_position_ids], dim=0)
+                segment_ids = torch.stack([pad_1d(s, pad_value=0) for s in segment_ids_list], dim=0)
+            else:
+                # Position ids: [B, T], simple 0..L_i-1 then padded with 0
+                position_ids_list = []
+                for L in lengths:
+                    L_clip = min(L, max_len)
+                    pos = torch.arange(0, L_clip, device=device)
+                    if L_clip < max_len:
+                        pad = torch.zeros(max_len - L_clip, dtype=pos.dtype, device=device)
+                        pos = torch.cat([pos, pad], dim=0)
+                    position_ids_list.append(pos)
+                position_ids = torch.stack(position_ids_list, dim=0)
         else:
             # Empty batch fallback (shouldn't really happen)
             text_tokens_batch = torch.zeros((0, self.max_len), dtype=torch.int32, device=device)
@@ -200,7 +290,7 @@ class AudioFeatureProcessingPacker:
         audio_duration_consumed = audio_duration_consumed.to(torch.long)
         text_token_consumed = text_token_consumed.to(torch.long)
 
-        return {
+        packed = {
             "text_tokens": text_tokens_batch,
             "audio_feats": audio_feats_batch,
             "text_mask": text_mask_batch,
@@ -213,12 +303,31 @@ class AudioFeatureProcessingPacker:
             "audio_duration_consumed": audio_duration_consumed,
             "text_token_consumed": text_token_consumed,
         }
+        if segment_ids_list is not None:
+            packed["segment_ids"] = segment_ids
+        return packed
+
+    def _pack_rows(self, lengths: List[int]) -> List[List[int]]:
+        """First-fit-decreasing assignment of samples to rows of at most ``max_len`` positions."""
+        rows: List[List[int]] = []
+        row_lens: List[int] = []
+        for i in sorted(range(len(lengths)), key=lambda i: -lengths[i]):
+            for r, row_len in enumerate(row_lens):
+                if row_len + lengths[i] <= self.max_len:
+                    rows[r].append(i)
+                    row_lens[r] += lengths[i]
+                    break
+            else:
+                rows.append([i])
+                row_lens.append(lengths[i])
+        return rows
 
     # ------------------------------------------------------------------ #
     # Feature extraction helpers
     # ------------------------------------------------------------------ #
-    def extract_audio_feats(self, audio_data: torch.Tensor):
-        audio_feats = self.encode_audio(audio_data)
+    def extract_audio_feats(self, audio_data: torch.Tensor, audio_feats: Optional[torch.Tensor] = None):
+        if audio_feats is None:
+            audio_feats = self.encode_audio(audio_data)
         if audio_feats.size(1) % self.patch_size != 0:
             audio_feats_ = audio_feats.transpose(1, 2)
             padding = nn.functional.pad(audio_feats_, (0, self.patch_size - audio_feats.size(1) % self.patch_size))
@@ -228,7 +337,13 @@ class AudioFeatureProcessingPacker:
         audio_feats = rearrange(audio_feats, "b (t p) c -> b t p c", p=self.patch_size)
         return audio_feats, audio_duration
 
-    def process_tts_data(self, audio_token: torch.Tensor, text_token: torch.Tensor, is_prompt: bool = False):
+    def process_tts_data(
+        self,
+        audio_token: torch.Tensor,
+        text_token: torch.Tensor,
+        is_prompt: bool = False,
+        audio_feats: Optional[torch.Tensor] = None,
+    ):
         text_token_info = torch.cat(
             [
                 text_token,
@@ -242,7 +357,7 @@ class AudioFeatureProcessingPacker:
         )
         text_token_count = len(text_token)
         text_length = text_token_info.shape[0]
-        audio_feat_info, audio_duration = self.extract_audio_feats(audio_token)
+        audio_feat_info, audio_duration = self.extract_audio_feats(audio_token, audio_feats)
         audio_feat_info = audio_feat_info.squeeze(0)
         audio_length = audio_feat_info.shape[0]
 
@@ -0,0 +1,90 @@
+"""
+Objective audio similarity metrics for numerical regression checks.
+
+These compare an estimate against a reference rendering of the *same* signal
+(e.g. a half-precision decoder against the fp32 one), so they measure numerical
+drift, not perceptual quality of the model. PESQ is reported when the optional
+``pesq`` package is installed.
+"""
+
+from typing import Dict, Optional, Union
+
+import numpy as np
+import torch
+
+try:
+    from pesq import pesq as _pesq
+    PESQ_AVAILABLE = True
+except ImportError:
+    PESQ_AVAILABLE = False
+
+Audio = Union[np.ndarray, torch.Tensor]
+
+_EPS = 1e-12
+
+
+def _as_array(audio: Audio) -> np.ndarray:
+    if isinstance(audio, torch.Tensor):
+        audio = audio.detach().float().cpu().numpy()
+    return np.asarray(audio, dtype=np.float64).reshape(-1)
+
+
+def _aligned(reference: Audio, estimate: Audio):
+    reference, estimate = _as_array(reference), _as_array(estimate)
+    length = min(len(reference), len(estimate))
+    return reference[:length], estimate[:length]
+
+
+def snr_db(reference: Audio, estimate: Audio) -> float:
+    """Signal-to-noise ratio of ``estimate`` with ``reference - estimate`` as the noise"""
+    reference, estimate = _aligned(reference, estimate)
+    noise = np.sum((reference - estimate) ** 2)
+    return float(10 * np.log10((np.sum(reference ** 2) + _EPS) / (noise + _EPS)))
+
+
+def si_snr_db(reference: Audio, estimate: Audio) -> float:
+    """Scale-invariant SNR: ignores gain differences and DC offset"""
+    reference, estimate = _aligned(reference, estimate)
+    reference = reference - reference.mean()
+    estimate = estimate - estimate.mean()
+    target = np.dot(estimate, reference) / (np.dot(reference, reference) + _EPS) * reference
+    noise = estimate - target
+    return float(10 * np.log10((np.sum(target ** 2) + _EPS) / (np.sum(noise ** 2) + _EPS)))
+
+
+def log_spectral_distance(reference: Audio, estimate: Audio, n_fft: int = 1024) -> float:
+    """RMS difference of the log power spectra in dB, averaged over frames"""
+    reference, estimate = _aligned(reference, estimate)
+    window = torch.hann_window(n_fft, dtype=torch.float64)
+    spectra = [
+        torch.stft(torch.from_numpy(x), n_fft, hop_length=n_fft // 4, window=window, return_complex=True).abs() ** 2
+        for x in (reference, estimate)
+    ]
+    diff = 10 * torch.log10(spectra[0] + _EPS) - 10 * torch.log10(spectra[1] + _EPS)
+    return float(diff.pow(2).mean(dim=0).sqrt().mean())
+
+
+def pesq_score(reference: Audio, estimate: Audio, sample_rate: int) -> float:
+    """Wide-band PESQ (MOS-LQO) at 16 kHz; requires the ``pesq`` package"""
+    if not PESQ_AVAILABLE:
+        raise ImportError("pesq is not installed: pip install pesq")
+    import torchaudio
+    reference, estimate = _aligned(reference, estimate)
+    if sample_rate != 16000:
+        reference, estimate = (
+            torchaudio.functional.resample(torch.from_numpy(x), sample_rate, 16000).numpy()
+            for x in (reference, estimate)
+        )
+    return float(_pesq(16000, reference, estimate, "wb"))
+
+
+def compare_audio(reference: Audio, estimate: Audio, sample_rate: Optional[int] = None) -> Dict[str, float]:
+    """All available metrics of ``estimate`` against ``reference``"""
+    result = {
+        "snr_db": snr_db(reference, estimate),
+        "si_snr_db": si_snr_db(reference, estimate),
+        "lsd_db": log_spectral_distance(reference, estimate),
+    }
+    if PESQ_AVAILABLE and sample_rate is not None:
+        result["pesq"] = pesq_score(reference, estimate, sample_rate)
+    return result
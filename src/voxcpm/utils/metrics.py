@@ -0,0 +1,323 @@
+"""
+Lightweight Prometheus-style metrics for VoxCPM inference.
+
+Counters, gauges and histograms live in a process-wide ``REGISTRY`` and are
+rendered in the Prometheus text exposition format by ``REGISTRY.render()`` (the
+server exposes it at ``/metrics``). Recording is a ``perf_counter`` call plus a
+locked bucket update, so the model loop can be instrumented per step.
+
+Stage timings are host-side wall clock. CUDA kernels run asynchronously, so
+without synchronization a stage mostly measures kernel launches and the GPU
+work surfaces where the host next waits on the device (the untimed per-step
+stop check). Set ``VOXCPM_METRICS_CUDA_SYNC=1`` to synchronize around every
+stage for exact attribution at some throughput cost, or ``VOXCPM_METRICS=0``
+to turn recording off.
+"""
+
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+import torch
+
+from .tracing import current_trace
+
+ENABLED = os.getenv("VOXCPM_METRICS", "1") != "0"
+CUDA_SYNC = os.getenv("VOXCPM_METRICS_CUDA_SYNC", "0") == "1"
+
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+RTF_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 5.0)
+
+
+def _format_labels(labelnames: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{k}="{_escape(v)}"' for k, v in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children: Dict[Tuple[str, ...], object] = {}
+
+    def labels(self, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _default(self):
+        if self.labelnames:
+            raise ValueError(f"{self.name} requires labels {self.labelnames}")
+        return self.labels()
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in sorted(self._children.items()):
+            lines.extend(child.render(self.name, self.labelnames, key))
+        return lines
+
+
+class _CounterChild:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        if ENABLED:
+            with self._lock:
+                self.value += amount
+
+    def render(self, name, labelnames, key):
+        return [f"{name}{_format_labels(labelnames, key)} {_format_value(self.value)}"]
+
+
+class _GaugeChild(_CounterChild):
+    def set(self, value: float):
+        self.value = float(value)
+
+    def dec(self, amount: float = 1.0):
+        self.inc(-amount)
+
+
+class _HistogramChild:
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        if not ENABLED:
+            return
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def render(self, name, labelnames, key):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            cumulative += count
+            le = f'le="{_format_value(bound)}"'
+            lines.append(f"{name}_bucket{_format_labels(labelnames, key, le)} {cumulative}")
+        lines.append(f"{name}_sum{_format_labels(labelnames, key)} {_format_value(self.sum)}")
+        lines.append(f"{name}_count{_format_labels(labelnames, key)} {cumulative}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self._default().inc(amount)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float):
+        self._default().set(value)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self._default().observe(value)
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector: Callable[[], None]):
+        """Register a callback that refreshes gauges right before rendering"""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        for collector in self._collectors:
+            try:
+                collector()
+            except Exception:
+                pass
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+# ---------------------------------------------------------------- model
+STAGE_SECONDS = REGISTRY.histogram(
+    "voxcpm_stage_seconds",
+    "Time spent per inference stage (prompt_load, prompt_encode, prefill, dit_solve, lm_step, vae_decode, format_encode)",
+    ["stage"],
+)
+TEXT_TOKENS = REGISTRY.counter("voxcpm_text_tokens_total", "Target text tokens synthesized")
+PATCHES = REGISTRY.counter("voxcpm_patches_generated_total", "Latent patches generated by the decode loop")
+AUDIO_SECONDS = REGISTRY.counter("voxcpm_audio_seconds_total", "Seconds of audio generated")
+RTF = REGISTRY.histogram(
+    "voxcpm_real_time_factor", "Generation wall time divided by generated audio duration", buckets=RTF_BUCKETS
+)
+
+# ---------------------------------------------------------------- serving
+REQUESTS = REGISTRY.counter("voxcpm_requests_total", "API requests", ["endpoint", "status"])
+REQUEST_SECONDS = REGISTRY.histogram("voxcpm_request_seconds", "End-to-end request latency", ["endpoint"])
+QUEUE_WAIT = REGISTRY.histogram(
+    "voxcpm_queue_wait_seconds", "Time from request arrival until generation starts", ["endpoint"]
+)
+TIME_TO_FIRST_CHUNK = REGISTRY.histogram(
+    "voxcpm_time_to_first_chunk_seconds", "Latency until the first streamed audio chunk", ["endpoint"]
+)
+CACHE_REQUESTS = REGISTRY.counter("voxcpm_cache_requests_total", "Cache lookups", ["cache", "result"])
+
+# ---------------------------------------------------------------- stream scheduler
+SCHEDULER_STREAMS = REGISTRY.gauge("voxcpm_scheduler_active_streams", "Streams admitted to the stream scheduler")
+STREAM_SLACK = REGISTRY.histogram(
+    "voxcpm_stream_slack_seconds",
+    "Buffered client audio left when a chunk is emitted (negative = the client ran dry)",
+    buckets=(-1.0, -0.25, -0.05, 0.0, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0),
+)
+STREAM_UNDERRUNS = REGISTRY.counter("voxcpm_stream_underruns_total", "Chunks that arrived after the client buffer ran dry")
+STREAM_UNDERRUN_SECONDS = REGISTRY.counter(
+    "voxcpm_stream_underrun_seconds_total", "Playback time clients spent stalled waiting for audio"
+)
+KV_SWITCHES = REGISTRY.counter("voxcpm_scheduler_kv_switches_total", "KV cache snapshot/restore swaps between streams")
+
+# ---------------------------------------------------------------- memory
+GPU_MEMORY = REGISTRY.gauge("voxcpm_gpu_memory_bytes", "CUDA memory of device 0", ["kind"])
+
+
+def _collect_gpu_memory():
+    if torch.cuda.is_available():
+        GPU_MEMORY.labels(kind="allocated").set(torch.cuda.memory_allocated())
+        GPU_MEMORY.labels(kind="reserved").set(torch.cuda.memory_reserved())
+        GPU_MEMORY.labels(kind="max_allocated").set(torch.cuda.max_memory_allocated())
+
+
+REGISTRY.add_collector(_collect_gpu_memory)
+
+
+def _sync():
+    if CUDA_SYNC and torch.cuda.is_available():
+        torch.cuda.synchronize()
+
+
+@contextmanager
+def stage_timer(stage: str, trace: bool = True):
+    """Record the wall time of a block under ``voxcpm_stage_seconds{stage=...}``.
+
+    With ``trace=True`` the block is also a span of the current request trace;
+    per-step stages pass ``trace=False`` and are summarized by their enclosing span.
+    """
+    request_trace = current_trace() if trace else None
+    if not ENABLED and request_trace is None:
+        yield
+        return
+    _sync()
+    span = request_trace.open(stage, {}) if request_trace is not None else None
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _sync()
+        if ENABLED:
+            STAGE_SECONDS.labels(stage=stage).observe(time.perf_counter() - start)
+        if span is not None:
+            request_trace.close(span)
+
+
+def record_cache(cache: str, hit: bool):
+    CACHE_REQUESTS.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+
+def record_generation(elapsed: float, audio_seconds: float):
+    AUDIO_SECONDS.inc(audio_seconds)
+    if audio_seconds > 0:
+        RTF.observe(elapsed / audio_seconds)
+
+
+def instrument_stream(chunks: Iterable[bytes], endpoint: str, start: float) -> Iterator[bytes]:
+    """Wrap a response stream to record queue wait and time to first chunk.
+
+    ``start`` is the ``time.perf_counter()`` value taken when the request arrived;
+    queue wait ends when the server starts pulling from the stream.
+    """
+    QUEUE_WAIT.labels(endpoint=endpoint).observe(time.perf_counter() - start)
+    first = True
+    for chunk in chunks:
+        if first:
+            TIME_TO_FIRST_CHUNK.labels(endpoint=endpoint).observe(time.perf_counter() - start)
+            first = False
+        yield chunk
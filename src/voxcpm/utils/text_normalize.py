@@ -2,10 +2,33 @@
 import re
 import regex
 import inflect
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from functools import partial
+from typing import List, Optional
 from wetext import Normalizer
 
 chinese_char_pattern = re.compile(r'[\u4e00-\u9fff]+')
+emoji_pattern = regex.compile(r'\p{Emoji_Presentation}|\p{Emoji}\uFE0F', flags=regex.UNICODE)
+hyphen_context_pattern = re.compile(r'([\d$%^*_+≥≤≠×÷?=])')
+hyphen_number_pattern = re.compile(r'(?<=[a-zA-Z0-9])-(?=\d)')
+
+# single-character replacements as one str.translate pass each
+corner_mark_table = str.maketrans({'²': '平方', '³': '立方', '√': '根号', '≈': '约等于', '<': '小于'})
+bracket_table = str.maketrans({'（': ' ', '）': ' ', '【': ' ', '】': ' ', '`': ''})
+whitespace_quote_table = str.maketrans({'\n': ' ', '\t': ' ', '"': '\\“'})
+
+markdown_patterns = [
+    (re.compile(r"```.*?```", flags=re.DOTALL), ""),  # 代码块 ``` ```（包括多行）
+    (re.compile(r"`[^`]*`"), ""),  # 内联代码 `code`
+    (re.compile(r"!\[[^\]]*\]\([^\)]+\)"), ""),  # 图片语法 ![alt](url)
+    (re.compile(r"\[([^\]]+)\]\([^)]+\)"), r"\1"),  # 链接保留文本 [text](url) -> text
+    (re.compile(r'^(\s*)-\s+', flags=re.MULTILINE), r'\1'),  # 无序列表符号
+    (re.compile(r"<[^>]+>"), ""),  # HTML标签
+    (re.compile(r"^#{1,6}\s*", flags=re.MULTILINE), ""),  # 标题符号（#）
+    (re.compile(r"\n\s*\n"), "\n"),  # 多余空行
+]
 
 # whether contain chinese character
 def contains_chinese(text):
@@ -14,21 +37,12 @@ def contains_chinese(text):
 
 # replace special symbol
 def replace_corner_mark(text):
-    text = text.replace('²', '平方')
-    text = text.replace('³', '立方')
-    text = text.replace('√', '根号')
-    text = text.replace('≈', '约等于')
-    text = text.replace('<', '小于')
-    return text
+    return text.translate(corner_mark_table)
 
 
 # remove meaningless symbol
 def remove_bracket(text):
-    text = text.replace('（', ' ').replace('）', ' ')
-    text = text.replace('【', ' ').replace('】', ' ')
-    text = text.replace('`', '').replace('`', '')
-    text = text.replace("——", " ")
-    return text
+    return text.translate(bracket_table).replace("——", " ")
 
 
 # spell Arabic numerals
@@ -120,60 +134,89 @@ def replace_blank(text: str):
     return "".join(out_str)
 
 def clean_markdown(md_text: str) -> str:
-    # 去除代码块 ``` ```（包括多行）
-    md_text = re.sub(r"```.*?```", "", md_text, flags=re.DOTALL)
+    for pattern, replacement in markdown_patterns:
+        md_text = pattern.sub(replacement, md_text)
+    return md_text.strip()
 
-    # 去除内联代码 `code`
-    md_text = re.sub(r"`[^`]*`", "", md_text)
 
-    # 去除图片语法 ![alt](url)
-    md_text = re.sub(r"!\[[^\]]*\]\([^\)]+\)", "", md_text)
+def clean_text(text):
+    # 去除 Markdown 语法
+    text = clean_markdown(text)
+    # 匹配并移除表情符号
+    text = emoji_pattern.sub("", text)
+    # 去除换行符、制表符，转换引号
+    return text.translate(whitespace_quote_table)
 
-    # 去除链接但保留文本 [text](url) -> text
-    md_text = re.sub(r"\[([^\]]+)\]\([^)]+\)", r"\1", md_text)
-    
-    # 替换无序列表符号
-    md_text = re.sub(r'^(\s*)-\s+', r'\1', md_text, flags=re.MULTILINE)
 
-    # 去除HTML标签
-    md_text = re.sub(r"<[^>]+>", "", md_text)
+_worker_normalizer = None
 
-    # 去除标题符号（#）
-    md_text = re.sub(r"^#{1,6}\s*", "", md_text, flags=re.MULTILINE)
 
-    # 去除多余空格和空行
-    md_text = re.sub(r"\n\s*\n", "\n", md_text)  # 多余空行
-    md_text = md_text.strip()
+def _init_worker():
+    global _worker_normalizer
+    _worker_normalizer = TextNormalizer(cache_size=0)
 
-    return md_text
 
+def _normalize_in_worker(text: str, split: bool):
+    return _worker_normalizer.normalize(text, split)
 
-def clean_text(text):
-    # 去除 Markdown 语法
-    text = clean_markdown(text)
-    # 匹配并移除表情符号
-    text = regex.compile(r'\p{Emoji_Presentation}|\p{Emoji}\uFE0F', flags=regex.UNICODE).sub("",text)
-    # 去除换行符
-    text = text.replace("\n", " ")
-    text = text.replace("\t", " ")
-    text = text.replace('"', "\“")
-    return text
 
 class TextNormalizer:
-    def __init__(self, tokenizer=None):
+    """zh / en text normalization for TTS input.
+
+    Patterns are compiled once at import. ``normalize`` results are memoized for
+    the last ``cache_size`` distinct inputs (0 disables the cache). Building the
+    wetext FSTs takes seconds, so construct the normalizer (and call ``warmup``)
+    at startup rather than on the first request that needs it.
+    """
+
+    def __init__(self, tokenizer=None, cache_size: int = 4096):
         self.tokenizer = tokenizer
         self.zh_tn_model = Normalizer(lang="zh", operator="tn", remove_erhua=True)
         self.en_tn_model = Normalizer(lang="en", operator="tn")
         self.inflect_parser = inflect.engine()
-    
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[tuple, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_workers = 0
+
+    def warmup(self):
+        """Run both language paths once so the first request does not pay for lazy initialization"""
+        self._normalize("预热文本规范化：2025年1月1日，温度25℃。")
+        self._normalize("Warm up the text normalizer on 3 numbers, $4.50 and 10%.")
+        return self
+
+    def _lookup(self, key):
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return True, self._cache[key]
+        return False, None
+
+    def _remember(self, key, value):
+        if not self.cache_size:
+            return
+        with self._lock:
+            self._cache[key] = value
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
     def normalize(self, text, split=False):
+        hit, result = self._lookup((text, split))
+        if hit:
+            return result
+        result = self._normalize(text, split)
+        self._remember((text, split), result)
+        return result
+
+    def _normalize(self, text, split=False):
         # 去除 Markdown 语法，去除表情符号，去除换行符
         lang = "zh" if contains_chinese(text) else "en"
         text = clean_text(text)
         if lang == "zh":
             text = text.replace("=", "等于") # 修复 ”550 + 320 等于 870 千卡。“ 被错误正则为 ”五百五十加三百二十等于八七十千卡.“
-            if re.search(r'([\d$%^*_+≥≤≠×÷?=])', text): # 避免 英文连字符被错误正则为减
-                text = re.sub(r'(?<=[a-zA-Z0-9])-(?=\d)', ' - ', text) # 修复 x-2 被正则为 x负2
+            if hyphen_context_pattern.search(text): # 避免 英文连字符被错误正则为减
+                text = hyphen_number_pattern.sub(' - ', text) # 修复 x-2 被正则为 x负2
             text = self.zh_tn_model.normalize(text)
             text = replace_blank(text)
             text = replace_corner_mark(text)
@@ -182,4 +225,38 @@ class TextNormalizer:
             text = self.en_tn_model.normalize(text)
             text = spell_out_number(text, self.inflect_parser)
         if split is False:
-            return text
\ No newline at end of file
+            return text
+
+    def normalize_batch(self, texts: List[str], split: bool = False, num_workers: int = 0) -> List[str]:
+        """Normalize many texts in one call, in order.
+
+        Repeated and previously seen texts come from the cache. With
+        ``num_workers > 1`` the remaining texts are spread over a process pool
+        (each worker builds its own normalizer once; the pool is kept for later
+        calls until ``close``), which pays off for large batches of long texts.
+        """
+        results = {}
+        for text in dict.fromkeys(texts):
+            hit, result = self._lookup((text, split))
+            if hit:
+                results[text] = result
+        missing = [text for text in dict.fromkeys(texts) if text not in results]
+        if num_workers > 1 and len(missing) > 1:
+            if self._pool is None or self._pool_workers != num_workers:
+                self.close()
+                self._pool = ProcessPoolExecutor(max_workers=num_workers, initializer=_init_worker)
+                self._pool_workers = num_workers
+            normalized = self._pool.map(_normalize_in_worker, missing, [split] * len(missing))
+        else:
+            normalized = (self._normalize(text, split) for text in missing)
+        for text, result in zip(missing, normalized):
+            results[text] = result
+            self._remember((text, split), result)
+        return [results[text] for text in texts]
+
+    def close(self):
+        """Shut down the ``normalize_batch`` process pool, if any"""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+            self._pool_workers = 0
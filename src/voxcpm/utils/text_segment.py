@@ -0,0 +1,129 @@
+"""
+Incremental sentence segmentation for low-latency streaming synthesis.
+
+Prefill covers the whole target text, so time to first audio grows with the
+input length. ``IncrementalSegmenter`` cuts text into segments that can be
+synthesized one after another: the first segment ends at the first clause
+boundary (comma or sentence end) once it holds ``first_min_units`` units, so
+synthesis starts on a short clause while the rest is still being segmented (or
+still arriving, e.g. from a chat model's token stream). Later segments end at
+sentence boundaries, short sentences are merged, and long ones are cut at their
+last clause boundary.
+
+Length is counted in units that work for mixed Chinese/English text: one per
+CJK character and one per Latin word or number. Language is decided per
+character, not once for the whole text.
+"""
+
+import re
+from typing import List, Optional
+
+SENTENCE_END = set("。！？；…!?;")
+CLAUSE_END = set("，、：,:")
+CLOSERS = set("\"'”’）)】」』")
+
+_CJK = re.compile(r"[㐀-䶿一-鿿]")
+_UNIT = re.compile(r"[㐀-䶿一-鿿]|[A-Za-z0-9]+")
+
+
+def count_units(text: str) -> int:
+    """CJK characters plus Latin words / numbers in ``text``"""
+    return len(_UNIT.findall(text))
+
+
+def _is_word_char(c: str) -> bool:
+    return c.isascii() and c.isalnum()
+
+
+class IncrementalSegmenter:
+    """Split text fed in arbitrary pieces into synthesis segments.
+
+    Args:
+        first_min_units: Shortest first segment; it ends at the first clause
+            or sentence boundary after this many units.
+        first_max_units: Without punctuation, the first segment is cut at a
+            word / character boundary after this many units.
+        min_units: Later segments end at the first sentence boundary after this
+            many units (shorter sentences are merged with the next).
+        max_units: Later segments longer than this are cut at their last clause
+            boundary, or at a word / character boundary without one.
+    """
+
+    def __init__(self, first_min_units: int = 4, first_max_units: int = 16, min_units: int = 10,
+                 max_units: int = 50):
+        self.first_min_units = first_min_units
+        self.first_max_units = first_max_units
+        self.min_units = min_units
+        self.max_units = max_units
+        self.buffer = ""
+        self.emitted = 0
+
+    def feed(self, text: str) -> List[str]:
+        """Add ``text``; returns the segments that are complete so far"""
+        self.buffer += text
+        return self._drain(final=False)
+
+    def flush(self) -> List[str]:
+        """End of input: returns every remaining segment and starts over (short first segment again)"""
+        segments = self._drain(final=True)
+        rest, self.buffer = self.buffer.strip(), ""
+        if count_units(rest):
+            segments.append(rest)
+        elif rest and segments:
+            segments[-1] += rest
+        self.emitted = 0
+        return segments
+
+    def _drain(self, final: bool) -> List[str]:
+        segments = []
+        while True:
+            cut = self._next_cut(final)
+            if cut is None:
+                return segments
+            segment, self.buffer = self.buffer[:cut].strip(), self.buffer[cut:]
+            if count_units(segment):
+                segments.append(segment)
+                self.emitted += 1
+            elif segments:
+                segments[-1] += segment
+
+    def _next_cut(self, final: bool) -> Optional[int]:
+        text = self.buffer
+        n = len(text)
+        first = self.emitted == 0
+        min_units = self.first_min_units if first else self.min_units
+        max_units = self.first_max_units if first else self.max_units
+        units = 0
+        last_clause = None  # end of the last clause boundary
+        last_soft = None  # last word / character boundary
+        for i, c in enumerate(text):
+            if _CJK.match(c) or (_is_word_char(c) and (i == 0 or not _is_word_char(text[i - 1]))):
+                if units >= 1 and (_CJK.match(c) or text[i - 1].isspace()):
+                    last_soft = i
+                units += 1
+                if units > max_units:
+                    cut = last_clause or last_soft
+                    if cut:
+                        return cut
+            if c not in SENTENCE_END and c not in CLAUSE_END and c != ".":
+                continue
+            end = i + 1
+            while end < n and text[end] in CLOSERS:
+                end += 1
+            if end >= n and not final:
+                # the next character decides (closing quote, decimal point, more text)
+                return None
+            if c == "." and end < n and not text[end].isspace():
+                continue  # 3.14, e.g., a.m.
+            sentence = c in SENTENCE_END or c == "."
+            if (sentence or first) and units >= min_units:
+                return end
+            if not sentence:
+                last_clause = end
+        return None
+
+
+def split_text(text: str, **kwargs) -> List[str]:
+    """Segment a complete text at once (same rules as ``IncrementalSegmenter``)"""
+    segmenter = IncrementalSegmenter(**kwargs)
+    return segmenter.feed(text) + segmenter.flush()
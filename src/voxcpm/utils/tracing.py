@@ -0,0 +1,232 @@
+"""
+Per-request tracing spans and a slow-request stack profiler.
+
+A ``Trace`` is attached to the current request through a context variable;
+``span(name)`` records a timed child of the innermost open span and is a no-op
+when no trace is active, so library code can be instrumented unconditionally.
+Spans are kept on an explicit per-trace stack rather than in context variables
+because streaming generators resume on different threadpool workers, each with
+its own copy of the context.
+
+``SlowRequestProfiler`` pairs traces with a py-spy-style wall-clock sampler:
+while traced requests are in flight a daemon thread snapshots every Python
+thread's stack. When a request finishes above the latency threshold, its span
+tree (JSON) and the stacks sampled during its lifetime (folded format, ready for
+flamegraph.pl / speedscope) are written to a directory capped at ``max_files``
+reports.
+"""
+
+import collections
+import json
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+
+class Span:
+    __slots__ = ("name", "start", "end", "attrs", "children")
+
+    def __init__(self, name: str, attrs: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.attrs = attrs or {}
+        self.children: List["Span"] = []
+
+    @property
+    def duration(self) -> float:
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+    def to_dict(self, origin: float) -> Dict[str, Any]:
+        node = {
+            "name": self.name,
+            "start_ms": round((self.start - origin) * 1000, 3),
+            "duration_ms": round(self.duration * 1000, 3),
+        }
+        if self.attrs:
+            node["attrs"] = self.attrs
+        if self.children:
+            node["children"] = [child.to_dict(origin) for child in self.children]
+        return node
+
+
+class Trace:
+    def __init__(self, request_id: str, name: str = "request", **attrs):
+        self.request_id = request_id
+        self.wall_start = time.time()
+        self.root = Span(name, attrs)
+        self._stack: List[Span] = [self.root]
+        self._lock = threading.Lock()
+
+    @property
+    def duration(self) -> float:
+        return self.root.duration
+
+    def open(self, name: str, attrs: Dict[str, Any]) -> Span:
+        span = Span(name, attrs)
+        with self._lock:
+            self._stack[-1].children.append(span)
+            self._stack.append(span)
+        return span
+
+    def close(self, span: Span):
+        span.end = time.perf_counter()
+        with self._lock:
+            # Interleaved generators can close spans out of order; drop this one only
+            for i in range(len(self._stack) - 1, 0, -1):
+                if self._stack[i] is span:
+                    del self._stack[i]
+                    break
+
+    def finish(self):
+        if self.root.end is None:
+            self.root.end = time.perf_counter()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "request_id": self.request_id,
+            "timestamp": self.wall_start,
+            "duration_ms": round(self.duration * 1000, 3),
+            "spans": self.root.to_dict(self.root.start),
+        }
+
+
+_REQUEST_ID = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+
+def safe_request_id(request_id: Optional[str]) -> str:
+    """``request_id`` if it is safe in headers and file names, else a new random id"""
+    if request_id and _REQUEST_ID.fullmatch(request_id):
+        return request_id
+    return uuid.uuid4().hex
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("voxcpm_trace", default=None)
+
+
+def start_trace(request_id: str, name: str = "request", **attrs) -> Trace:
+    trace = Trace(request_id, name, **attrs)
+    _current_trace.set(trace)
+    return trace
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """Time a block as a child span of the current request (no-op without a trace)"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+    s = trace.open(name, attrs)
+    try:
+        yield s
+    finally:
+        trace.close(s)
+
+
+class StackSampler:
+    """Wall-clock sampler of all Python thread stacks, active only while acquired"""
+
+    def __init__(self, interval: float = 0.02, max_samples: int = 50_000, max_depth: int = 64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples: Deque[Tuple[float, str]] = collections.deque(maxlen=max_samples)
+        self._active = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def acquire(self):
+        with self._lock:
+            self._active += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="voxcpm-stack-sampler", daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def release(self):
+        with self._lock:
+            self._active = max(0, self._active - 1)
+            if self._active == 0:
+                self._wake.clear()
+
+    def _loop(self):
+        own_id = threading.get_ident()
+        while True:
+            self._wake.wait()
+            now = time.perf_counter()
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                self.samples.append((now, self._fold(names.get(thread_id, str(thread_id)), frame)))
+            time.sleep(self.interval)
+
+    def _fold(self, thread_name: str, frame) -> str:
+        stack = []
+        while frame is not None and len(stack) < self.max_depth:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+            frame = frame.f_back
+        stack.append(thread_name)
+        return ";".join(reversed(stack))
+
+    def collect(self, start: float, end: float) -> "collections.Counter[str]":
+        return collections.Counter(stack for t, stack in list(self.samples) if start <= t <= end)
+
+
+class SlowRequestProfiler:
+    """Write span trees and sampled stacks of requests slower than ``threshold``"""
+
+    def __init__(self, output_dir: str, threshold: float = 10.0, max_files: int = 50,
+                 interval: float = 0.02):
+        self.output_dir = Path(output_dir)
+        self.threshold = threshold
+        self.max_files = max_files
+        self.sampler = StackSampler(interval=interval) if threshold > 0 else None
+
+    def begin(self, trace: Trace):
+        if self.sampler is not None:
+            self.sampler.acquire()
+
+    def finish(self, trace: Trace) -> Optional[Path]:
+        trace.finish()
+        if self.sampler is None:
+            return None
+        self.sampler.release()
+        if trace.duration < self.threshold:
+            return None
+        try:
+            self.output_dir.mkdir(parents=True, exist_ok=True)
+            stem = f"{int(trace.wall_start)}_{safe_request_id(trace.request_id)}"
+            report = self.output_dir / f"{stem}.json"
+            report.write_text(json.dumps(trace.to_dict(), ensure_ascii=False, indent=1))
+            stacks = self.sampler.collect(trace.root.start, trace.root.end)
+            (self.output_dir / f"{stem}.folded").write_text(
+                "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+            )
+            self._prune()
+            return report
+        except OSError as e:
+            print(f"⚠️  Failed to write slow request trace: {e}")
+            return None
+
+    def _prune(self):
+        reports = sorted(self.output_dir.glob("*.json"), key=lambda f: f.stat().st_mtime)
+        for report in reports[: max(0, len(reports) - self.max_files)]:
+            for path in (report, report.with_suffix(".folded")):
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
@@ -5,17 +5,23 @@ Provides on-demand import ZipEnhancer functionality for audio denoising processi
 Related dependencies are imported only when denoising functionality is needed.
 """
 
+import io
 import os
 import tempfile
-from typing import Optional, Union
+from typing import Optional, Tuple, Union
+import numpy as np
+import soundfile as sf
 import torchaudio
 import torch
+from modelscope.outputs import OutputKeys
 from modelscope.pipelines import pipeline
 from modelscope.utils.constant import Tasks
 
 
 class ZipEnhancer:
     """ZipEnhancer Audio Denoising Enhancer"""
+    SAMPLE_RATE = 16000  # the pipeline always outputs 16 kHz PCM
+
     def __init__(self, model_path: str = "iic/speech_zipenhancer_ans_multiloss_16k_base"):
         """
         Initialize ZipEnhancer
@@ -36,9 +42,12 @@ class ZipEnhancer:
             wav_path: Audio file path
         """
         audio, sr = torchaudio.load(wav_path)
+        torchaudio.save(wav_path, self._normalize_loudness_tensor(audio, sr), sr)
+
+    @staticmethod
+    def _normalize_loudness_tensor(audio: torch.Tensor, sr: int) -> torch.Tensor:
         loudness = torchaudio.functional.loudness(audio, sr)
-        normalized_audio = torchaudio.functional.gain(audio, -20-loudness)
-        torchaudio.save(wav_path, normalized_audio, sr)
+        return torchaudio.functional.gain(audio, -20-loudness)
     
     def enhance(self, input_path: str, output_path: Optional[str] = None, 
                 normalize_loudness: bool = True) -> str:
@@ -73,4 +82,35 @@ class ZipEnhancer:
                     os.unlink(output_path)
                 except OSError:
                     pass
-            raise RuntimeError(f"Audio denoising processing failed: {e}")
\ No newline at end of file
+            raise RuntimeError(f"Audio denoising processing failed: {e}")
+
+    def enhance_audio(self, audio: Union[str, bytes, Tuple[torch.Tensor, int]],
+                      normalize_loudness: bool = True) -> Tuple[torch.Tensor, int]:
+        """
+        In-memory audio denoising enhancement (no temporary files)
+        Args:
+            audio: Input file path, encoded audio bytes, or a
+                ``(waveform, sample_rate)`` tuple with waveform shaped (T,) or (channels, T)
+            normalize_loudness: Whether to perform loudness normalization
+        Returns:
+            Tuple[torch.Tensor, int]: Denoised (1, T) waveform and its sample rate
+        Raises:
+            RuntimeError: If processing fails
+        """
+        if isinstance(audio, tuple):
+            waveform, sr = audio
+            waveform = torch.as_tensor(waveform, dtype=torch.float32)
+            if waveform.dim() > 1:
+                waveform = waveform.mean(dim=0)
+            buffer = io.BytesIO()
+            sf.write(buffer, waveform.cpu().numpy(), int(sr), format="WAV", subtype="FLOAT")
+            audio = buffer.getvalue()
+        try:
+            result = self._pipeline(audio)
+            pcm = np.frombuffer(result[OutputKeys.OUTPUT_PCM], dtype=np.int16)
+            enhanced = torch.from_numpy(pcm.astype(np.float32) / 32768.0).unsqueeze(0)
+            if normalize_loudness:
+                enhanced = self._normalize_loudness_tensor(enhanced, self.SAMPLE_RATE)
+            return enhanced, self.SAMPLE_RATE
+        except Exception as e:
+            raise RuntimeError(f"Audio denoising processing failed: {e}")
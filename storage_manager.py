@@ -0,0 +1,157 @@
+import os
+import time
+import uuid
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+from cache_manager import cache_manager
+
+
+class ManagedDir:
+    def __init__(self, path: Path, max_bytes: int = 0, max_age: float = 0):
+        self.path = path
+        self.max_bytes = max_bytes  # 0 = unlimited
+        self.max_age = max_age      # seconds, 0 = unlimited
+        self.usage: Optional[int] = None  # bytes after the last enforce pass
+
+
+class StorageManager:
+    """Quota-bounded scratch directories (outputs, uploads, caches).
+
+    Files get collision-free names from ``new_path``. The janitor thread (or an
+    explicit ``enforce``) deletes files older than ``max_age`` and then the least
+    recently used ones (by mtime, refreshed with ``touch``) until the directory
+    fits in ``max_bytes``. Each pass records the usage it measured, so readers
+    such as health checks get it from ``last_usage`` without walking the tree.
+    """
+
+    def __init__(self, janitor_interval: int = 300):
+        self.dirs: Dict[str, ManagedDir] = {}
+        self.janitor_interval = janitor_interval
+        self.lock = threading.Lock()
+        self._janitor_thread = None
+        self._stop_janitor = threading.Event()
+
+    def register(self, name: str, path, max_bytes: int = 0, max_age: float = 0) -> Path:
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        with self.lock:
+            self.dirs[name] = ManagedDir(path, max_bytes, max_age)
+        return path
+
+    def new_path(self, name: str, prefix: str, suffix: str = "") -> Path:
+        """Unique file path in a managed dir; ``suffix`` is sanitized to a bare extension"""
+        suffix = Path(suffix).suffix or (suffix if suffix.startswith(".") else "")
+        if suffix and not suffix[1:].isalnum():
+            suffix = ""
+        return self.dirs[name].path / f"{prefix}_{int(time.time())}_{uuid.uuid4().hex}{suffix}"
+
+    @staticmethod
+    def touch(path):
+        """Mark a file as recently used so LRU eviction keeps it"""
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def usage(self, name: str) -> int:
+        """Current size of a managed dir; walks every file"""
+        return sum(f.stat().st_size for f in self._files(self.dirs[name].path))
+
+    def last_usage(self) -> Dict[str, Optional[int]]:
+        """Bytes per managed dir as of the last ``enforce`` pass (None before the first)"""
+        with self.lock:
+            return {name: managed.usage for name, managed in self.dirs.items()}
+
+    @staticmethod
+    def _files(path: Path):
+        for f in path.rglob("*"):
+            try:
+                if f.is_file():
+                    yield f
+            except OSError:
+                continue
+
+    def enforce(self, name: Optional[str] = None) -> int:
+        """Apply age and size quotas and record each dir's usage; returns the number of bytes freed"""
+        with self.lock:
+            targets = [self.dirs[name]] if name else list(self.dirs.values())
+        freed = 0
+        now = time.time()
+        for managed in targets:
+            entries = []
+            for f in self._files(managed.path):
+                try:
+                    st = f.stat()
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, f))
+            entries.sort(key=lambda e: e[0])  # oldest / least recently used first
+            total = sum(e[1] for e in entries)
+            for mtime, size, f in entries:
+                expired = managed.max_age and now - mtime > managed.max_age
+                over_quota = managed.max_bytes and total > managed.max_bytes
+                if not expired and not over_quota:
+                    continue
+                try:
+                    f.unlink()
+                except OSError:
+                    continue
+                total -= size
+                freed += size
+            managed.usage = total
+        return freed
+
+    def start_janitor(self):
+        if self._janitor_thread is None:
+            self._stop_janitor.clear()
+            self._janitor_thread = threading.Thread(target=self._janitor_loop, daemon=True)
+            self._janitor_thread.start()
+
+    def stop_janitor(self):
+        self._stop_janitor.set()
+        if self._janitor_thread:
+            self._janitor_thread.join()
+            self._janitor_thread = None
+
+    def _janitor_loop(self):
+        while not self._stop_janitor.is_set():
+            try:
+                freed = self.enforce()
+                if freed:
+                    print(f"🧹 Storage janitor freed {freed / 1024**2:.1f} MB")
+            except Exception as e:
+                print(f"⚠️  Storage janitor error: {e}")
+            self._stop_janitor.wait(self.janitor_interval)
+
+
+def _env_mb(name: str, default: int) -> int:
+    return int(os.getenv(name, str(default))) * 1024**2
+
+
+def _env_hours(name: str, default: float) -> float:
+    return float(os.getenv(name, str(default))) * 3600
+
+
+# Gradio tabs return audio from memory instead of writing it to /app/outputs
+# (the REST endpoints always respond from memory)
+IN_MEMORY_RESPONSES = os.getenv("IN_MEMORY_RESPONSES", "0") == "1"
+
+storage_manager = StorageManager(janitor_interval=int(os.getenv("STORAGE_JANITOR_INTERVAL", "300")))
+storage_manager.register(
+    "outputs", "/app/outputs",
+    max_bytes=_env_mb("OUTPUTS_MAX_MB", 2048), max_age=_env_hours("OUTPUTS_MAX_AGE_HOURS", 24),
+)
+storage_manager.register(
+    "uploads", "/app/uploads",
+    max_bytes=_env_mb("UPLOADS_MAX_MB", 1024), max_age=_env_hours("UPLOADS_MAX_AGE_HOURS", 24),
+)
+storage_manager.register(
+    "whisper_cache", cache_manager.whisper_cache_dir,
+    max_bytes=_env_mb("WHISPER_CACHE_MAX_MB", 64), max_age=_env_hours("WHISPER_CACHE_MAX_AGE_HOURS", 24 * 30),
+)
+storage_manager.register(
+    "audio_cache", cache_manager.audio_cache_dir,
+    max_bytes=_env_mb("AUDIO_CACHE_MAX_MB", 64), max_age=_env_hours("AUDIO_CACHE_MAX_AGE_HOURS", 24 * 30),
+)
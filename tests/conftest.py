@@ -0,0 +1,15 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# the voxcpm package lives in src/, the server modules at the repository root
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture(scope="session")
+def tiny_model():
+    from voxcpm.benchmark import build_tiny_model
+    return build_tiny_model("tiny", device="cpu")
@@ -0,0 +1,37 @@
+import io
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from asr_service import ASRService
+
+
+class RecordingModel:
+    """SenseVoice-shaped stand-in that records the inputs of each batch"""
+
+    def __init__(self):
+        self.batches = []
+
+    def generate(self, input, **kwargs):
+        self.batches.append(input)
+        return [{"text": f"<|en|><|NEUTRAL|>clip of {len(x)} samples"} for x in input]
+
+
+def wav_bytes(num_samples: int, sample_rate: int = 16000) -> bytes:
+    buffer = io.BytesIO()
+    sf.write(buffer, np.zeros(num_samples, dtype=np.float32), sample_rate, format="WAV")
+    return buffer.getvalue()
+
+
+def test_bad_upload_fails_only_its_own_request():
+    service = ASRService(max_batch_size=2, max_wait_ms=5000)
+    service.model = RecordingModel()
+
+    bad = service.submit(b"definitely not audio")
+    good = service.submit(wav_bytes(1600))
+
+    assert good.result(timeout=10) == "clip of 1600 samples"
+    with pytest.raises(Exception):
+        bad.result(timeout=10)
+    assert [len(batch) for batch in service.model.batches] == [1]
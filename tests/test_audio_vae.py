@@ -0,0 +1,83 @@
+import pytest
+import torch
+
+from voxcpm.modules.audiovae import AudioVAE
+from voxcpm.utils.audio_quality import snr_db
+
+
+def test_prepare_for_inference_matches_weight_norm(tiny_model):
+    config = tiny_model.config.audio_vae_config
+    torch.manual_seed(0)
+    reference = AudioVAE(config).eval()
+    folded = AudioVAE(config).eval()
+    folded.load_state_dict(reference.state_dict())
+    folded.prepare_for_inference()
+
+    audio = torch.randn(1, 1, reference.hop_length * 8)
+    z = torch.randn(1, reference.latent_dim, 6)
+    with torch.inference_mode():
+        torch.testing.assert_close(folded.decode(z), reference.decode(z), rtol=0, atol=1e-5)
+        torch.testing.assert_close(
+            folded.encoder(audio)["mu"], reference.encoder(audio)["mu"], rtol=0, atol=1e-5
+        )
+
+
+def fresh_vae(tiny_model, seed: int = 0) -> AudioVAE:
+    torch.manual_seed(seed)
+    return AudioVAE(tiny_model.config.audio_vae_config).eval().prepare_for_inference()
+
+
+def test_bfloat16_decoder_meets_snr_bound(tiny_model):
+    vae = fresh_vae(tiny_model)
+    z = torch.randn(1, vae.latent_dim, 6)
+    with torch.inference_mode():
+        reference = vae.decode(z)
+
+    vae.set_decoder_dtype("bfloat16", min_snr_db=25)
+    assert vae.decoder_dtype == torch.bfloat16
+    with torch.inference_mode():
+        audio = vae.decode(z)
+    assert audio.dtype == torch.float32
+    assert snr_db(reference, audio) >= 25
+
+
+def test_decoder_reverts_to_fp32_below_snr_bound(tiny_model):
+    vae = fresh_vae(tiny_model)
+    z = torch.randn(1, vae.latent_dim, 6)
+    with torch.inference_mode():
+        reference = vae.decode(z)
+
+    with pytest.warns(UserWarning):
+        vae.set_decoder_dtype("bfloat16", min_snr_db=1000)
+    assert vae.decoder_dtype == torch.float32
+    assert all(p.dtype == torch.float32 for p in vae.decoder.parameters())
+    with torch.inference_mode():
+        assert torch.equal(vae.decode(z), reference)
+
+
+@pytest.mark.parametrize("chunk_seconds", [0.04, 0.28, 0.33, 0.52])
+def test_chunked_encoding_matches_single_pass(tiny_model, chunk_seconds):
+    vae = fresh_vae(tiny_model)
+    left, _ = vae.encoder.receptive_field()
+    chunk = int(chunk_seconds * vae.sample_rate)
+    assert chunk % left and left % chunk  # chunk boundaries do not line up with the receptive field
+    audio = torch.randn(1, 1, vae.hop_length * 40 + 123)
+    with torch.inference_mode():
+        single = vae.encode(audio, vae.sample_rate, chunk_seconds=0)
+        chunked = vae.encode(audio, vae.sample_rate, chunk_seconds=chunk_seconds)
+    assert chunked.shape == single.shape
+    torch.testing.assert_close(chunked, single, rtol=0, atol=1e-6)
+
+
+def test_configure_vae_from_env(monkeypatch):
+    from voxcpm.benchmark import build_tiny_pipeline
+
+    pipeline = build_tiny_pipeline("tiny", device="cpu")
+    monkeypatch.setenv("VAE_ENCODE_CHUNK_S", "12.5")
+    monkeypatch.setenv("VAE_DECODER_DTYPE", "bfloat16")
+    monkeypatch.setenv("VAE_DECODER_MIN_SNR_DB", "1000")
+    with pytest.warns(UserWarning):
+        assert pipeline.configure_vae_from_env() is pipeline
+    audio_vae = pipeline.tts_model.audio_vae
+    assert audio_vae.encode_chunk_seconds == 12.5
+    assert audio_vae.decoder_dtype == torch.float32
@@ -0,0 +1,62 @@
+import random
+
+import pytest
+
+from voxcpm.training.data import LengthBucketedBatchSampler
+
+_rng = random.Random(0)
+LENGTHS = [_rng.randint(20, 400) for _ in range(203)]
+
+
+def cost(batch, packed):
+    lengths = [LENGTHS[i] for i in batch]
+    return sum(lengths) if packed else max(lengths) * len(lengths)
+
+
+@pytest.mark.parametrize("packed", [False, True])
+def test_batches_respect_token_budget_and_cover_every_sample(packed):
+    sampler = LengthBucketedBatchSampler(LENGTHS, max_batch_tokens=1200, max_batch_size=6, packed=packed,
+                                         sort_window=50)
+    batches = list(sampler)
+    assert len(batches) == len(sampler)
+    assert sorted(i for batch in batches for i in batch) == list(range(len(LENGTHS)))
+    for batch in batches:
+        assert len(batch) <= 6
+        assert len(batch) == 1 or cost(batch, packed) <= 1200
+
+
+def test_sample_longer_than_budget_gets_its_own_batch():
+    batches = list(LengthBucketedBatchSampler([10, 5000, 10], max_batch_tokens=100, shuffle=False))
+    assert sorted(map(sorted, batches)) == [[0, 2], [1]]
+
+
+def test_set_epoch_reshuffles_deterministically():
+    sampler = LengthBucketedBatchSampler(LENGTHS, max_batch_tokens=1200, seed=7)
+    first = list(sampler)
+    assert list(sampler) == first
+    sampler.set_epoch(1)
+    second = list(sampler)
+    assert second != first
+    assert sorted(i for batch in second for i in batch) == list(range(len(LENGTHS)))
+    sampler.set_epoch(0)
+    assert list(sampler) == first
+
+
+@pytest.mark.parametrize("drop_last", [False, True])
+def test_ddp_shards_have_equal_length(drop_last):
+    num_replicas = 4
+    total = len(list(LengthBucketedBatchSampler(LENGTHS, max_batch_tokens=900)))
+    assert total % num_replicas  # the shards need padding or trimming
+    shards = [
+        list(LengthBucketedBatchSampler(LENGTHS, max_batch_tokens=900, num_replicas=num_replicas, rank=rank,
+                                        drop_last=drop_last))
+        for rank in range(num_replicas)
+    ]
+    sizes = {len(shard) for shard in shards}
+    assert sizes == {total // num_replicas if drop_last else -(-total // num_replicas)}
+
+    seen = [i for shard in shards for batch in shard for i in batch]
+    if drop_last:
+        assert len(seen) == len(set(seen))  # trimmed, never repeated
+    else:
+        assert set(seen) == set(range(len(LENGTHS)))  # padded with repeats, nothing lost
@@ -0,0 +1,19 @@
+from voxcpm.benchmark.suite import compare_to_baseline
+
+
+def _report(**values):
+    return {"results": {name: {"value": v, "unit": "abs", "lower_is_better": True} for name, v in values.items()}}
+
+
+def test_zero_baseline_uses_absolute_tolerance():
+    rows = compare_to_baseline(_report(err=1e-3, same=0.0), _report(err=0.0, same=0.0))
+    by_name = {row["name"]: row for row in rows}
+    assert by_name["err"]["regression"]
+    assert not by_name["same"]["regression"]
+
+
+def test_relative_tolerance():
+    rows = compare_to_baseline(_report(ms=10.5, slow=12.0), _report(ms=10.0, slow=10.0))
+    by_name = {row["name"]: row for row in rows}
+    assert not by_name["ms"]["regression"]
+    assert by_name["slow"]["regression"]
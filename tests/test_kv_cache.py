@@ -0,0 +1,43 @@
+import torch
+
+from voxcpm.modules.minicpm4.cache import StaticKVCache
+
+
+def make_cache(**kwargs):
+    return StaticKVCache(num_layers=2, num_kv_heads=2, dim_kv_head=4, batch_size=1, device="cpu",
+                         dtype=torch.float32, max_length=4096, block_size=256, **kwargs)
+
+
+@torch.inference_mode()
+def fill(cache, length):
+    kv = [(torch.randn(1, 2, length, 4), torch.randn(1, 2, length, 4)) for _ in range(2)]
+    cache.fill_caches(kv)
+    return kv
+
+
+def test_trim_releases_storage_and_keeps_prefix():
+    cache = make_cache()
+    kv = fill(cache, 1500)
+    assert cache.capacity >= 1500
+
+    cache.trim(300)
+    assert cache.capacity == 512
+    assert cache.current_length == 512
+    k, v = cache.get_layer_cache(0)
+    assert torch.equal(k, kv[0][0][..., :512, :])
+    assert torch.equal(v, kv[0][1][..., :512, :])
+
+
+def test_pinned_storage_never_moves():
+    cache = make_cache()
+    cache.pin()
+    assert cache.capacity == cache.max_length
+    address = cache.kv_cache.data_ptr()
+
+    fill(cache, 1500)
+    snapshot = cache.snapshot()
+    cache.reserve(3000)
+    cache.restore(snapshot)
+    cache.trim()
+    assert cache.kv_cache.data_ptr() == address
+    assert cache.capacity == cache.max_length
@@ -0,0 +1,102 @@
+import pytest
+import torch
+
+from voxcpm.modules.audiovae import AudioVAE
+from voxcpm.training.packers import AudioFeatureProcessingPacker
+
+
+@pytest.fixture(scope="module")
+def audio_vae(tiny_model):
+    torch.manual_seed(0)
+    return AudioVAE(tiny_model.config.audio_vae_config).eval()
+
+
+def make_packer(tiny_model, audio_vae, **kwargs):
+    config = tiny_model.config
+    return AudioFeatureProcessingPacker(
+        dataset_cnt=1, max_len=4096, patch_size=config.patch_size, feat_dim=config.feat_dim,
+        audio_vae=audio_vae, **kwargs,
+    )
+
+
+def padded_batch(lengths, pad=-100):
+    rows = torch.full((len(lengths), max(lengths)), float(pad))
+    for row, length in zip(rows, lengths):
+        row[:length] = torch.randn(length)
+    return rows
+
+
+def test_unpadded_lengths():
+    tokens = padded_batch([7, 3, 10])
+    assert AudioFeatureProcessingPacker._unpadded_lengths(tokens) == [7, 3, 10]
+
+
+def test_batched_encoding_matches_per_sample(tiny_model, audio_vae):
+    packer = make_packer(tiny_model, audio_vae, encode_batch_size=3)
+    patch_len = packer.patch_len
+    # mixed lengths: exact patch multiples, partial patches, and a group split by encode_batch_size
+    lengths = [patch_len * 3, patch_len + 17, patch_len * 5 - 1, 331, patch_len * 2, patch_len * 4 + 5]
+    audio_tokens = padded_batch(lengths)
+    wavs = [row[:n] for row, n in zip(audio_tokens, packer._unpadded_lengths(audio_tokens))]
+
+    batched = packer.encode_audio_batch(wavs)
+    for wav, feat in zip(wavs, batched):
+        reference = packer.encode_audio(wav)
+        assert feat.shape == reference.shape
+        torch.testing.assert_close(feat, reference, rtol=0, atol=1e-6)
+
+
+def test_packed_batch_matches_one_encode_per_sample(tiny_model, audio_vae):
+    patch_len = make_packer(tiny_model, audio_vae).patch_len
+    lengths = [patch_len * 2 + 9, patch_len * 4, 500]
+    audio_tokens = padded_batch(lengths)
+    text_tokens = torch.randint(3, 100, (3, 8))
+    text_tokens[0, 5:] = -100
+    text_tokens[1, 2:] = -100
+    inputs = dict(audio_tokens=audio_tokens, text_tokens=text_tokens, task_ids=torch.ones(3, dtype=torch.long),
+                  dataset_ids=torch.zeros(3, dtype=torch.long), is_prompts=[False] * 3)
+
+    batched = make_packer(tiny_model, audio_vae, encode_batch_size=3)(**inputs)
+    single = make_packer(tiny_model, audio_vae, encode_batch_size=1)(**inputs)
+    for key, value in single.items():
+        if key == "audio_feats":
+            torch.testing.assert_close(batched[key], value, rtol=0, atol=1e-6)
+        else:
+            assert torch.equal(batched[key], value), key
+
+
+def test_pack_rows_first_fit_decreasing(tiny_model, audio_vae):
+    packer = make_packer(tiny_model, audio_vae)
+    packer.max_len = 100
+    lengths = [60, 30, 50, 40, 100, 20, 10]
+    rows = packer._pack_rows(lengths)
+    assert sorted(i for row in rows for i in row) == list(range(len(lengths)))
+    assert all(sum(lengths[i] for i in row) <= 100 for row in rows)
+    assert rows == [[4], [0, 3], [2, 1, 5], [6]]
+
+
+def test_packed_rows_give_the_padded_stop_loss(tiny_model, audio_vae):
+    torch.manual_seed(0)
+    config = tiny_model.config
+    frames = [7, 12, 4, 9]
+    audio_feats = [torch.randn(1, n * config.patch_size, config.feat_dim) for n in frames]
+    text_tokens = torch.randint(3, 100, (4, 6))
+    text_tokens[1, 3:] = -100
+    text_tokens[3, 5:] = -100
+    inputs = dict(audio_tokens=None, text_tokens=text_tokens, task_ids=torch.ones(4, dtype=torch.long),
+                  dataset_ids=torch.zeros(4, dtype=torch.long), is_prompts=[False] * 4, audio_feats=audio_feats)
+
+    padded = make_packer(tiny_model, audio_vae)(**inputs)
+    packer = make_packer(tiny_model, audio_vae, pack_sequences=True)
+    packer.max_len = 32
+    packed = packer(**inputs)
+    assert packed["segment_ids"].size(0) < padded["text_tokens"].size(0)
+
+    def stop_loss(batch):
+        batch = dict(batch)
+        for key in ("audio_duration_consumed", "text_token_consumed", "audio_task_ids", "audio_dataset_ids"):
+            batch.pop(key)
+        with torch.no_grad():
+            return tiny_model(**batch)["loss/stop"]
+
+    torch.testing.assert_close(stop_loss(packed), stop_loss(padded), rtol=1e-5, atol=1e-6)
@@ -0,0 +1,39 @@
+import torch
+from torch._dynamo.testing import CompileCounter
+
+
+def test_prefill_lengths_in_one_bucket_share_a_graph(tiny_model):
+    model = tiny_model
+    hidden = model.config.lm_config.hidden_size
+    counter = CompileCounter()
+    torch._dynamo.reset()
+    original_buckets, original_prefill = model.prefill_buckets, model.base_lm.prefill
+    # what optimize() does on CUDA, with a counting backend
+    model.prefill_buckets = (32, 64)
+    model.base_lm.prefill = torch.compile(original_prefill, backend=counter, fullgraph=True, dynamic=False)
+    try:
+        with torch.inference_mode():
+            for length in (5, 17, 32):
+                model._prefill_lm(model.base_lm, torch.randn(1, length, hidden))
+            assert counter.frame_count == 1
+            model._prefill_lm(model.base_lm, torch.randn(1, 40, hidden))
+            assert counter.frame_count == 2
+    finally:
+        model.prefill_buckets, model.base_lm.prefill = original_buckets, original_prefill
+        torch._dynamo.reset()
+
+
+def test_padded_prefill_matches_exact_length(tiny_model):
+    model = tiny_model
+    embeds = torch.randn(1, 21, model.config.lm_config.hidden_size)
+    original_buckets = model.prefill_buckets
+    with torch.inference_mode():
+        exact, exact_kv = model._prefill_lm(model.base_lm, embeds)
+        model.prefill_buckets = (32,)
+        try:
+            padded, padded_kv = model._prefill_lm(model.base_lm, embeds)
+        finally:
+            model.prefill_buckets = original_buckets
+    assert padded.shape == exact.shape
+    torch.testing.assert_close(padded, exact, rtol=1e-5, atol=1e-5)
+    torch.testing.assert_close(padded_kv[0][0], exact_kv[0][0], rtol=1e-5, atol=1e-5)
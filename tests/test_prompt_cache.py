@@ -0,0 +1,8 @@
+import torch
+
+
+def test_prompt_latents_do_not_require_grad(tiny_model):
+    audio = torch.randn(1, tiny_model.sample_rate)
+    cache = tiny_model.build_prompt_cache_from_audio("hello", audio, tiny_model.sample_rate)
+    assert not cache["audio_feat"].requires_grad
+    assert cache["audio_feat"].grad_fn is None
@@ -0,0 +1,33 @@
+import pytest
+import torch
+
+from voxcpm.modules.minicpm4.model import apply_rotary_pos_emb
+
+
+def rotate_half(x):
+    x1, x2 = x.chunk(2, dim=-1)
+    return torch.cat((-x2, x1), dim=-1)
+
+
+def reference_rope(x, cos, sin):
+    """The unfused formulation, in float32"""
+    x32 = x.to(torch.float32)
+    return (x32 * cos + rotate_half(x32) * sin).to(x.dtype)
+
+
+@pytest.mark.parametrize("dtype, tol", [(torch.float32, 1e-6), (torch.bfloat16, 1e-2)])
+@pytest.mark.parametrize("seq_len", [1, 37])
+def test_fused_rope_matches_reference(tiny_model, dtype, tol, seq_len):
+    rope = tiny_model.base_lm.rope_emb
+    cos, sin = rope.prefix(100)
+    cos, sin = cos[100 - seq_len:], sin[100 - seq_len:]
+    head_dim = cos.size(-1)
+    torch.manual_seed(0)
+    q = torch.randn(2, 4, seq_len, head_dim).to(dtype)
+    k = torch.randn(2, 2, seq_len, head_dim).to(dtype)
+
+    q_embed, k_embed = apply_rotary_pos_emb(q, k, cos, sin)
+
+    assert q_embed.dtype == dtype and k_embed.dtype == dtype
+    torch.testing.assert_close(q_embed, reference_rope(q, cos, sin), rtol=tol, atol=tol)
+    torch.testing.assert_close(k_embed, reference_rope(k, cos, sin), rtol=tol, atol=tol)
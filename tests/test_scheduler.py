@@ -0,0 +1,47 @@
+import time
+
+import numpy as np
+import pytest
+
+from voxcpm.scheduler import StreamScheduler
+
+TEXT = "a long enough sentence for the stream to still be decoding when the job arrives"
+
+
+@pytest.fixture(scope="module")
+def pipeline():
+    from voxcpm.benchmark import build_tiny_pipeline
+    return build_tiny_pipeline("tiny", device="cpu")
+
+
+def test_run_between_steps_keeps_stream_kv(pipeline):
+    kwargs = dict(text=TEXT, seed=1, min_len=150, max_len=160, retry_badcase=False)
+    expected = list(pipeline.generate_streaming(**kwargs))
+
+    scheduler = StreamScheduler()
+    chunks = scheduler.submit(pipeline, playback=False, **kwargs)
+    received = [next(chunks), next(chunks)]
+    # a different request that overwrites the shared KV caches while the stream is mid-decode
+    scheduler.run(pipeline, pipeline.generate, text="something else entirely", seed=2, min_len=5, max_len=10)
+    received += list(chunks)
+
+    assert len(received) == len(expected)
+    assert all(np.array_equal(a, b) for a, b in zip(received, expected))
+
+
+def test_run_propagates_exceptions(pipeline):
+    with pytest.raises(ValueError):
+        StreamScheduler().run(pipeline, pipeline.generate, text="   ")
+
+
+def test_idle_scheduler_trims_kv_caches(pipeline):
+    scheduler = StreamScheduler(idle_kv_capacity=256)
+    caches = [pipeline.tts_model.base_lm.kv_cache, pipeline.tts_model.residual_lm.kv_cache]
+    for cache in caches:
+        cache.reserve(2048)
+    list(scheduler.submit(pipeline, playback=False, text=TEXT, seed=1, min_len=5, max_len=10, retry_badcase=False))
+
+    deadline = time.perf_counter() + 5
+    while any(cache.capacity > 256 for cache in caches) and time.perf_counter() < deadline:
+        time.sleep(0.01)
+    assert all(cache.capacity == 256 for cache in caches)
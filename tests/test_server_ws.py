@@ -0,0 +1,82 @@
+import importlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("gradio")
+pytest.importorskip("httpx")
+
+KWARGS = dict(seed=5, min_len=3, max_len=8, inference_timesteps=3)
+
+
+@pytest.fixture(scope="module")
+def server():
+    # load_model() serves the random tiny pipeline instead of downloading weights
+    previous = os.environ.get("VOXCPM_TINY_MODEL")
+    os.environ["VOXCPM_TINY_MODEL"] = "tiny"
+    try:
+        return importlib.import_module("server")
+    finally:
+        if previous is None:
+            del os.environ["VOXCPM_TINY_MODEL"]
+        else:
+            os.environ["VOXCPM_TINY_MODEL"] = previous
+
+
+def converse(server, deltas, audio_format="pcm"):
+    from fastapi.testclient import TestClient
+
+    messages, audio = [], b""
+    with TestClient(server.app).websocket_connect("/api/tts/ws") as ws:
+        ws.send_json({"type": "start", "format": audio_format, **KWARGS})
+        for delta in deltas:
+            ws.send_json({"type": "text", "text": delta})
+        ws.send_json({"type": "end"})
+        while True:
+            message = ws.receive()
+            if message.get("bytes") is not None:
+                audio += message["bytes"]
+                continue
+            messages.append(json.loads(message["text"]))
+            if messages[-1]["type"] in ("done", "error"):
+                break
+    return messages, audio
+
+
+def test_pcm_round_trip(server):
+    deltas = ["Hello there", ", my friend", ". This one is", " the second sentence."]
+    messages, audio = converse(server, deltas)
+
+    assert messages[0]["type"] == "ready" and messages[0]["format"] == "pcm"
+    segments = [m["text"] for m in messages if m["type"] == "segment"]
+    assert segments == ["Hello there, my friend.", "This one is the second sentence."]
+    assert messages[-1] == {"type": "done"}
+
+    # the first segment has no voice prompt, so it matches plain streaming generation
+    model = server.gpu_manager.get_model(server.load_model)
+    first = np.concatenate(list(model.generate_streaming(
+        text=segments[0], cfg_value=2.0, normalize=False, retry_badcase=False, **KWARGS
+    )))
+    expected = (np.clip(first, -1.0, 1.0) * 32767).astype(np.int16).tobytes()
+    assert len(audio) % 2 == 0 and len(audio) > len(expected)
+    assert audio[: len(expected)] == expected
+
+
+def test_bad_start_message_reports_an_error(server):
+    from fastapi.testclient import TestClient
+
+    with TestClient(server.app).websocket_connect("/api/tts/ws") as ws:
+        ws.send_json({"type": "start", "format": "mp3"})
+        assert ws.receive_json()["type"] == "error"
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg is not installed")
+def test_opus_round_trip(server):
+    messages, audio = converse(server, ["Hello there, my friend."], audio_format="opus")
+    assert messages[0] == {"type": "ready", "format": "opus", "sample_rate": 48000}
+    assert messages[-1] == {"type": "done"}
+    assert audio.startswith(b"OggS")
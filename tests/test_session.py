@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+import torch
+
+from voxcpm.scheduler import StreamScheduler
+
+TEXTS = ["hello world, first sentence.", "and then a second one here.", "third sentence comes now."]
+KWARGS = dict(seed=3, min_len=3, max_len=12)
+
+
+def test_segments_match_generation_over_merged_prompt(tiny_model, monkeypatch):
+    reused = []
+    generate = tiny_model._generate_with_prompt_cache
+
+    def spy(*args, prefix_kv=None, **kwargs):
+        reused.append(0 if prefix_kv is None else prefix_kv[0].size(4))
+        return generate(*args, prefix_kv=prefix_kv, **kwargs)
+
+    session = tiny_model.start_session()
+    for text in TEXTS:
+        prompt_cache = session.prompt_cache
+        expected = tiny_model.generate_with_prompt_cache(target_text=text, prompt_cache=prompt_cache, **KWARGS)
+        monkeypatch.setattr(tiny_model, "_generate_with_prompt_cache", spy)
+        audio = session.generate(text, **KWARGS)
+        monkeypatch.setattr(tiny_model, "_generate_with_prompt_cache", generate)
+        for got, want in zip(audio, expected):
+            assert torch.equal(got, want)
+
+    assert len(session.segments) == 3
+    assert reused[0] == 0 and all(n > 0 for n in reused[1:])  # later segments reuse the text prefix
+
+
+@pytest.fixture(scope="module")
+def pipeline():
+    from voxcpm.benchmark import build_tiny_pipeline
+    return build_tiny_pipeline("tiny", device="cpu")
+
+
+def test_session_segment_on_scheduler_keeps_stream_kv(pipeline):
+    stream_kwargs = dict(text="a stream that keeps decoding while the session runs", seed=1, min_len=150,
+                         max_len=160, retry_badcase=False)
+    expected_chunks = list(pipeline.generate_streaming(**stream_kwargs))
+    reference = pipeline.tts_model.start_session()
+    expected_segments = [reference.generate(text, **KWARGS)[0] for text in TEXTS[:2]]
+
+    scheduler = StreamScheduler()
+    session = pipeline.tts_model.start_session()
+    chunks = scheduler.submit(pipeline, playback=False, **stream_kwargs)
+    received = [next(chunks), next(chunks)]
+    segments = []
+    for text in TEXTS[:2]:
+        segments.append(scheduler.run(pipeline, session.generate, text, **KWARGS)[0])
+        received.append(next(chunks))
+    received += list(chunks)
+
+    assert len(received) == len(expected_chunks)
+    assert all(np.array_equal(a, b) for a, b in zip(received, expected_chunks))
+    assert all(torch.equal(a, b) for a, b in zip(segments, expected_segments))
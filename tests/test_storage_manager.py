@@ -0,0 +1,40 @@
+import os
+import time
+
+from storage_manager import StorageManager
+
+
+def write(path, size: int, age: float):
+    path.write_bytes(b"x" * size)
+    mtime = time.time() - age
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_enforce_evicts_least_recently_used_over_quota(tmp_path):
+    storage = StorageManager()
+    root = storage.register("outputs", tmp_path / "outputs", max_bytes=250)
+    oldest = write(root / "a.wav", 100, age=30)
+    touched = write(root / "b.wav", 100, age=20)
+    newest = write(root / "c.wav", 100, age=10)
+    storage.touch(touched)
+
+    assert storage.last_usage() == {"outputs": None}
+    assert storage.enforce() == 100
+    assert not oldest.exists() and touched.exists() and newest.exists()
+    assert storage.last_usage() == {"outputs": 200}
+
+
+def test_enforce_evicts_expired_files_and_reports_unbounded_dirs(tmp_path):
+    storage = StorageManager()
+    uploads = storage.register("uploads", tmp_path / "uploads", max_age=60)
+    scratch = storage.register("scratch", tmp_path / "scratch")
+    expired = write(uploads / "old.wav", 10, age=120)
+    fresh = write(uploads / "new.wav", 10, age=1)
+    (scratch / "nested").mkdir()
+    write(scratch / "nested" / "big.bin", 500, age=10**6)
+
+    assert storage.enforce() == 10
+    assert not expired.exists() and fresh.exists()
+    assert storage.last_usage() == {"uploads": 10, "scratch": 500}
+    assert storage.usage("scratch") == 500
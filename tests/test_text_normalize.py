@@ -0,0 +1,51 @@
+import pytest
+
+pytest.importorskip("wetext")
+pytest.importorskip("inflect")
+
+from voxcpm.utils.text_normalize import TextNormalizer
+
+
+@pytest.fixture(scope="module")
+def normalizer():
+    return TextNormalizer(cache_size=2)
+
+
+@pytest.fixture
+def calls(normalizer, monkeypatch):
+    """Texts that reached the uncached ``_normalize``"""
+    seen = []
+    normalize = normalizer._normalize
+
+    def spy(text, split=False):
+        seen.append(text)
+        return normalize(text, split)
+
+    monkeypatch.setattr(normalizer, "_normalize", spy)
+    normalizer._cache.clear()
+    return seen
+
+
+def test_repeated_text_is_a_cache_hit(normalizer, calls):
+    first = normalizer.normalize("今天是2025年1月1日。")
+    assert normalizer.normalize("今天是2025年1月1日。") == first
+    assert calls == ["今天是2025年1月1日。"]
+
+
+def test_cache_evicts_least_recently_used(normalizer, calls):
+    for text in ["a 1.", "b 2.", "a 1.", "c 3.", "a 1.", "b 2."]:
+        normalizer.normalize(text)
+    assert calls == ["a 1.", "b 2.", "c 3.", "b 2."]
+
+
+def test_batch_deduplicates_and_shares_the_cache(normalizer, calls):
+    expected = normalizer.normalize("I have 3 apples.")
+    results = normalizer.normalize_batch(["I have 3 apples.", "温度25℃。", "温度25℃。"])
+    assert results[0] == expected and results[1] == results[2]
+    assert calls == ["I have 3 apples.", "温度25℃。"]
+
+
+def test_cache_disabled():
+    normalizer = TextNormalizer(cache_size=0)
+    normalizer.normalize("no cache 1.")
+    assert len(normalizer._cache) == 0
@@ -0,0 +1,63 @@
+from voxcpm.utils.text_segment import IncrementalSegmenter, count_units, split_text
+
+
+def test_count_units_mixes_cjk_characters_and_latin_words():
+    assert count_units("Hello 世界, it's 3.14 now") == 8
+
+
+def test_first_segment_ends_at_first_boundary_after_min_units():
+    assert split_text("你好，今天天气很好。我们去公园散步吧！然后回家吃饭。") == [
+        "你好，今天天气很好。",
+        "我们去公园散步吧！然后回家吃饭。",  # the short sentence is merged with the next
+    ]
+    assert split_text("Hello there, my friend. This is a test of the segmenter. It works well, I think.") == [
+        "Hello there, my friend.",
+        "This is a test of the segmenter. It works well, I think.",
+    ]
+
+
+def test_decimal_point_is_not_a_sentence_end():
+    assert split_text("Pi is about 3.14 today. That is all.", first_min_units=2) == [
+        "Pi is about 3.14 today.",
+        "That is all.",
+    ]
+
+
+def test_long_text_without_punctuation_is_cut_at_max_units():
+    assert split_text("一二三四五六七八九十" * 2, first_max_units=8) == ["一二三四五六七八", "九十一二三四五六七八九十"]
+    segments = split_text("word " * 70)
+    assert [count_units(s) for s in segments] == [16, 50, 4]
+
+
+def test_long_sentence_is_cut_at_its_last_clause_boundary():
+    text = "First sentence is here. " + "a b c d e f g h, " * 4 + "i j k l m n o p q r."
+    segments = split_text(text, max_units=30)
+    assert segments[0] == "First sentence is here."
+    assert segments[1] == "a b c d e f g h, " * 2 + "a b c d e f g h,"  # 24 units; one more clause is 32
+    assert segments[2] == "a b c d e f g h, i j k l m n o p q r."
+
+
+def test_incremental_feed_waits_for_the_next_character():
+    segmenter = IncrementalSegmenter()
+    assert segmenter.feed("He said") == []
+    assert segmenter.feed(' "hello there') == []
+    assert segmenter.feed('."') == []  # a closing quote or more text may still follow
+    assert segmenter.feed(" Then") == ['He said "hello there."']
+    assert segmenter.feed(" he left the room quietly. Done") == []
+    assert segmenter.flush() == ["Then he left the room quietly. Done"]
+
+
+def test_flush_resets_to_a_short_first_segment():
+    segmenter = IncrementalSegmenter()
+    assert segmenter.feed("One two three four. ") == ["One two three four."]
+    assert segmenter.feed("Five six seven eight. ") == []  # later segments need min_units
+    assert segmenter.flush() == ["Five six seven eight."]
+    assert segmenter.feed("Nine ten eleven twelve. ") == ["Nine ten eleven twelve."]
+    assert segmenter.flush() == []
+
+
+def test_flush_emits_the_unterminated_rest_but_no_punctuation_only_segment():
+    segmenter = IncrementalSegmenter()
+    assert segmenter.feed("Hello there my friend") == []
+    assert segmenter.flush() == ["Hello there my friend"]
+    assert split_text("好的好的好的。……") == ["好的好的好的。"]
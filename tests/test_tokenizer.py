@@ -0,0 +1,45 @@
+import pytest
+from tokenizers import Tokenizer, models, pre_tokenizers
+from transformers import LlamaTokenizerFast
+
+from voxcpm.model.utils import mask_multichar_chinese_tokens
+
+TEXTS = [
+    "你好世界",
+    "你好 世界, hello world",
+    "我们在中国",  # 国 is not in the vocab: the split of 中国 holds an unknown id
+    "猫和狗",  # unknown characters
+    "mixed 你好abc我们 world",
+    "",
+    "   ",
+]
+
+
+@pytest.fixture(scope="module")
+def tokenizer():
+    """SentencePiece-style unigram vocab with multi-character and ▁-prefixed CJK pieces"""
+    pieces = [("<unk>", 0.0), ("<s>", 0.0), ("</s>", 0.0), ("▁", -2.0)]
+    pieces += [(chr(c), -5.0) for c in range(33, 127)]
+    pieces += [(c, -5.0) for c in "你好世界我们在中和"]
+    pieces += [(p, -1.0) for p in ["你好", "世界", "我们", "中国", "▁你好", "▁我们", "▁世界", "▁hello", "▁world", "▁mixed"]]
+    backend = Tokenizer(models.Unigram(pieces, unk_id=0))
+    backend.pre_tokenizer = pre_tokenizers.Metaspace()
+    return LlamaTokenizerFast(tokenizer_object=backend, bos_token="<s>", eos_token="</s>", unk_token="<unk>")
+
+
+@pytest.mark.parametrize("cache_size", [0, 16])
+@pytest.mark.parametrize("text", TEXTS)
+def test_fast_path_matches_reference(tokenizer, cache_size, text):
+    wrapper = mask_multichar_chinese_tokens(tokenizer, cache_size=cache_size)
+    reference = wrapper.tokenizer.convert_tokens_to_ids(wrapper.tokenize(text))
+    assert wrapper(text) == reference
+    assert wrapper(text) == reference  # second call is a cache hit when enabled
+
+
+def test_split_table_is_used(tokenizer):
+    # the base pieces are ▁-prefixed and plain multi-character CJK tokens; all are split
+    assert tokenizer.tokenize("你好 世界") == ["▁你好", "▁世界"]
+    assert tokenizer.tokenize("我们在中国") == ["▁我们", "在", "中国"]
+    wrapper = mask_multichar_chinese_tokens(tokenizer)
+    assert wrapper("你好 世界") == tokenizer.convert_tokens_to_ids(["你", "好", "世", "界"])
+    assert wrapper("我们在中国")[-1] == tokenizer.unk_token_id
@@ -0,0 +1,25 @@
+import pytest
+
+from voxcpm.utils.tracing import SlowRequestProfiler, Trace, safe_request_id
+
+
+def test_safe_request_id_keeps_valid_ids():
+    assert safe_request_id("req_42-abc") == "req_42-abc"
+
+
+@pytest.mark.parametrize("request_id", [None, "", "../../etc/passwd", "a" * 65, "id with spaces", "a/b"])
+def test_safe_request_id_replaces_invalid_ids(request_id):
+    replaced = safe_request_id(request_id)
+    assert replaced != request_id
+    assert safe_request_id(replaced) == replaced
+
+
+def test_slow_request_report_stays_in_output_dir(tmp_path):
+    profiler = SlowRequestProfiler(str(tmp_path / "traces"), threshold=1e-9)
+    trace = Trace("../../escape")
+    profiler.begin(trace)
+    report = profiler.finish(trace)
+
+    assert report is not None
+    assert report.parent == tmp_path / "traces"
+    assert not (tmp_path / "escape.json").exists()